@@ -44,11 +44,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -80,9 +82,24 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'timeout': 20},
     }
 }
 
+# Read replicas, one SQLite file per entry of the colon separated
+# DATABASE_REPLICA_FILES.  Tests read them through the primary.
+for index, path in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_FILES', '').split(':'))):
+    DATABASES['replica%d' % index] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -133,3 +150,153 @@ JWT_AUTH = {
     'JWT_REFRESH_EXPIRATION_DELTA': datetime.timedelta(days=7)
 
 }
+
+# Background jobs, see `python manage.py jobs`
+
+ENRICHMENT_BACKEND = 'user.clearbit.clearbitLookup'
+
+JOB_LEASE_SECONDS = 300
+JOB_BACKOFF_SECONDS = 30
+JOB_MAX_BACKOFF_SECONDS = 3600
+
+# Posts deleted per transaction when purging a deleted user
+USER_PURGE_BATCH_SIZE = 500
+
+# Set CACHE_ALIAS to share enrichment results between worker processes.
+# ERROR_TTL must stay below JOB_BACKOFF_SECONDS or the first job retry
+# replays the cached provider error instead of asking again.
+ENRICHMENT_CACHE = {
+    'MAX_ENTRIES': 10000,
+    'HIT_TTL': 7 * 24 * 3600,
+    'MISS_TTL': 24 * 3600,
+    'ERROR_TTL': 20,
+    'CACHE_ALIAS': None,
+    'DOMAIN_MISS_THRESHOLD': 0,
+}
+
+# Keyset pagination of post listings, clients may ask for up to the max
+# with ?page_size=
+
+POST_PAGE_SIZE = 50
+POST_MAX_PAGE_SIZE = 200
+
+# Response cache of the post read endpoints, see post/cache.py. It is off
+# unless POST_CACHE_ALIAS names a cache shared by all worker processes: with
+# a per-process cache like the default LocMemCache a write only invalidates
+# the cache of the process that handled it.
+POST_CACHE = {
+    'ENABLED': bool(os.environ.get('POST_CACHE_ALIAS')),
+    'ALIAS': os.environ.get('POST_CACHE_ALIAS') or 'default',
+    'TIMEOUT': 300,
+}
+
+# Verified tokens are cached until they expire, users for USER_TTL seconds or
+# until they are saved in this process
+JWT_AUTH_CACHE = {
+    'MAX_TOKENS': 10000,
+    'MAX_USERS': 10000,
+    'USER_TTL': 60,
+}
+
+POST_BATCH_MAX_OPERATIONS = 500
+
+POST_EXPORT_CHUNK_SIZE = 2000
+
+# Posts created more than AGE_DAYS ago are moved to core_archivedpost by
+# `python manage.py archive_posts`, BATCH_SIZE per transaction
+POST_ARCHIVE = {
+    'AGE_DAYS': 365,
+    'BATCH_SIZE': 500,
+}
+
+# Change feed of /api/post/changes/, see post/changes.py. Changes older than
+# RETENTION_DAYS are pruned by `python manage.py prune_post_changes` and
+# tokens older than that are refused with a 410.
+POST_CHANGES = {
+    'PAGE_SIZE': 500,
+    'RETENTION_DAYS': 30,
+    'PRUNE_BATCH_SIZE': 5000,
+}
+
+# Live stream of post writes at /api/post/stream/, see post/events.py.
+# Each subscriber may fall BUFFER_SIZE events behind before it is dropped;
+# the last HISTORY_SIZE events are replayed to reconnecting clients, as long
+# as one connects within REPLAY_SECONDS of the last stream closing.  Every
+# open stream holds a worker thread, so keep MAX_SUBSCRIBERS, the streams
+# per process, well below ASGI_THREADS or the WSGI server's thread count.
+POST_EVENTS = {
+    'ENABLED': True,
+    'MAX_SUBSCRIBERS': 16,
+    'BUFFER_SIZE': 100,
+    'HISTORY_SIZE': 1000,
+    'REPLAY_SECONDS': 60,
+    'HEARTBEAT_SECONDS': 15,
+    'MAX_SECONDS': 300,
+    'RETRY_MS': 3000,
+}
+
+# Serialize post listings from values() rows, see post/fast.py. Rendering
+# uses orjson, pinned in requirements.txt; without it responses fall back to
+# the stock JSONRenderer.
+POST_FAST_SERIALIZER = True
+
+# Safe-method reads of the post and user views go to these aliases, see
+# core/replicas.py.  A user's reads stay on the primary for STICKY_SECONDS
+# after their own writes; an unreachable replica is retried after
+# RETRY_SECONDS.  The sticky window lives in the default cache, so with
+# replicas CACHES['default'] must be shared by all worker processes.
+DATABASE_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias.startswith('replica')],
+    'STICKY_SECONDS': 5,
+    'RETRY_SECONDS': 30,
+}
+
+# Applied to every new connection to a SQLite file, see core/db.py
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -20000,
+    'mmap_size': 268435456,
+}
+SQLITE_LOCK_RETRIES = 5
+SQLITE_LOCK_BACKOFF_SECONDS = 0.05
+
+# Threads running views under config.asgi.application
+ASGI_THREADS = 32
+
+# Per-route request metrics, scraped from /api/metrics/ by staff
+METRICS_ENABLED = True
+
+# Staff can profile a request with X-Profile: 1 or ?profile=1, see
+# core/profiling.py
+PROFILING_ENABLED = True
+PROFILING_TOP_FUNCTIONS = 40
+PROFILING_STACK_DEPTH = 5
+
+# Token bucket throttles, see core/throttling.py.  RATE is the sustained
+# rate, BURST how many requests may arrive at once.  Set THROTTLE_CACHE_ALIAS
+# to a cache shared by all worker processes: with the default per-process
+# cache every worker enforces the limits on its own.
+THROTTLE = {
+    'ENABLED': True,
+    'ALIAS': os.environ.get('THROTTLE_CACHE_ALIAS') or 'default',
+    'RATES': {
+        'token_ip': {'RATE': '30/min', 'BURST': 30},
+        'token_user': {'RATE': '10/min', 'BURST': 10},
+        'signup': {'RATE': '10/min', 'BURST': 30},
+        'post_write': {'RATE': '120/min', 'BURST': 60},
+    },
+}
+
+# Idempotency-Key support of the create endpoints, see core/idempotency.py.
+# Responses are kept for TTL seconds in the cache ALIAS; a retry arriving
+# while the first request still runs waits up to WAIT_SECONDS for it.  Set
+# IDEMPOTENCY_CACHE_ALIAS to a cache shared by all worker processes: with the
+# default per-process cache only retries reaching the same process replay.
+IDEMPOTENCY = {
+    'ENABLED': True,
+    'ALIAS': os.environ.get('IDEMPOTENCY_CACHE_ALIAS') or 'default',
+    'TTL': 24 * 3600,
+    'LOCK_SECONDS': 60,
+    'WAIT_SECONDS': 5,
+}
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/post/', include('post.urls')),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
 ]
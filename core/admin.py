@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import User, Post
+from .models import User, Post, Job
 from django.utils.translation import gettext as _
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from user.tasks import missing_purge_permissions, purge_later
 
 
 class UserAdmin(BaseUserAdmin):
@@ -26,6 +27,21 @@ class UserAdmin(BaseUserAdmin):
 
     )
 
+    def get_deleted_objects(self, objs, request):
+        # Listing the posts on the confirmation page would load them all
+        objs = list(objs)
+        perms_needed = missing_purge_permissions(request.user, objs)
+        return [str(obj) for obj in objs], {_('users'): len(objs)}, perms_needed, []
+
+    def delete_model(self, request, obj):
+        """Deactivate the user and purge them in the background"""
+        purge_later(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            purge_later(user)
+
 
 admin.site.register(User, UserAdmin)
 admin.site.register(Post)
+admin.site.register(Job)
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import metrics, throttling
+        from .db import configure_connection
+
+        connection_created.connect(configure_connection)
+        metrics.register(throttling.collect)
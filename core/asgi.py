@@ -0,0 +1,198 @@
+"""
+ASGI handler running the Django application in a bounded thread pool.
+
+Django 2.2 has neither async views nor an async ORM, so the views stay
+synchronous.  What this handler makes asynchronous is everything around
+them: request bodies are read and responses are written on the event
+loop, and a worker thread is only taken for the time the view itself runs.
+Slow clients and uploads then cost a coroutine instead of a thread, and
+ASGI_THREADS bounds how many views run at once.
+
+A streaming response is produced by its view, so it keeps its thread until
+it ends.  The thread stops when the client disconnects, at the next chunk
+the response yields, and the response is closed.
+"""
+import asyncio
+import io
+import logging
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+logger = logging.getLogger(__name__)
+
+END = object()
+
+
+def get_environ(scope, body):
+    """WSGI environ for an ASGI http scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI carries the path as undecoded bytes in a latin-1 str
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+            key = name
+        else:
+            key = 'HTTP_' + name
+        if key in environ:
+            value = environ[key] + ',' + value
+        environ[key] = value
+
+    if body:
+        environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+class ASGIHandler:
+    """ASGI application serving Django through a bounded thread pool"""
+
+    def __init__(self, max_workers=None):
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.ASGI_THREADS,
+            thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError('Unsupported ASGI scope type %r' % scope['type'])
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """The whole request body, or None when the client went away"""
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                return body.getvalue()
+
+    async def http(self, scope, receive, send):
+        body = await self.read_body(receive)
+        if body is None:
+            return
+
+        loop = asyncio.get_running_loop()
+        # Small bound so a streaming view can't run ahead of a slow client
+        queue = asyncio.Queue(maxsize=8)
+        disconnected = threading.Event()
+        watcher = asyncio.ensure_future(self.watch_disconnect(receive, disconnected))
+        future = loop.run_in_executor(
+            self.executor, self.run, get_environ(scope, body), loop, queue, disconnected)
+
+        started = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is END:
+                    break
+                if disconnected.is_set():
+                    # Nobody to send to, wait for the worker to stop
+                    continue
+                if not started:
+                    status, headers = item
+                    await send({
+                        'type': 'http.response.start',
+                        'status': status,
+                        'headers': [
+                            (name.encode('latin-1'), value.encode('latin-1'))
+                            for name, value in headers
+                        ],
+                    })
+                    started = True
+                elif item:
+                    await send({'type': 'http.response.body', 'body': item, 'more_body': True})
+        except BaseException:
+            # Let the worker finish rather than block on a full queue
+            disconnected.set()
+            while await queue.get() is not END:
+                pass
+            raise
+        finally:
+            await future
+            watcher.cancel()
+
+        if disconnected.is_set():
+            return
+        if not started:
+            await send({'type': 'http.response.start', 'status': 500, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def watch_disconnect(self, receive, disconnected):
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                return
+
+    def run(self, environ, loop, queue, disconnected):
+        """Run the view and pass its response to the event loop
+
+        Runs in a worker thread.  The whole response is produced in this
+        thread, because Django's database connections belong to a thread.
+        Stops reading the response once the client has disconnected.
+        """
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            put((int(status.split(' ', 1)[0]), headers))
+
+        try:
+            response = self.wsgi(environ, start_response)
+            try:
+                for chunk in response:
+                    if disconnected.is_set():
+                        break
+                    put(chunk)
+            finally:
+                response.close()
+        except Exception:
+            logger.exception('Error handling %s %s', environ['REQUEST_METHOD'], environ['PATH_INFO'])
+        finally:
+            put(END)
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,103 @@
+"""
+SQLite tuning for several concurrent workers.
+
+Every new connection to a SQLite file gets the SQLITE_PRAGMAS (WAL journal
+so readers never block the writer, relaxed fsync, bigger page cache and
+memory mapped reads).  The busy timeout makes writers wait for the lock
+instead of failing at once, but a transaction that started reading before
+another writer committed can still fail with "database is locked";
+`retry_on_locked` runs such writes again from the start.
+"""
+import itertools
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def is_file_database(connection):
+    name = str(connection.settings_dict['NAME'] or '')
+    return (
+        connection.vendor == 'sqlite'
+        and name not in ('', ':memory:')
+        and 'mode=memory' not in name
+    )
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Apply SQLITE_PRAGMAS to new connections to a SQLite file"""
+    if not is_file_database(connection):
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute('PRAGMA %s = %s' % (name, value))
+
+
+def is_locked(exc):
+    message = str(exc)
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def delete_unreferenced(queryset):
+    """Delete the rows of `queryset` with a single DELETE
+
+    Unlike QuerySet.delete() nothing is collected first and no
+    pre_delete/post_delete signals are sent, so callers do what the
+    receivers would.  Only for models no foreign key points to, as there
+    is nothing to cascade to.  Returns the number of rows deleted.
+    """
+    model = queryset.model
+    if model._meta.related_objects:
+        raise ValueError('%s is referenced by other models' % model.__name__)
+    return queryset._raw_delete(queryset.db)
+
+
+def retry_on_locked(func):
+    """Run `func` again when SQLite reports the database as locked
+
+    Only retries outside of a transaction, as the whole transaction has to
+    be run again.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in itertools.count():
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as exc:
+                if (attempt >= settings.SQLITE_LOCK_RETRIES or not is_locked(exc)
+                        or transaction.get_connection().in_atomic_block):
+                    raise
+                delay = random.uniform(0, settings.SQLITE_LOCK_BACKOFF_SECONDS * 2 ** attempt)
+                logger.info('Database locked, retrying %s in %.3fs', func.__name__, delay)
+                time.sleep(delay)
+
+    return wrapper
+
+
+@contextmanager
+def temporary_database(alias=DEFAULT_DB_ALIAS):
+    """Point `alias` at a fresh, migrated SQLite file for the duration
+
+    Used by the benchmarks, which need a file several threads can share
+    rather than the in-memory test database.
+    """
+    connection = connections[alias]
+    directory = tempfile.mkdtemp()
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST'].get('NAME')
+    connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'db.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+        shutil.rmtree(directory, ignore_errors=True)
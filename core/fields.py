@@ -0,0 +1,27 @@
+import zlib
+
+from django.db import models
+
+COMPRESSION_LEVEL = 6
+
+
+class CompressedTextField(models.BinaryField):
+    """Text stored zlib compressed, read and written as str"""
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return zlib.decompress(bytes(value)).decode('utf-8')
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return zlib.decompress(bytes(value)).decode('utf-8')
+        return value
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            value = zlib.compress(value.encode('utf-8'), COMPRESSION_LEVEL)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,127 @@
+"""
+Idempotency-Key support for endpoints creating things.
+
+A client retrying a POST sends the same ``Idempotency-Key`` header as the
+first attempt.  The first response, unless it is a server error, is kept
+in the cache under the user (or the address of an anonymous client) and
+the key, and retries get it back with ``Idempotent-Replayed: true`` without running the
+view again.  While the first request runs it holds a lock in the cache, so
+a concurrent retry waits for its response instead of doing the work a
+second time.  Reusing a key with a different body is refused with a 422.
+
+Retries may reach any worker process, so the cache has to be shared by all
+of them; with the default per-process LocMemCache a retry served by another
+process runs the view again.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADERS = ('Location',)
+POLL_SECONDS = 0.05
+
+
+class KeyInUse(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still being processed.'
+    default_code = 'idempotency_key_in_use'
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was used with a different request.'
+    default_code = 'idempotency_key_reused'
+
+
+def get_cache():
+    return caches[settings.IDEMPOTENCY['ALIAS']]
+
+
+def fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(('%s|%s' % (request.path, body)).encode('utf-8')).hexdigest()
+
+
+def replay(stored):
+    response = Response(stored['data'], status=stored['status'], headers=stored['headers'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+class IdempotencyMixin:
+    """Replay the stored response of POSTs repeating an Idempotency-Key"""
+
+    def get_idempotency_scope(self, request):
+        if request.user and request.user.is_authenticated:
+            return 'user:%s' % request.user.pk
+        # Like the throttles, honouring NUM_PROXIES
+        return 'anonymous:%s' % BaseThrottle().get_ident(request)
+
+    def post(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key or not settings.IDEMPOTENCY['ENABLED']:
+            return super().post(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({'Idempotency-Key': [
+                'At most %d characters.' % MAX_KEY_LENGTH]})
+
+        cache = get_cache()
+        digest = hashlib.md5('|'.join(
+            (self.__class__.__name__, self.get_idempotency_scope(request), key)
+        ).encode('utf-8')).hexdigest()
+        response_key = 'idempotency:r:%s' % digest
+        lock_key = 'idempotency:l:%s' % digest
+        request_fingerprint = fingerprint(request)
+
+        stored = cache.get(response_key)
+        if stored is None:
+            stored = self.acquire(response_key, lock_key)
+        if stored is not None:
+            if stored['fingerprint'] != request_fingerprint:
+                raise KeyReused()
+            return replay(stored)
+
+        try:
+            response = super().post(request, *args, **kwargs)
+            if response.status_code < 500:
+                cache.set(response_key, {
+                    'fingerprint': request_fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'headers': {name: response[name] for name in REPLAYED_HEADERS
+                                if response.has_header(name)},
+                }, settings.IDEMPOTENCY['TTL'])
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    def acquire(self, response_key, lock_key):
+        """Take the key's lock, or return the response stored meanwhile
+
+        Waits while another request holds the lock.
+        """
+        cache = get_cache()
+        deadline = time.monotonic() + settings.IDEMPOTENCY['WAIT_SECONDS']
+        while True:
+            if cache.add(lock_key, 1, settings.IDEMPOTENCY['LOCK_SECONDS']):
+                # The previous holder may have stored its response and left
+                stored = cache.get(response_key)
+                if stored is not None:
+                    cache.delete(lock_key)
+                return stored
+
+            stored = cache.get(response_key)
+            if stored is not None:
+                return stored
+            if time.monotonic() >= deadline:
+                raise KeyInUse()
+            time.sleep(POLL_SECONDS)
@@ -0,0 +1,299 @@
+"""
+Synthetic dataset and weighted request mix for the loadtest command.
+
+Titles are drawn from a small vocabulary with Zipf distributed word
+frequencies, so a few words are very common and most are rare, like real
+text; the title searches pick their terms the same way.  Every worker
+thread owns one seeded user, runs its share of the requests with its own
+seeded random generator and records the latency of each request per
+route.  With the same options the same requests are made, so the JSON
+reports of two commits can be compared.
+"""
+import math
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import defaultdict
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import close_old_connections, connections
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_jwt.settings import api_settings
+
+from core.models import Post
+from post import stats
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+PASSWORD = 'loadtest-password'
+VOCABULARY = [
+    'python', 'django', 'api', 'cache', 'database', 'query', 'index', 'rest',
+    'token', 'user', 'post', 'search', 'fast', 'slow', 'release', 'review',
+    'server', 'client', 'thread', 'async', 'lock', 'write', 'read', 'page',
+    'cursor', 'stream', 'export', 'batch', 'worker', 'queue', 'retry',
+    'latency', 'profile', 'metric', 'replica', 'backup', 'schema', 'deploy',
+    'monitor', 'alert', 'tuning', 'memory', 'disk', 'network', 'kernel',
+    'compiler', 'parser', 'router', 'signal', 'benchmark',
+]
+WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+
+def words(rng, count):
+    return rng.choices(VOCABULARY, weights=WEIGHTS, k=count)
+
+
+def make_title(rng):
+    return ' '.join(words(rng, rng.randint(2, 6))).capitalize()
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of sorted `values`"""
+    if not values:
+        return None
+    rank = math.ceil(q / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def seed(users, posts_per_user, rng):
+    """Create the users and their posts, return the users and post ids"""
+    password = make_password(PASSWORD)
+    User = get_user_model()
+    User.objects.bulk_create([
+        User(email='load%d@example.com' % index, username='load%d' % index, password=password)
+        for index in range(users)
+    ])
+    seeded = list(User.objects.filter(email__startswith='load').order_by('id'))
+    admin = User.objects.create_superuser(
+        email='load-admin@example.com', password=PASSWORD, username='load-admin')
+
+    for user in seeded:
+        Post.objects.bulk_create([
+            Post(user=user, title=make_title(rng), content=' '.join(words(rng, 40)))
+            for _ in range(posts_per_user)
+        ])
+    stats.rebuild(user.pk for user in seeded)
+    post_ids = defaultdict(list)
+    for pk, user_id in Post.objects.values_list('id', 'user_id'):
+        post_ids[user_id].append(pk)
+
+    return seeded, admin, post_ids
+
+
+class Worker:
+    """One simulated client with its own user, posts and random generator"""
+
+    def __init__(self, index, user, admin, post_ids, rng):
+        self.index = index
+        self.user = user
+        self.post_ids = post_ids
+        self.rng = rng
+        self.created = 0
+        self.sync_token = None
+        self.token = jwt_encode_handler(jwt_payload_handler(user))
+        self.admin_token = jwt_encode_handler(jwt_payload_handler(admin))
+        self.client = APIClient()
+
+    def auth(self, token=None):
+        return {'HTTP_AUTHORIZATION': 'Bearer ' + (token or self.token)}
+
+    def own_post(self):
+        if not self.post_ids:
+            return 0
+        return self.rng.choice(self.post_ids)
+
+    def new_title(self):
+        self.created += 1
+        return '%s %d-%d' % (make_title(self.rng), self.index, self.created)
+
+    def list_posts(self):
+        return self.client.get(reverse('post:show-posts'),
+                               {'page_size': self.rng.choice([10, 50])}, **self.auth())
+
+    def post_detail(self):
+        return self.client.get(
+            reverse('post:post-detail', kwargs={'pk': self.own_post()}), **self.auth())
+
+    def user_posts(self):
+        return self.client.get(
+            reverse('post:post-username', kwargs={'username': self.user.username}), **self.auth())
+
+    def posts_like(self):
+        return self.client.get(
+            reverse('post:post-like', kwargs={'title': words(self.rng, 1)[0]}), **self.auth())
+
+    def posts_unlike(self):
+        return self.client.get(
+            reverse('post:post-unlike', kwargs={'title': words(self.rng, 1)[0]}), **self.auth())
+
+    def create_post(self):
+        response = self.client.post(reverse('post:create-post'), {
+            'title': self.new_title(), 'content': ' '.join(words(self.rng, 40))}, **self.auth())
+        if response.status_code == 201:
+            self.post_ids.append(response.data['id'])
+        return response
+
+    def update_post(self):
+        return self.client.patch(
+            reverse('post:post-detail', kwargs={'pk': self.own_post()}),
+            {'title': self.new_title()}, **self.auth())
+
+    def delete_post(self):
+        pk = self.own_post()
+        if pk in self.post_ids:
+            self.post_ids.remove(pk)
+        return self.client.delete(reverse('post:post-detail', kwargs={'pk': pk}), **self.auth())
+
+    def batch(self):
+        operations = [{'op': 'create', 'title': self.new_title(), 'content': 'Batch'}
+                      for _ in range(2)]
+        operations.append({'op': 'update', 'id': self.own_post(), 'content': 'Batch update'})
+        return self.client.post(reverse('post:batch'), operations, format='json', **self.auth())
+
+    def export(self):
+        response = self.client.get(reverse('post:export', kwargs={'fmt': 'ndjson'}),
+                                   {'username': self.user.username}, **self.auth())
+        b''.join(response.streaming_content)
+        return response
+
+    def changes(self):
+        params = {'since': self.sync_token} if self.sync_token else {}
+        response = self.client.get(reverse('post:changes'), params, **self.auth())
+        if response.status_code == 200:
+            self.sync_token = response.data['next']
+        return response
+
+    def me(self):
+        return self.client.get(reverse('user:me'), **self.auth())
+
+    def users(self):
+        return self.client.get(reverse('user:users'), **self.auth(self.admin_token))
+
+    def create_user(self):
+        self.created += 1
+        name = 'signup-%d-%d' % (self.index, self.created)
+        return self.client.post(reverse('user:create'), {
+            'email': name + '@example.com', 'password': PASSWORD, 'username': name})
+
+    def obtain_token(self):
+        return self.client.post(reverse('user:token'),
+                                {'email': self.user.email, 'password': PASSWORD})
+
+    def refresh_token(self):
+        return self.client.post(reverse('user:token-refresh'), {'token': self.token})
+
+
+# (route, weight, Worker method)
+ROUTES = [
+    ('GET post:show-posts', 30, Worker.list_posts),
+    ('GET post:post-detail', 20, Worker.post_detail),
+    ('GET post:post-username', 10, Worker.user_posts),
+    ('GET post:post-like', 8, Worker.posts_like),
+    ('GET post:post-unlike', 2, Worker.posts_unlike),
+    ('POST post:create-post', 8, Worker.create_post),
+    ('PATCH post:post-detail', 4, Worker.update_post),
+    ('DELETE post:post-detail', 1, Worker.delete_post),
+    ('POST post:batch', 2, Worker.batch),
+    ('GET post:export', 1, Worker.export),
+    ('GET post:changes', 3, Worker.changes),
+    ('GET user:me', 5, Worker.me),
+    ('GET user:users', 1, Worker.users),
+    ('POST user:create', 1, Worker.create_user),
+    ('POST user:token', 1, Worker.obtain_token),
+    ('POST user:token-refresh', 1, Worker.refresh_token),
+]
+
+
+def summarize(samples, elapsed):
+    """Counts, statuses, throughput and latency percentiles of samples"""
+    latencies = sorted(seconds * 1000 for _, seconds in samples)
+    statuses = defaultdict(int)
+    for status, _ in samples:
+        statuses[str(status)] += 1
+
+    return {
+        'count': len(samples),
+        'errors': sum(1 for status, _ in samples if status is None or status >= 500),
+        'statuses': dict(sorted(statuses.items())),
+        'requests_per_second': round(len(samples) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+    }
+
+
+def run(users=20, posts_per_user=50, requests=2000, concurrency=8, seed_value=0):
+    """Seed the current database, replay the mix and return the report"""
+    rng = random.Random(seed_value)
+    seeded, admin, post_ids = seed(max(users, concurrency), posts_per_user, rng)
+    connections.close_all()
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    routes = [(name, method) for name, _, method in ROUTES]
+    weights = [weight for _, weight, _ in ROUTES]
+
+    def work(worker, count):
+        recorded = defaultdict(list)
+        for _ in range(count):
+            name, method = worker.rng.choices(routes, weights=weights)[0]
+            start = time.perf_counter()
+            try:
+                status = method(worker).status_code
+            except Exception:
+                status = None
+            recorded[name].append((status, time.perf_counter() - start))
+            # What the request_finished signal does after a real request
+            close_old_connections()
+        connections.close_all()
+        with lock:
+            for name, values in recorded.items():
+                samples[name].extend(values)
+
+    workers = [
+        Worker(index, seeded[index], admin, post_ids[seeded[index].pk],
+               random.Random('%s-%s' % (seed_value, index)))
+        for index in range(concurrency)
+    ]
+    counts = [requests // concurrency + (index < requests % concurrency)
+              for index in range(concurrency)]
+    threads = [threading.Thread(target=work, args=args) for args in zip(workers, counts)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'users': len(seeded),
+            'posts_per_user': posts_per_user,
+            'requests': requests,
+            'concurrency': concurrency,
+            'seed': seed_value,
+            'seconds': round(elapsed, 3),
+        },
+        'total': summarize([sample for values in samples.values() for sample in values], elapsed),
+        'routes': {name: summarize(samples[name], elapsed) for name in sorted(samples)},
+    }
@@ -0,0 +1,104 @@
+import json
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.db import temporary_database
+from core.models import Post
+
+# Django's defaults: rollback journal, 5s busy timeout, a connection per
+# request and no retries.
+BASELINE = {
+    'settings': {'SQLITE_PRAGMAS': {}, 'SQLITE_LOCK_RETRIES': 0},
+    'database': {'CONN_MAX_AGE': 0, 'OPTIONS': {'timeout': 5}},
+}
+TUNED = {'settings': {}, 'database': {}}
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent post reads and writes with and without the SQLite tuning'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per worker')
+        parser.add_argument('--write-ratio', type=float, default=0.3)
+
+    def handle(self, *args, **options):
+        results = {}
+        for name, profile in (('baseline', BASELINE), ('tuned', TUNED)):
+            results[name] = self.run_profile(profile, options)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_profile(self, profile, options):
+        settings_dict = connections['default'].settings_dict
+        saved = {key: settings_dict[key] for key in profile['database']}
+        settings_dict.update(profile['database'])
+        cache = {'ENABLED': False, 'ALIAS': 'default', 'TIMEOUT': 0}
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver'], POST_CACHE=cache,
+                                   **profile['settings']), temporary_database():
+                return self.run_workers(options)
+        finally:
+            settings_dict.update(saved)
+
+    def run_workers(self, options):
+        users = [
+            get_user_model().objects.create_user(
+                email='worker%d@example.com' % index,
+                password='benchmark',
+                username='worker%d' % index,
+            )
+            for index in range(options['workers'])
+        ]
+        Post.objects.bulk_create([
+            Post(user=user, title='Seed %d' % index, content='Content')
+            for index in range(50) for user in users
+        ])
+        connections.close_all()
+
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def work(user):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            done = {'reads': 0, 'writes': 0, 'errors': 0}
+            for index in range(options['requests']):
+                try:
+                    if random.random() < options['write_ratio']:
+                        response = client.post(reverse('post:create-post'), {
+                            'title': 'Post %d' % index, 'content': 'Content'})
+                        kind = 'writes'
+                    else:
+                        response = client.get(reverse('post:show-posts'))
+                        kind = 'reads'
+                    done[kind if response.status_code < 400 else 'errors'] += 1
+                except DatabaseError:
+                    done['errors'] += 1
+                # What the request_finished signal does after a real request
+                close_old_connections()
+            connections.close_all()
+            with lock:
+                for key, value in done.items():
+                    counts[key] += value
+
+        threads = [threading.Thread(target=work, args=(user,)) for user in users]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        return dict(
+            counts,
+            seconds=round(elapsed, 3),
+            requests_per_second=round((counts['reads'] + counts['writes']) / elapsed, 1),
+        )
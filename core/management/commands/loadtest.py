@@ -0,0 +1,52 @@
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core import loadtest
+from core.db import temporary_database
+
+
+class Command(BaseCommand):
+    help = 'Seed a temporary database and replay a weighted mix of every API endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=50, help='Posts per user')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='File to write the JSON report to, stdout by default')
+
+    def handle(self, *args, **options):
+        # Measure the endpoints, not the throttles
+        throttle = dict(settings.THROTTLE, ENABLED=False)
+        # Private caches, so entries about the temporary database's rows
+        # neither come from nor end up in the configured ones
+        private = {
+            alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'loadtest-%s' % alias}
+            for alias in settings.CACHES
+        }
+        with override_settings(ALLOWED_HOSTS=['testserver'], THROTTLE=throttle,
+                               CACHES=private), temporary_database():
+            try:
+                report = loadtest.run(
+                    users=options['users'],
+                    posts_per_user=options['posts'],
+                    requests=options['requests'],
+                    concurrency=options['concurrency'],
+                    seed_value=options['seed'],
+                )
+            finally:
+                for alias in private:
+                    caches[alias].clear()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,200 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+MetricsMiddleware records, per route and method, histograms of the total
+latency, the time spent in SQL and the number of queries, the time spent
+authenticating and serializing, and the response size.  SQL is timed with
+`execute_wrapper`, authentication by CachedJSONWebTokenAuthentication and
+serialization by the `timed('serialize')` blocks around serializers plus
+the rendering of DRF responses.
+
+Other modules export counters by registering a collector, a callable
+returning `(name, type, help, [(labels, value), ...])` tuples.  Everything
+is kept per process; scrape each worker.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+HISTOGRAMS = {
+    'api_request_duration_seconds': ('Total time to answer the request', LATENCY_BUCKETS),
+    'api_request_db_seconds': ('Time spent in SQL', LATENCY_BUCKETS),
+    'api_request_queries': ('Number of SQL queries', QUERY_BUCKETS),
+    'api_request_auth_seconds': ('Time spent authenticating', LATENCY_BUCKETS),
+    'api_request_serialize_seconds': ('Time spent serializing and rendering', LATENCY_BUCKETS),
+    'api_response_size_bytes': ('Size of the response body', SIZE_BUCKETS),
+}
+
+_state = threading.local()
+_lock = threading.Lock()
+_histograms = {}
+_requests = {}
+collectors = []
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def observe(name, labels, value):
+    key = (name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(HISTOGRAMS[name][1])
+        histogram.observe(value)
+
+
+def current():
+    """Timings of the request being handled by this thread, or None"""
+    return getattr(_state, 'request', None)
+
+
+def add(name, seconds):
+    timings = current()
+    if timings is not None:
+        timings[name] += seconds
+
+
+@contextmanager
+def timed(name):
+    """Add the time spent in the block to the current request's `name`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - start)
+
+
+def register(collector):
+    if collector not in collectors:
+        collectors.append(collector)
+    return collector
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _requests.clear()
+
+
+def format_labels(labels):
+    return '{%s}' % ','.join(
+        '%s="%s"' % (name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels
+    )
+
+
+def exposition():
+    """Every metric in the Prometheus text format"""
+    with _lock:
+        histograms = sorted(
+            (name, labels, list(histogram.counts), histogram.sum, histogram.count)
+            for (name, labels), histogram in _histograms.items()
+        )
+        requests = sorted(_requests.items())
+
+    lines = ['# HELP api_requests_total Requests answered',
+             '# TYPE api_requests_total counter']
+    for labels, value in requests:
+        lines.append('api_requests_total%s %d' % (format_labels(labels), value))
+
+    for name, (help_text, buckets) in sorted(HISTOGRAMS.items()):
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s histogram' % name)
+        for metric, labels, counts, total, count in histograms:
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append('%s_bucket%s %d' % (
+                    name, format_labels(labels + (('le', bound),)), cumulative))
+            lines.append('%s_sum%s %s' % (name, format_labels(labels), repr(total)))
+            lines.append('%s_count%s %d' % (name, format_labels(labels), count))
+
+    for collector in collectors:
+        for name, kind, help_text, samples in collector():
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for labels, value in samples:
+                lines.append('%s%s %s' % (name, format_labels(tuple(labels)) if labels else '', value))
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Record the metrics of every request"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        timings = _state.request = {'db': 0.0, 'queries': 0, 'auth': 0.0, 'serialize': 0.0}
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(self.time_query))
+                response = self.get_response(request)
+        finally:
+            _state.request = None
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        labels = (('route', match.route if match else 'unmatched'), ('method', request.method))
+        observe('api_request_duration_seconds', labels, elapsed)
+        observe('api_request_db_seconds', labels, timings['db'])
+        observe('api_request_queries', labels, timings['queries'])
+        observe('api_request_auth_seconds', labels, timings['auth'])
+        observe('api_request_serialize_seconds', labels, timings['serialize'])
+        if not response.streaming:
+            observe('api_response_size_bytes', labels, len(response.content))
+        with _lock:
+            key = labels + (('status', response.status_code),)
+            _requests[key] = _requests.get(key, 0) + 1
+
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this returns
+        timings = current()
+        if timings is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings['serialize'] += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def time_query(self, execute, sql, params, many, context):
+        timings = current()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if timings is not None:
+                timings['db'] += time.perf_counter() - start
+                timings['queries'] += 1
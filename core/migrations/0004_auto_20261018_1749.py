@@ -0,0 +1,21 @@
+# Generated by Django 2.2.2 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_auto_20261018_1747'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['created_at', 'id'], name='core_post_created_ab910c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='core_post_user_id_3b5ee4_idx'),
+        ),
+    ]
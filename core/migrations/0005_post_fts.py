@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def install(apps, schema_editor):
+    from post import search
+    search.install(schema_editor)
+
+
+def uninstall(apps, schema_editor):
+    from post import search
+    search.uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_auto_20261018_1749'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
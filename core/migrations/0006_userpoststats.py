@@ -0,0 +1,37 @@
+# Generated by Django 2.2.2 on 2026-10-18 18:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    UserPostStats = apps.get_model('core', 'UserPostStats')
+    rows = Post.objects.order_by().values('user_id').annotate(
+        post_count=models.Count('id'),
+        last_created_at=models.Max('created_at'),
+        last_updated_at=models.Max('updated_at'),
+    )
+    UserPostStats.objects.bulk_create(
+        [UserPostStats(**row) for row in rows.iterator()], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_post_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPostStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='post_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('last_created_at', models.DateTimeField(blank=True, null=True)),
+                ('last_updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
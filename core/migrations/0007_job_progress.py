@@ -0,0 +1,18 @@
+# Generated by Django 2.2.2 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_userpoststats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='progress',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -2,7 +2,9 @@ from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
     PermissionsMixin
-from user.clearbit import clearbitCheck
+from django.utils import timezone
+
+from .fields import CompressedTextField
 
 
 class UserManager(BaseUserManager):
@@ -12,17 +14,12 @@ class UserManager(BaseUserManager):
         if not email:
             raise ValueError('Users must have an email address')
 
-        user_data = clearbitCheck(email=email)
-        if user_data:
-            extra_fields['fullName'] = user_data['fullName']
-            extra_fields['givenName'] = user_data['givenName']
-            extra_fields['location'] = user_data['location']
-            extra_fields['timeZone'] = user_data['timeZone']
-
         user = self.model(email=self.normalize_email(email), **extra_fields)
         user.set_password(password)
         user.save(using=self._db)
 
+        Job.objects.using(self._db).create(kind=Job.KIND_ENRICH, user=user)
+
         return user
 
     def create_superuser(self, email, password, **extra_fields):
@@ -64,5 +61,112 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class ArchivedPost(models.Model):
+    """A post moved out of core_post by archival, see post/archive.py"""
+    id = models.IntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    title = models.CharField(max_length=50)
+    content = CompressedTextField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class PostChange(models.Model):
+    """A write to a post, in commit order, see post/changes.py"""
+    post_id = models.IntegerField()
+    # Kept after the user is gone so their posts' tombstones stay readable
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    deleted = models.BooleanField(default=False)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'id'])]
+
+    def __str__(self):
+        return '%s %s #%s' % ('delete' if self.deleted else 'upsert', self.post_id, self.pk)
+
+
+class UserPostStats(models.Model):
+    """Post count and latest post times of a user, see post/stats.py"""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='post_stats',
+    )
+    post_count = models.PositiveIntegerField(default=0)
+    last_created_at = models.DateTimeField(null=True, blank=True)
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return '%s: %d posts' % (self.user_id, self.post_count)
+
+
+class Job(models.Model):
+    """Background job processed by the `jobs` management command"""
+    KIND_ENRICH = 'enrich'
+    KIND_PURGE_USER = 'purge_user'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    kind = models.CharField(max_length=50)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        on_delete=models.SET_NULL,
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    progress = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return '%s #%s (%s)' % (self.kind, self.pk, self.status)
@@ -0,0 +1,151 @@
+"""
+On-demand profiling of single requests for staff users.
+
+A staff user adds ``X-Profile: 1`` or ``?profile=1`` to any request and
+gets back, with a 200, a JSON document holding the original status and
+response, a cProfile summary and every SQL statement with its duration
+and the project code that issued it.  Streaming responses are reported
+without their body.  Requests without the flag only pay
+for the check of the flag; flagged requests from anyone else are served
+normally.
+"""
+import cProfile
+import json
+import os
+import pstats
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework.exceptions import APIException
+
+from user.authentication import CachedJSONWebTokenAuthentication
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = 'profile'
+FLAG_VALUES = ('1', 'true', 'yes')
+
+
+def is_requested(request):
+    value = request.META.get(HEADER) or request.GET.get(QUERY_PARAM) or ''
+    return value.lower() in FLAG_VALUES
+
+
+def is_staff(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        result = CachedJSONWebTokenAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def short_path(filename):
+    """`filename` relative to the project, or to its package directory"""
+    if filename.startswith(settings.BASE_DIR + os.sep):
+        return os.path.relpath(filename, settings.BASE_DIR)
+    marker = os.sep + 'site-packages' + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def project_stack():
+    """The frames of project code on the current stack, innermost first"""
+    frames = []
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(settings.BASE_DIR + os.sep) and frame.filename != __file__:
+            frames.append('%s:%d in %s' % (short_path(frame.filename), frame.lineno, frame.name))
+            if len(frames) == settings.PROFILING_STACK_DEPTH:
+                break
+    return frames
+
+
+def function_stats(profiler):
+    stats = pstats.Stats(profiler).sort_stats('cumulative')
+    rows = []
+    for function in stats.fcn_list[:settings.PROFILING_TOP_FUNCTIONS]:
+        primitive_calls, calls, total, cumulative, _ = stats.stats[function]
+        filename, lineno, name = function
+        rows.append({
+            'function': '%s:%d(%s)' % (short_path(filename), lineno, name),
+            'calls': calls if calls == primitive_calls else '%d/%d' % (calls, primitive_calls),
+            'tottime_ms': round(total * 1000, 3),
+            'cumtime_ms': round(cumulative * 1000, 3),
+        })
+    return rows
+
+
+def response_data(response):
+    if response.streaming:
+        # Reading it could take as long as the stream lasts, or forever
+        return None
+    content = response.content
+    if response.get('Content-Type', '').startswith('application/json') and content:
+        return json.loads(content.decode(response.charset))
+    return content.decode(response.charset, errors='replace')
+
+
+class ProfilingMiddleware:
+    """Profile requests flagged by staff users"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not (settings.PROFILING_ENABLED and is_requested(request) and is_staff(request)):
+            return self.get_response(request)
+
+        queries = []
+
+        def record(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'params': None if many else [str(param) for param in params or ()],
+                    'ms': round((time.perf_counter() - start) * 1000, 3),
+                    'stack': project_stack(),
+                })
+
+        profiler = cProfile.Profile()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(record))
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+                data = response_data(response)
+            finally:
+                profiler.disable()
+            elapsed = time.perf_counter() - start
+        if response.streaming:
+            response.close()
+
+        report = {
+            'status': response.status_code,
+            'content_type': response.get('Content-Type'),
+            'data': data,
+            'profile': {
+                'total_ms': round(elapsed * 1000, 3),
+                'sql': {
+                    'count': len(queries),
+                    'total_ms': round(sum(query['ms'] for query in queries), 3),
+                    'queries': queries,
+                },
+                'functions': function_stats(profiler),
+            },
+        }
+        if response.streaming:
+            report['note'] = ('Streaming response: its body was not read and the '
+                              'profile stops where the body would start.')
+        return JsonResponse(report, json_dumps_params={'default': str})
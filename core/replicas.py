@@ -0,0 +1,176 @@
+"""
+Read replica routing.
+
+Views using ReplicaReadMixin send the queries of their safe-method
+requests to one of the aliases in DATABASE_REPLICAS['ALIASES']; everything
+else - writes, unsafe requests, management commands, the job worker - uses
+the primary.  After a user's own write, their reads stay on the primary
+for DATABASE_REPLICAS['STICKY_SECONDS'] so they see their own changes
+despite replication lag.  A replica that can't be connected to is skipped
+for DATABASE_REPLICAS['RETRY_SECONDS'] and reads fall back to the primary
+when no replica is healthy; one that fails in the middle of a request is
+marked down and the request is run again.
+
+The sticky window is kept in the default cache, which has to be shared by
+all worker processes: with a per-process cache a read after a write that
+lands on another process goes to a replica anyway.
+"""
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+_health = {}
+_health_lock = threading.Lock()
+
+LAST_WRITE_KEY = 'db-replicas:last-write'
+
+
+def get_aliases():
+    return list(settings.DATABASE_REPLICAS['ALIASES'])
+
+
+def reading():
+    """True while the current request may read from a replica"""
+    return getattr(_state, 'replicas', False)
+
+
+def set_reading(enabled):
+    _state.replicas = enabled
+    _state.alias = None
+
+
+def current_replica():
+    """The replica the current request reads from, if any"""
+    alias = getattr(_state, 'alias', None) if reading() else None
+    return alias if alias != DEFAULT_DB_ALIAS else None
+
+
+def pin_key(user):
+    return 'db-replicas:pin:%s' % user.pk
+
+
+def pin(user):
+    """Keep the user's reads on the primary for the sticky window"""
+    sticky = settings.DATABASE_REPLICAS['STICKY_SECONDS']
+    cache.set(LAST_WRITE_KEY, time.time(), sticky)
+    if user is not None and user.is_authenticated:
+        cache.set(pin_key(user), True, sticky)
+
+
+def is_pinned(user):
+    return bool(user is not None and user.is_authenticated and cache.get(pin_key(user)))
+
+
+def recently_written():
+    """True while replicas may still lag behind the last write"""
+    return cache.get(LAST_WRITE_KEY) is not None
+
+
+def check(alias):
+    """Whether the replica accepts connections"""
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except DatabaseError as exc:
+        logger.warning('Replica %s is unavailable: %s', alias, exc)
+        return False
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    with _health_lock:
+        healthy, checked_at = _health.get(alias, (None, None))
+    if healthy is not None and now - checked_at < settings.DATABASE_REPLICAS['RETRY_SECONDS']:
+        return healthy
+
+    healthy = check(alias)
+    with _health_lock:
+        _health[alias] = (healthy, now)
+    return healthy
+
+
+def mark_down(alias):
+    with _health_lock:
+        _health[alias] = (False, time.monotonic())
+
+
+def reset_health():
+    with _health_lock:
+        _health.clear()
+
+
+def choose_replica():
+    """A healthy replica alias, or None to read from the primary"""
+    aliases = get_aliases()
+    random.shuffle(aliases)
+    for alias in aliases:
+        if is_healthy(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    """Route reads to a replica while the request allows it"""
+
+    def db_for_read(self, model, **hints):
+        if not reading():
+            return None
+        alias = getattr(_state, 'alias', None)
+        if alias is None:
+            # One replica per request so its reads are consistent
+            alias = _state.alias = choose_replica() or DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS} | set(get_aliases())
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_aliases():
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Read from a replica on safe requests, pin the user after writes"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user):
+            set_reading(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin(getattr(request, 'user', None))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            while True:
+                try:
+                    return super().dispatch(request, *args, **kwargs)
+                except OperationalError as exc:
+                    alias = current_replica()
+                    if alias is None:
+                        raise
+                    # Safe requests can run again; the next one skips this
+                    # replica and ends up on the primary when none is left.
+                    logger.warning('Replica %s failed, retrying: %s', alias, exc)
+                    mark_down(alias)
+        finally:
+            set_reading(False)
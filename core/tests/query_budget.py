@@ -0,0 +1,29 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """TestCase mixin asserting that an endpoint has a fixed query count"""
+
+    def assertQueryBudget(self, budget, request, grow, sizes=(1, 10)):
+        """Call grow(n) then request() for each size in sizes
+
+        Fails when request() issues more than `budget` queries, or when the
+        count changes as rows are added, which is the signature of an N+1.
+        """
+        counts = []
+        for size in sizes:
+            grow(size)
+            with CaptureQueriesContext(connection) as queries:
+                res = request()
+            self.assertLess(res.status_code, 400)
+            counts.append(len(queries))
+
+        self.assertEqual(
+            len(set(counts)), 1,
+            'Query count grows with result size: %s for %s rows' % (counts, sizes)
+        )
+        self.assertLessEqual(
+            counts[0], budget,
+            '%d queries, budget is %d' % (counts[0], budget)
+        )
@@ -0,0 +1,44 @@
+from django.test import TestCase, RequestFactory
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+
+from core import models
+from core.admin import UserAdmin
+
+
+class UserAdminTests(TestCase):
+    """Test deleting users from the admin"""
+
+    def setUp(self):
+        self.admin = UserAdmin(get_user_model(), AdminSite())
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.staff = get_user_model().objects.create_user(
+            email='staff@gmail.com',
+            password='test123',
+            username='staff',
+            is_staff=True,
+        )
+        self.staff.user_permissions.add(Permission.objects.get(codename='delete_user'))
+
+    def deleted_objects(self):
+        request = RequestFactory().post('/')
+        request.user = get_user_model().objects.get(pk=self.staff.pk)
+        return self.admin.get_deleted_objects([self.user], request)
+
+    def test_deleting_posts_needs_permission(self):
+        """Test that staff who can't delete posts can't delete their authors"""
+        _, _, perms_needed, _ = self.deleted_objects()
+        self.assertEqual(perms_needed, set())
+
+        models.Post.objects.create(user=self.user, title='Title', content='Content')
+        _, _, perms_needed, _ = self.deleted_objects()
+        self.assertEqual(perms_needed, {'post'})
+
+        self.staff.user_permissions.add(Permission.objects.get(codename='delete_post'))
+        _, _, perms_needed, _ = self.deleted_objects()
+        self.assertEqual(perms_needed, set())
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+import time
+
+from django.test import TransactionTestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework_jwt.settings import api_settings
+from core import models
+from core.asgi import ASGIHandler
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+
+class ASGIHandlerTests(TransactionTestCase):
+    """Test that the ASGI application answers like the WSGI one"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.token = jwt_encode_handler(jwt_payload_handler(self.user))
+        self.post = models.Post.objects.create(
+            user=self.user, title='Unicode é', content='Content')
+        models.Post.objects.create(user=self.user, title='Second', content='Content')
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        self.application = ASGIHandler(max_workers=2)
+
+    def tearDown(self):
+        self.application.executor.shutdown()
+
+    def request(self, method, path, query=b'', body=b'', headers=()):
+        """Run one request through the ASGI application"""
+        scope = {
+            'type': 'http',
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'query_string': query,
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', ('Bearer ' + self.token).encode()),
+            ] + list(headers),
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 1234),
+        }
+        messages = [{'type': 'http.request', 'body': body[:5], 'more_body': True},
+                    {'type': 'http.request', 'body': body[5:], 'more_body': False}]
+        sent = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            # Like a server, wait until the client disconnects
+            await asyncio.sleep(3600)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+
+        start = sent[0]
+        self.assertEqual(start['type'], 'http.response.start')
+        headers = {name.decode().lower(): value.decode() for name, value in start['headers']}
+        content = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertFalse(sent[-1].get('more_body', False))
+        return start['status'], headers, content
+
+    def assertSameResponse(self, path, query=''):
+        status, headers, content = self.request('GET', path, query.encode())
+        django_cache.clear()
+        expected = self.client.get(path + ('?' + query if query else ''))
+
+        self.assertEqual(status, expected.status_code)
+        self.assertEqual(content, expected.content)
+        self.assertEqual(headers['content-type'], expected['Content-Type'])
+        if expected.has_header('ETag'):
+            self.assertEqual(headers['etag'], expected['ETag'])
+
+    def test_list_views(self):
+        """Test the post listings through ASGI"""
+        self.assertSameResponse(reverse('post:show-posts'))
+        self.assertSameResponse(reverse('post:show-posts'), 'page_size=1&fields=id,title')
+        self.assertSameResponse(reverse('post:post-username', kwargs={'username': 'name'}))
+
+    def test_detail_view(self):
+        """Test a post and a missing post through ASGI"""
+        self.assertSameResponse(reverse('post:post-detail', kwargs={'pk': self.post.id}))
+        self.assertSameResponse(reverse('post:post-detail', kwargs={'pk': 0}))
+
+    def test_conditional_get(self):
+        """Test that validators work through ASGI"""
+        path = reverse('post:post-detail', kwargs={'pk': self.post.id})
+        _, headers, _ = self.request('GET', path)
+
+        status, _, content = self.request(
+            'GET', path, headers=[(b'if-none-match', headers['etag'].encode())])
+
+        self.assertEqual(status, 304)
+        self.assertEqual(content, b'')
+
+    def test_post_body(self):
+        """Test that a body split over several messages reaches the view"""
+        body = json.dumps({'title': 'Created', 'content': 'Through ASGI'}).encode()
+        status, _, content = self.request(
+            'POST', reverse('post:create-post'), body=body,
+            headers=[(b'content-type', b'application/json')])
+
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(content.decode())['title'], 'Created')
+        self.assertTrue(models.Post.objects.filter(title='Created').exists())
+
+    def test_streaming_response(self):
+        """Test that streamed exports arrive complete"""
+        status, _, content = self.request('GET', reverse('post:export', kwargs={'fmt': 'ndjson'}))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(len(content.decode().splitlines()), 2)
+
+    def test_slow_clients_do_not_hold_threads(self):
+        """Test that clients slow to send their request share the pool"""
+        path = reverse('post:show-posts')
+        statuses = []
+
+        async def client():
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'',
+                'headers': [(b'host', b'testserver'),
+                            (b'authorization', ('Bearer ' + self.token).encode())],
+            }
+
+            async def receive():
+                await asyncio.sleep(0.2)
+                return {'type': 'http.request', 'body': b''}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await self.application(scope, receive, send)
+
+        async def main():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(*[client() for _ in range(50)])
+            return loop.time() - start
+
+        elapsed = asyncio.run(main())
+
+        self.assertEqual(statuses, [200] * 50)
+        # 50 clients waiting 0.2s each on 2 threads would take 5s
+        self.assertLess(elapsed, 3)
+
+    def test_disconnect_stops_streaming(self):
+        """Test that a client going away stops and closes the response"""
+        closed = threading.Event()
+
+        class Endless:
+            def __iter__(self):
+                while True:
+                    time.sleep(0.01)
+                    yield b'chunk'
+
+            def close(self):
+                closed.set()
+
+        def endless(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Endless()
+
+        self.application.wsgi = endless
+        sent = []
+        messages = [{'type': 'http.request', 'body': b''}]
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.1)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'',
+                 'headers': [(b'host', b'testserver')]}
+        asyncio.run(asyncio.wait_for(self.application(scope, receive, send), 5))
+
+        self.assertTrue(closed.is_set())
+        self.assertTrue(sent[-1].get('more_body'))
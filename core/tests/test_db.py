@@ -0,0 +1,90 @@
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections, transaction
+
+from core import db, models
+from core.db import retry_on_locked
+
+
+class SqliteTuningTests(TestCase):
+    """Test the SQLite pragmas and the locked database retries"""
+
+    def test_pragmas_applied_to_file_databases(self):
+        """Test that new connections to a SQLite file use WAL"""
+        with tempfile.TemporaryDirectory() as directory:
+            connections.databases['test_file'] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(directory, 'db.sqlite3'),
+            }
+            connections.ensure_defaults('test_file')
+            try:
+                with connections['test_file'].cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+                    cursor.execute('PRAGMA synchronous')
+                    synchronous = cursor.fetchone()[0]
+            finally:
+                connections['test_file'].close()
+                delattr(connections._connections, 'test_file')
+                del connections.databases['test_file']
+
+        self.assertEqual(journal_mode, 'wal')
+        self.assertEqual(synchronous, 1)
+
+    @override_settings(SQLITE_LOCK_RETRIES=2, SQLITE_LOCK_BACKOFF_SECONDS=0)
+    def test_retries_locked_writes(self):
+        """Test that writes are run again while the database is locked"""
+        calls = []
+
+        @retry_on_locked
+        def write():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        with patch('core.db.transaction.get_connection') as get_connection:
+            get_connection.return_value.in_atomic_block = False
+            self.assertEqual(write(), 'done')
+            self.assertEqual(len(calls), 3)
+
+            calls.clear()
+            with override_settings(SQLITE_LOCK_RETRIES=1):
+                with self.assertRaises(OperationalError):
+                    write()
+            self.assertEqual(len(calls), 2)
+
+    @override_settings(SQLITE_LOCK_RETRIES=2, SQLITE_LOCK_BACKOFF_SECONDS=0)
+    def test_no_retry_inside_transaction_or_other_errors(self):
+        """Test that only whole transactions and lock errors are retried"""
+        calls = []
+
+        @retry_on_locked
+        def write(message):
+            calls.append(1)
+            raise OperationalError(message)
+
+        with transaction.atomic():
+            with self.assertRaises(OperationalError):
+                write('database is locked')
+        with patch('core.db.transaction.get_connection') as get_connection:
+            get_connection.return_value.in_atomic_block = False
+            with self.assertRaises(OperationalError):
+                write('no such table: core_post')
+
+        self.assertEqual(len(calls), 2)
+
+    def test_delete_unreferenced(self):
+        """Test that only models nothing points to are deleted without the collector"""
+        user = get_user_model().objects.create_user(
+            email='test@gmail.com', password='test123', username='name')
+        models.Post.objects.create(user=user, title='Title', content='Content')
+
+        self.assertEqual(db.delete_unreferenced(models.Post.objects.all()), 1)
+        self.assertFalse(models.Post.objects.exists())
+        with self.assertRaises(ValueError):
+            db.delete_unreferenced(get_user_model().objects.all())
@@ -0,0 +1,185 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.db import connections
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Job, Post
+from post.views import CreatePost
+
+CREATE_POST_URL = reverse('post:create-post')
+CREATE_USER_URL = reverse('user:create')
+
+
+class IdempotencyTests(TestCase):
+    """Test replaying creates that repeat an Idempotency-Key"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_post(self, key, title='Title', client=None):
+        return (client or self.client).post(
+            CREATE_POST_URL, {'title': title, 'content': 'Content'}, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_first_response(self):
+        """Test that a retry returns the first response without a query"""
+        first = self.create_post('key-1')
+
+        with self.assertNumQueries(0):
+            retry = self.create_post('key-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_other_keys_and_requests_without_key(self):
+        self.create_post('key-1')
+        self.create_post('key-2')
+        self.client.post(CREATE_POST_URL, {'title': 'Title', 'content': 'Content'})
+        self.client.post(CREATE_POST_URL, {'title': 'Title', 'content': 'Content'})
+
+        self.assertEqual(Post.objects.count(), 4)
+
+    def test_keys_are_per_user(self):
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='test123', username='other')
+        client = APIClient()
+        client.force_authenticate(user=other)
+
+        self.create_post('key-1')
+        res = self.create_post('key-1', client=client)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(res.has_header('Idempotent-Replayed'))
+        self.assertEqual(Post.objects.filter(user=other).count(), 1)
+
+    def test_reused_key_with_other_body(self):
+        self.create_post('key-1')
+
+        res = self.create_post('key-1', title='Other')
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_errors_are_replayed_but_not_server_errors(self):
+        """Test that client errors are kept and a failed attempt can be retried"""
+        res = self.client.post(CREATE_POST_URL, {'title': 'x' * 51, 'content': 'Content'},
+                               HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with patch.object(CreatePost, 'perform_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.create_post('key-2')
+        res = self.create_post('key-2')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_signup_retry_creates_one_user(self):
+        """Test that a retried signup creates one user and one lookup job"""
+        payload = {'email': 'new@gmail.com', 'password': 'test123', 'username': 'new'}
+        client = APIClient()
+
+        first = client.post(CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY='signup-1')
+        retry = client.post(CREATE_USER_URL, payload, HTTP_IDEMPOTENCY_KEY='signup-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(get_user_model().objects.filter(email='new@gmail.com').count(), 1)
+        self.assertEqual(Job.objects.filter(user__email='new@gmail.com').count(), 1)
+
+    def test_anonymous_keys_are_per_address(self):
+        """Test that anonymous clients elsewhere can't collide on a key"""
+        client = APIClient()
+        for index, address in enumerate(('10.0.0.1', '10.0.0.2')):
+            res = client.post(CREATE_USER_URL, {
+                'email': 'new%d@gmail.com' % index, 'password': 'test123',
+                'username': 'new%d' % index,
+            }, HTTP_IDEMPOTENCY_KEY='signup-1', REMOTE_ADDR=address)
+
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            self.assertFalse(res.has_header('Idempotent-Replayed'))
+
+    def test_key_length(self):
+        res = self.create_post('k' * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IDEMPOTENCY=dict(ENABLED=True, ALIAS='default', TTL=60,
+                                        LOCK_SECONDS=60, WAIT_SECONDS=0.1))
+    def test_request_in_flight(self):
+        """Test that a retry gives up with a 409 while the first still runs"""
+        original = CreatePost.perform_create
+        retries = []
+
+        def create_and_retry(view, serializer):
+            retries.append(self.create_post('key-1'))
+            return original(view, serializer)
+
+        with patch.object(CreatePost, 'perform_create', create_and_retry):
+            first = self.create_post('key-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retries[0].status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Post.objects.count(), 1)
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    """Test that concurrent requests with one key do the work once"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+
+    def test_concurrent_duplicates(self):
+        original = CreatePost.perform_create
+
+        def slow_create(view, serializer):
+            time.sleep(0.3)
+            return original(view, serializer)
+
+        responses = []
+
+        def send():
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                responses.append(client.post(
+                    CREATE_POST_URL, {'title': 'Title', 'content': 'Content'},
+                    HTTP_IDEMPOTENCY_KEY='key-1'))
+            finally:
+                connections.close_all()
+
+        with patch.object(CreatePost, 'perform_create', slow_create):
+            threads = [threading.Thread(target=send) for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([res.status_code for res in responses], [201] * 3)
+        self.assertEqual(len({res.data['id'] for res in responses}), 1)
+        self.assertEqual(
+            sorted(res.has_header('Idempotent-Replayed') for res in responses),
+            [False, True, True])
+        self.assertEqual(Post.objects.count(), 1)
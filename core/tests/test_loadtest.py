@@ -0,0 +1,43 @@
+import random
+
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+from django.core.cache import cache as django_cache
+
+from core import loadtest
+
+
+class LoadTestTests(TransactionTestCase):
+    """Test the load test harness"""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
+        self.assertIsNone(loadtest.percentile([], 50))
+
+    def test_titles_are_skewed(self):
+        """Test that a few title words are much more common than the rest"""
+        rng = random.Random(0)
+        counts = {}
+        for word in loadtest.words(rng, 5000):
+            counts[word] = counts.get(word, 0) + 1
+
+        self.assertGreater(counts['python'], 10 * counts.get('benchmark', 1))
+
+    @override_settings(ALLOWED_HOSTS=['testserver'],
+                       THROTTLE=dict(settings.THROTTLE, ENABLED=False))
+    def test_run_reports_every_route(self):
+        """Test that a small run covers the routes without errors"""
+        django_cache.clear()
+        # One worker: the in-memory test database locks whole tables
+        report = loadtest.run(users=2, posts_per_user=5, requests=200, concurrency=1)
+
+        self.assertEqual(report['total']['count'], 200)
+        self.assertEqual(report['total']['errors'], 0)
+        for summary in report['routes'].values():
+            self.assertLessEqual(summary['p50_ms'], summary['p99_ms'])
+        self.assertIn('GET post:show-posts', report['routes'])
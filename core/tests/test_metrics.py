@@ -0,0 +1,85 @@
+import re
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import metrics, models
+
+METRICS_URL = reverse('metrics')
+ROUTE = 'route="api/post/like/<str:title>/",method="GET"'
+
+
+class MetricsTests(TestCase):
+    """Test the request metrics and their scrape endpoint"""
+
+    def setUp(self):
+        django_cache.clear()
+        metrics.reset()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.staff = get_user_model().objects.create_superuser(
+            email='staff@gmail.com',
+            password='test123',
+            username='staff'
+        )
+        models.Post.objects.create(user=self.user, title='Some title', content='Content')
+        self.client = APIClient()
+
+    def scrape(self):
+        self.client.force_authenticate(user=self.staff)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        return res.content.decode()
+
+    def sample(self, text, name, labels):
+        match = re.search(r'^%s\{%s\} (\S+)$' % (re.escape(name), re.escape(labels)), text, re.M)
+        self.assertIsNotNone(match, '%s{%s} missing' % (name, labels))
+        return float(match.group(1))
+
+    @override_settings(POST_CACHE={'ENABLED': True, 'ALIAS': 'default', 'TIMEOUT': 300})
+    def test_records_route_histograms(self):
+        """Test that latency, SQL, serialization and size are recorded per route"""
+        self.client.force_authenticate(user=self.user)
+        for _ in range(2):
+            django_cache.clear()
+            self.client.get(reverse('post:post-like', kwargs={'title': 'title'}))
+
+        text = self.scrape()
+
+        self.assertEqual(self.sample(text, 'api_request_duration_seconds_count', ROUTE), 2)
+        self.assertEqual(self.sample(
+            text, 'api_requests_total', ROUTE + ',status="200"'), 2)
+        self.assertGreater(self.sample(text, 'api_request_queries_sum', ROUTE), 0)
+        self.assertGreater(self.sample(text, 'api_request_db_seconds_sum', ROUTE), 0)
+        self.assertGreater(self.sample(text, 'api_request_serialize_seconds_sum', ROUTE), 0)
+        self.assertGreater(self.sample(text, 'api_response_size_bytes_sum', ROUTE), 0)
+        self.assertEqual(self.sample(
+            text, 'api_request_duration_seconds_bucket', ROUTE + ',le="+Inf"'), 2)
+        self.assertIn('post_cache_misses_total{endpoint="PostListLike"} 2', text)
+
+    def test_staff_only(self):
+        """Test that only staff can scrape the metrics"""
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.client.force_authenticate(user=self.user)
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_histogram_buckets(self):
+        """Test that buckets are cumulative"""
+        histogram = metrics.Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(histogram.count, 4)
+        self.assertEqual(histogram.sum, 14.5)
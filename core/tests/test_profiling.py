@@ -0,0 +1,84 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_jwt.settings import api_settings
+from core import models
+
+POST_URL = reverse('post:show-posts')
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+
+class ProfilingTests(TestCase):
+    """Test profiling requests flagged by staff"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.staff = get_user_model().objects.create_superuser(
+            email='staff@gmail.com',
+            password='test123',
+            username='staff'
+        )
+        models.Post.objects.create(user=self.user, title='Some title', content='Content')
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        token = jwt_encode_handler(jwt_payload_handler(user))
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+
+    def test_staff_gets_profile(self):
+        """Test that a flagged staff request returns the profile and the data"""
+        self.authenticate(self.staff)
+        res = self.client.get(POST_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        body = res.json()
+        self.assertEqual(body['status'], 200)
+        self.assertEqual(body['data']['results'][0]['title'], 'Some title')
+        profile = body['profile']
+        self.assertGreater(profile['sql']['count'], 0)
+        query = profile['sql']['queries'][-1]
+        self.assertIn('core_post', query['sql'])
+        self.assertTrue(any(frame.startswith('post/') for frame in query['stack']))
+        self.assertTrue(profile['functions'])
+
+    def test_query_flag_and_error_status(self):
+        """Test ?profile=1 and that the original status is kept"""
+        self.authenticate(self.staff)
+        res = self.client.get(reverse('post:post-detail', kwargs={'pk': 0}), {'profile': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['status'], 404)
+
+    def test_streaming_body_is_not_read(self):
+        """Test that a streaming response is reported without its body"""
+        self.authenticate(self.staff)
+        res = self.client.get(reverse('post:export', kwargs={'fmt': 'ndjson'}), {'profile': '1'})
+
+        body = res.json()
+        self.assertEqual(body['status'], 200)
+        self.assertIsNone(body['data'])
+        self.assertIn('note', body)
+
+    def test_non_staff_is_not_profiled(self):
+        """Test that the flag is ignored for anyone else"""
+        self.authenticate(self.user)
+        res = self.client.get(POST_URL, HTTP_X_PROFILE='1')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('profile', res.data)
+        self.assertIn('results', res.data)
+
+        self.client.credentials()
+        res = self.client.get(POST_URL, HTTP_X_PROFILE='1')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
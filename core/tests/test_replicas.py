@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import tempfile
+
+from django.test import TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.db import connections
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models, replicas
+
+POST_URL = reverse('post:show-posts')
+CREATE_POST_URL = reverse('post:create-post')
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Test routing reads to SQLite files standing in for replicas"""
+
+    def setUp(self):
+        django_cache.clear()
+        replicas.reset_health()
+        self.directory = tempfile.TemporaryDirectory()
+        self.aliases = ['test_replica_a', 'test_replica_b']
+        for alias in self.aliases:
+            connections.databases[alias] = {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': os.path.join(self.directory.name, alias + '.sqlite3'),
+            }
+            connections.ensure_defaults(alias)
+        self.settings = override_settings(DATABASE_REPLICAS={
+            'ALIASES': self.aliases,
+            'STICKY_SECONDS': 60,
+            'RETRY_SECONDS': 60,
+        })
+        self.settings.enable()
+
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        models.Post.objects.create(user=self.user, title='Replicated', content='Content')
+        self.replicate()
+
+    def tearDown(self):
+        self.settings.disable()
+        for alias in self.aliases:
+            if hasattr(connections._connections, alias):
+                getattr(connections._connections, alias).close()
+                delattr(connections._connections, alias)
+            del connections.databases[alias]
+        self.directory.cleanup()
+        replicas.reset_health()
+
+    def replicate(self):
+        """Copy the primary into every replica"""
+        connections['default'].ensure_connection()
+        for alias in self.aliases:
+            target = sqlite3.connect(connections.databases[alias]['NAME'])
+            connections['default'].connection.backup(target)
+            target.close()
+
+    def titles(self, res):
+        return [post['title'] for post in res.data['results']]
+
+    def test_reads_go_to_replica(self):
+        """Test that listings are served from a replica"""
+        models.Post.objects.create(user=self.user, title='Not replicated', content='Content')
+
+        res = self.client.get(POST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res), ['Replicated'])
+
+    def test_read_your_own_writes(self):
+        """Test that a user reads from the primary after writing"""
+        res = self.client.post(CREATE_POST_URL, {'title': 'Mine', 'content': 'Content'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(POST_URL)
+        self.assertEqual(self.titles(res), ['Mine', 'Replicated'])
+
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='test123',
+            username='other'
+        )
+        self.client.force_authenticate(user=other)
+        res = self.client.get(POST_URL, {'page_size': 10})
+        self.assertEqual(self.titles(res), ['Replicated'])
+
+        # The stale page read from the replica must not have been cached
+        self.replicate()
+        res = self.client.get(POST_URL, {'page_size': 10})
+        self.assertEqual(self.titles(res), ['Mine', 'Replicated'])
+
+    def test_unavailable_replica_is_skipped(self):
+        """Test that reads fall back when replicas can't be reached"""
+        models.Post.objects.create(user=self.user, title='Not replicated', content='Content')
+        connections.databases['test_replica_a']['NAME'] = os.path.join(
+            self.directory.name, 'missing', 'replica.sqlite3')
+
+        with override_settings(DATABASE_REPLICAS={
+            'ALIASES': ['test_replica_a'],
+            'STICKY_SECONDS': 60,
+            'RETRY_SECONDS': 60,
+        }):
+            res = self.client.get(POST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res), ['Not replicated', 'Replicated'])
+        self.assertFalse(replicas.is_healthy('test_replica_a'))
+
+    def test_failing_replica_falls_back_to_primary(self):
+        """Test that a replica failing mid-request is marked down and skipped"""
+        models.Post.objects.create(user=self.user, title='Not replicated', content='Content')
+        # Connects fine but has no tables
+        connections.databases['test_replica_a']['NAME'] = os.path.join(
+            self.directory.name, 'empty.sqlite3')
+
+        with override_settings(DATABASE_REPLICAS={
+            'ALIASES': ['test_replica_a'],
+            'STICKY_SECONDS': 60,
+            'RETRY_SECONDS': 60,
+        }):
+            self.assertTrue(replicas.is_healthy('test_replica_a'))
+            res = self.client.get(POST_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(res), ['Not replicated', 'Replicated'])
+        self.assertFalse(replicas.is_healthy('test_replica_a'))
+
+    def test_writes_and_commands_use_primary(self):
+        """Test that nothing outside a safe request reads from a replica"""
+        self.assertEqual(models.Post.objects.all().db, 'default')
+        self.assertEqual(replicas.ReplicaRouter().db_for_write(models.Post), 'default')
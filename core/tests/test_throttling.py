@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import throttling
+
+TOKEN_URL = reverse('user:token')
+CREATE_POST_URL = reverse('post:create-post')
+POST_URL = reverse('post:show-posts')
+
+THROTTLE = {
+    'ENABLED': True,
+    'ALIAS': 'default',
+    'RATES': {
+        'token_ip': {'RATE': '60/min', 'BURST': 3},
+        'token_user': {'RATE': '60/min', 'BURST': 2},
+        'signup': {'RATE': '60/min', 'BURST': 3},
+        'post_write': {'RATE': '60/min', 'BURST': 2},
+    },
+}
+
+
+@override_settings(THROTTLE=THROTTLE)
+class ThrottlingTests(TestCase):
+    """Test the token bucket throttles"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+
+    def test_bucket_refills(self):
+        """Test that a bucket allows its burst, then refills at the rate"""
+        with patch('core.throttling.time.time', return_value=1000.0) as now:
+            self.assertEqual([throttling.consume('k', 1000, 3) for _ in range(4)],
+                             [0, 0, 0, 1.0])
+            now.return_value = 1000.5
+            self.assertEqual(throttling.consume('k', 1000, 3), 0.5)
+            now.return_value = 1001.0
+            self.assertEqual(throttling.consume('k', 1000, 3), 0)
+            self.assertGreater(throttling.consume('k', 1000, 3), 0)
+
+            now.return_value = 2000.0
+            self.assertEqual([throttling.consume('k', 1000, 3) for _ in range(3)], [0, 0, 0])
+
+    def test_idle_reset_keeps_a_concurrent_reset(self):
+        """Test that resetting an idle bucket doesn't erase another worker's token"""
+        cache = throttling.get_cache()
+        delete = cache.delete
+
+        def delete_then_race(key):
+            delete(key)
+            # Another worker resets the bucket between the delete and the add
+            cache.add(key, 1000 * 1000 + 1000)
+
+        with patch('core.throttling.time.time', return_value=1000.0):
+            cache.set('k', 1)
+            with patch.object(cache, 'delete', side_effect=delete_then_race):
+                self.assertEqual(throttling.consume('k', 1000, 3), 0)
+            self.assertEqual(cache.get('k'), 1000 * 1000 + 2000)
+
+    def test_token_throttled_per_account(self):
+        """Test that token requests for one account are limited"""
+        payload = {'email': 'test@gmail.com', 'password': 'wrong'}
+        codes = [self.client.post(TOKEN_URL, payload).status_code for _ in range(3)]
+
+        self.assertEqual(codes, [400, 400, 429])
+
+        res = self.client.post(TOKEN_URL, {'email': 'test@gmail.com', 'password': 'test123'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreaterEqual(int(res['Retry-After']), 1)
+
+        res = self.client.post(TOKEN_URL, {'email': 'other@gmail.com', 'password': 'wrong'})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_post_writes_throttled_per_user(self):
+        """Test that post writes are limited per user but reads are not"""
+        self.client.force_authenticate(user=self.user)
+        payload = {'title': 'Title', 'content': 'Content'}
+        codes = [self.client.post(CREATE_POST_URL, payload).status_code for _ in range(3)]
+
+        self.assertEqual(codes, [201, 201, 429])
+        self.assertEqual(self.client.get(POST_URL).status_code, status.HTTP_200_OK)
+
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='test123',
+            username='other'
+        )
+        self.client.force_authenticate(user=other)
+        res = self.client.post(CREATE_POST_URL, payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_counters(self):
+        """Test that decisions are counted for monitoring"""
+        before = throttling.stats().get('signup', {'allowed': 0, 'throttled': 0})
+        for index in range(4):
+            self.client.post(reverse('user:create'), {
+                'email': 'new%d@gmail.com' % index, 'password': 'test123', 'username': 'new'})
+
+        after = throttling.stats()['signup']
+        self.assertEqual(after['allowed'] - before['allowed'], 3)
+        self.assertEqual(after['throttled'] - before['throttled'], 1)
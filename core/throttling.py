@@ -0,0 +1,167 @@
+"""
+Token bucket throttles backed by a shared cache.
+
+Each bucket is a single integer in the cache: the theoretical arrival time
+of the next request in milliseconds (the GCRA formulation of a token
+bucket).  Taking a token is one atomic `incr`, and a refused request
+gives its increment back with `decr`, so every key costs O(1) memory and
+concurrent workers sharing the cache count every token they grant, except
+around the reset of a bucket that sat idle: a request racing with it may
+go uncounted, at most one per concurrent worker.  Limits only hold across
+processes when THROTTLE['ALIAS'] is a cache they all share.
+
+Rates are configured per scope in THROTTLE['RATES'] as a sustained rate
+(DRF's ``"<n>/<period>"`` syntax) and a burst size.  Refused requests get
+DRF's 429 with a Retry-After header.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_counters = defaultdict(lambda: {'allowed': 0, 'throttled': 0})
+_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.THROTTLE['ALIAS']]
+
+
+def parse_rate(rate):
+    """Milliseconds between two tokens for a DRF style rate"""
+    num, period = rate.split('/')
+    return max(1, PERIODS[period[0]] * 1000 // int(num))
+
+
+def consume(key, interval, burst):
+    """Take a token from the bucket at `key`, return the seconds to wait
+
+    Returns 0 when the request may proceed.
+    """
+    cache = get_cache()
+    tolerance = interval * (burst - 1)
+    now = int(time.time() * 1000)
+    timeout = (tolerance + interval) // 1000 + 1
+
+    try:
+        arrival = cache.incr(key, interval)
+    except ValueError:
+        if cache.add(key, now + interval, timeout):
+            return 0
+        arrival = cache.incr(key, interval)
+
+    previous = arrival - interval
+    if previous < now:
+        # The bucket refilled completely while it was idle.  Start it over
+        # with add, so a reset by another worker in the meantime is counted
+        # on rather than overwritten.
+        cache.delete(key)
+        if not cache.add(key, now + interval, timeout):
+            cache.incr(key, interval)
+        return 0
+    if previous - now > tolerance:
+        cache.decr(key, interval)
+        return (previous - tolerance - now) / 1000
+
+    cache.touch(key, timeout)
+    return 0
+
+
+def record(scope, allowed):
+    with _lock:
+        _counters[scope]['allowed' if allowed else 'throttled'] += 1
+
+
+def stats():
+    with _lock:
+        return {scope: dict(counts) for scope, counts in _counters.items()}
+
+
+def collect():
+    """Throttle decisions for core.metrics"""
+    samples = []
+    for scope, counts in sorted(stats().items()):
+        for result, value in sorted(counts.items()):
+            samples.append(((('scope', scope), ('result', result)), value))
+    return [('api_throttle_requests_total', 'counter', 'Throttle decisions', samples)]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Throttle requests per `get_key()` with the bucket of `scope`"""
+    scope = None
+
+    def get_key(self, request, view):
+        """What to throttle the request on, None to let it through"""
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        if not settings.THROTTLE['ENABLED']:
+            return True
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+
+        config = settings.THROTTLE['RATES'][self.scope]
+        digest = hashlib.md5(str(key).encode('utf-8')).hexdigest()
+        wait = consume('throttle:%s:%s' % (self.scope, digest),
+                       parse_rate(config['RATE']), config['BURST'])
+        record(self.scope, allowed=not wait)
+        if wait:
+            self.retry_after = wait
+            return False
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class IPThrottle(TokenBucketThrottle):
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserThrottle(TokenBucketThrottle):
+    """Per user, or per IP for anonymous requests"""
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return 'user:%s' % request.user.pk
+        return 'ip:%s' % self.get_ident(request)
+
+
+class TokenIPThrottle(IPThrottle):
+    scope = 'token_ip'
+
+
+class TokenCredentialThrottle(TokenBucketThrottle):
+    """Per account a token is requested for, whatever the client's IP"""
+    scope = 'token_user'
+
+    def get_key(self, request, view):
+        username = request.data.get(get_user_model().USERNAME_FIELD)
+        if not isinstance(username, str) or not username:
+            return None
+        return username.strip().lower()
+
+
+class SignupThrottle(IPThrottle):
+    scope = 'signup'
+
+
+class PostWriteThrottle(UserThrottle):
+    scope = 'post_write'
+
+    def allow_request(self, request, view):
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
@@ -0,0 +1,15 @@
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+from user.authentication import CachedJSONWebTokenAuthentication
+from . import metrics
+
+
+class MetricsView(APIView):
+    """Request metrics of this process in the Prometheus text format"""
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4')
@@ -0,0 +1,95 @@
+"""
+Archival of old posts to core_archivedpost.
+
+`archive_posts` moves posts created before a cutoff, oldest first, a batch
+per transaction: the rows are copied to ArchivedPost, which keeps their id
+and stores `content` zlib compressed, and deleted from core_post.  Post ids
+are never reused, so an id names the same post in either table.
+
+Reads only see archived posts when asked to with ``?include_archived=1``.
+PostDetail then falls back to the archive when the post isn't live, and
+the listings merge both tables page by page, see KeysetPagination.
+Archived posts are read only.
+"""
+from django.db import transaction
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+
+from core.db import delete_unreferenced
+from core.models import ArchivedPost, Post
+from . import cache
+from .pagination import KeysetPagination
+
+QUERY_PARAM = 'include_archived'
+FLAG_VALUES = ('1', 'true', 'yes')
+
+
+def archive_batch(cutoff, batch_size):
+    """Archive the oldest `batch_size` posts created before `cutoff`"""
+    with transaction.atomic():
+        posts = list(Post.objects.select_related('user').filter(
+            created_at__lt=cutoff).order_by('created_at', 'id')[:batch_size])
+        if not posts:
+            return 0
+        ArchivedPost.objects.bulk_create([
+            ArchivedPost(
+                id=post.id,
+                user_id=post.user_id,
+                title=post.title,
+                content=post.content,
+                created_at=post.created_at,
+                updated_at=post.updated_at,
+            )
+            for post in posts
+        ])
+        delete_unreferenced(Post.objects.filter(id__in=[post.id for post in posts]))
+        cache.invalidate_posts(posts)
+    return len(posts)
+
+
+def archive_posts(cutoff, batch_size):
+    """Archive every post created before `cutoff`, yielding batch sizes"""
+    while True:
+        archived = archive_batch(cutoff, batch_size)
+        if not archived:
+            return
+        yield archived
+
+
+class ArchiveReadMixin:
+    """Let reads of a post view include archived posts when asked to
+
+    Views return the archived counterpart of `get_queryset()` from
+    `get_archive_queryset()`.
+    """
+
+    def include_archived(self):
+        return (self.request.method in SAFE_METHODS
+                and self.request.query_params.get(QUERY_PARAM, '').lower() in FLAG_VALUES)
+
+    def get_archive_queryset(self):
+        raise NotImplementedError('.get_archive_queryset() must be overridden')
+
+    def get_list_queryset(self):
+        queryset = super().get_list_queryset()
+        if not self.include_archived():
+            return queryset
+        # Orderings on annotations, like search relevance, cover live posts only
+        if tuple(getattr(self, 'keyset_ordering', KeysetPagination.ordering)) \
+                != KeysetPagination.ordering:
+            return queryset
+
+        archived = self.prepare_list_queryset(self.filter_queryset(self.get_archive_queryset()))
+        return [queryset, archived]
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if not self.include_archived():
+                raise
+
+        obj = get_object_or_404(self.filter_queryset(self.get_archive_queryset()))
+        self.check_object_permissions(self.request, obj)
+        return obj
@@ -0,0 +1,184 @@
+"""
+Validation and execution of batch post operations.
+
+A batch is a list of operations, each one of::
+
+    {"op": "create", "title": "...", "content": "..."}
+    {"op": "update", "id": 1, "title": "..."}
+    {"op": "delete", "id": 2}
+
+Every operation is validated before anything is written.  If one fails,
+nothing is written and the response lists the errors per item.  Otherwise
+all creates, updates and deletes run in one transaction with one
+bulk_create, one bulk_update and one delete query.
+"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from core.db import delete_unreferenced, retry_on_locked
+from core.models import Post
+from . import cache, changes, events, stats
+from .serializers import PostSerializer
+
+OPERATIONS = ('create', 'update', 'delete')
+
+
+class Batch:
+
+    def __init__(self, request, operations):
+        self.request = request
+        self.operations = operations
+        self.results = [None] * len(operations)
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+
+    @property
+    def has_creates(self):
+        return any(
+            isinstance(operation, dict) and operation.get('op') == 'create'
+            for operation in self.operations
+        )
+
+    def get_queryset(self, ids):
+        """Same ownership rules as PostDetail.get_queryset"""
+        queryset = Post.objects.select_related('user').filter(id__in=ids)
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(user=self.request.user)
+        return queryset
+
+    def error(self, index, code, errors):
+        operation = self.operations[index]
+        op = operation.get('op') if isinstance(operation, dict) else None
+        self.results[index] = {'op': op, 'status': code, 'errors': errors}
+
+    def validate(self):
+        """Validate every operation, return True when all of them are valid"""
+        targets = {}
+        ids = [
+            operation.get('id') for operation in self.operations
+            if isinstance(operation, dict) and operation.get('op') in ('update', 'delete')
+            and type(operation.get('id')) is int
+        ]
+        if ids:
+            targets = {post.pk: post for post in self.get_queryset(ids)}
+
+        seen = set()
+        for index, operation in enumerate(self.operations):
+            if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+                self.error(index, status.HTTP_400_BAD_REQUEST,
+                           {'op': ['Must be one of: %s.' % ', '.join(OPERATIONS)]})
+                continue
+
+            op = operation['op']
+            if op == 'create':
+                serializer = PostSerializer(data=operation)
+                if serializer.is_valid():
+                    self.creates.append((index, serializer))
+                else:
+                    self.error(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+                continue
+
+            pk = operation.get('id')
+            # bools are ints too, and True would find the post with id 1
+            post = targets.get(pk) if type(pk) is int else None
+            if post is None:
+                self.error(index, status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'})
+                continue
+            if pk in seen:
+                self.error(index, status.HTTP_400_BAD_REQUEST,
+                           {'id': ['Post %s appears more than once.' % pk]})
+                continue
+            seen.add(pk)
+
+            if op == 'delete':
+                self.deletes.append((index, post))
+                continue
+
+            serializer = PostSerializer(post, data=operation, partial=True)
+            if serializer.is_valid():
+                self.updates.append((index, serializer))
+            else:
+                self.error(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+
+        valid = all(result is None for result in self.results)
+        if not valid:
+            for index, result in enumerate(self.results):
+                if result is None:
+                    self.error(index, status.HTTP_424_FAILED_DEPENDENCY,
+                               {'detail': 'Not applied because another operation failed.'})
+
+        return valid
+
+    @retry_on_locked
+    def execute(self):
+        """Write every validated operation in a single transaction"""
+        now = timezone.now()
+        user = self.request.user
+
+        with transaction.atomic():
+            created = [Post(user=user, **serializer.validated_data)
+                       for _, serializer in self.creates]
+            if created:
+                Post.objects.bulk_create(created)
+                assign_pks(created, user)
+                stats.record_created(user.pk, created)
+                changes.record(created)
+                # Bulk writes send no signals
+                events.publish_posts(events.CREATED, created)
+
+            updated = []
+            for _, serializer in self.updates:
+                post = serializer.instance
+                for field, value in serializer.validated_data.items():
+                    setattr(post, field, value)
+                post.updated_at = now
+                updated.append(post)
+            if updated:
+                Post.objects.bulk_update(updated, ['title', 'content', 'updated_at'])
+                # Superusers may update the posts of several users
+                for user_id in {post.user_id for post in updated}:
+                    stats.record_updated(user_id, now)
+                changes.record(updated)
+                events.publish_posts(events.UPDATED, updated)
+
+            deleted = [post for _, post in self.deletes]
+            if deleted:
+                changes.record(deleted, deleted=True)
+                # The posts are already loaded, don't let the collector
+                # fetch them again for per-post signals
+                delete_unreferenced(Post.objects.filter(id__in=[post.pk for post in deleted]))
+                events.publish_posts(events.DELETED, deleted)
+                for user_id in {post.user_id for post in deleted}:
+                    stats.record_deleted(
+                        user_id, [post for post in deleted if post.user_id == user_id])
+
+            cache.invalidate_posts(created + updated + deleted)
+
+        for (index, _), post in zip(self.creates, created):
+            self.results[index] = {'op': 'create', 'status': status.HTTP_201_CREATED,
+                                   'data': PostSerializer(post).data}
+        for index, serializer in self.updates:
+            self.results[index] = {'op': 'update', 'status': status.HTTP_200_OK,
+                                   'data': PostSerializer(serializer.instance).data}
+        for index, post in self.deletes:
+            self.results[index] = {'op': 'delete', 'status': status.HTTP_204_NO_CONTENT,
+                                   'id': post.pk}
+
+        return self.results
+
+
+def assign_pks(posts, user):
+    """Fill in the primary keys of freshly bulk created posts
+
+    Backends that can't return them from the INSERT (SQLite before Django
+    4.0) serialize writers, so inside the transaction the newest rows of
+    this user are exactly the ones just inserted.
+    """
+    if posts[0].pk is not None:
+        return
+
+    pks = Post.objects.filter(user=user).order_by('-id').values_list('id', flat=True)[:len(posts)]
+    for post, pk in zip(posts, reversed(list(pks))):
+        post.pk = pk
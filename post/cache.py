@@ -0,0 +1,183 @@
+"""
+Versioned response cache for the post read endpoints.
+
+Cached responses are keyed on the endpoint, its arguments, the query
+string and the version counters the response depends on:
+
+* ``global`` - bumped when a user is saved or deleted, because post
+  payloads embed the author's username
+* ``list`` - bumped on every post write, used by the listings
+* ``user:<username>`` - bumped on writes to that user's posts, used by
+  UserPosts
+* ``post:<pk>`` - bumped on writes to that post, used by PostDetail
+
+Writes never delete entries, they make them unreachable by bumping a
+version, and the old entries expire on their own.  Versions are bumped
+both when the signal fires and again after the transaction commits, so a
+read racing with an uncommitted write can't store stale data under the
+new version.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+
+from core import replicas
+from . import conditional
+
+_counters = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.POST_CACHE['ALIAS']]
+
+
+def version_key(name):
+    # Usernames may hold characters or lengths memcached keys can't
+    return 'post-cache:v:%s' % hashlib.md5(name.encode('utf-8')).hexdigest()
+
+
+def get_versions(names):
+    """Current value of each version counter, creating missing ones"""
+    cache = get_cache()
+    keys = [version_key(name) for name in names]
+    found = cache.get_many(keys)
+
+    versions = []
+    for key in keys:
+        if key not in found:
+            # A fresh counter must not collide with one that was evicted
+            cache.add(key, int(time.time() * 1000))
+            found[key] = cache.get(key)
+        versions.append(found[key])
+
+    return versions
+
+
+def _bump(names):
+    cache = get_cache()
+    for name in names:
+        key = version_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+
+
+def bump(*names):
+    """Invalidate every cached response depending on the given versions"""
+    _bump(names)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(names))
+
+
+def invalidate_posts(posts):
+    """Bump the versions the given posts' responses depend on"""
+    names = {'list'}
+    for post in posts:
+        names.add('post:%s' % post.pk)
+        names.add('user:%s' % post.user.username)
+    bump(*sorted(names))
+
+
+def record(endpoint, hit):
+    with _lock:
+        _counters[endpoint]['hits' if hit else 'misses'] += 1
+
+
+def stats():
+    """Hits, misses and hit ratio per endpoint"""
+    with _lock:
+        result = {}
+        for endpoint, counts in _counters.items():
+            total = counts['hits'] + counts['misses']
+            result[endpoint] = dict(counts, ratio=counts['hits'] / total if total else 0.0)
+        return result
+
+
+def collect():
+    """Hit and miss counters for core.metrics"""
+    counts = stats()
+    return [
+        ('post_cache_%s_total' % kind, 'counter', 'Response cache %s' % kind,
+         [((('endpoint', endpoint),), values[kind]) for endpoint, values in sorted(counts.items())])
+        for kind in ('hits', 'misses')
+    ]
+
+
+class CachedResponseMixin:
+    """Serve GET responses of a post view from the versioned cache
+
+    Views list the version names their response depends on in
+    `get_cache_versions()` and set `cache_per_user` when the response
+    differs between users.
+    """
+    cache_per_user = False
+
+    def get_cache_versions(self):
+        return ['list']
+
+    def get_cache_scope(self):
+        if not self.cache_per_user:
+            return 'all'
+        if self.request.user.is_superuser:
+            return 'superuser'
+        return 'user:%s' % self.request.user.pk
+
+    def get_cache_key(self, request):
+        versions = get_versions(['global'] + self.get_cache_versions())
+        parts = [
+            self.__class__.__name__,
+            request.get_host(),
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            self.get_cache_scope(),
+        ] + [str(version) for version in versions]
+        digest = hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest()
+
+        return 'post-cache:r:%s' % digest
+
+    def get(self, request, *args, **kwargs):
+        if not settings.POST_CACHE['ENABLED']:
+            return super().get(request, *args, **kwargs)
+
+        endpoint = self.__class__.__name__
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            record(endpoint, hit=True)
+            etag, last_modified = cached['validators']
+            if etag is None:
+                return Response(cached['data'])
+
+            not_modified = conditional.evaluate(request, etag, last_modified)
+            if not_modified is not None:
+                return not_modified
+            return Response(
+                cached['data'],
+                headers=conditional.validator_headers(etag, last_modified),
+            )
+
+        record(endpoint, hit=False)
+        response = super().get(request, *args, **kwargs)
+        # A replica may not have the write that bumped the versions yet
+        stale = replicas.current_replica() and replicas.recently_written()
+        if response.status_code == 200 and not stale:
+            last_modified = response.get('Last-Modified')
+            cache.set(key, {
+                'data': response.data,
+                'validators': (
+                    response.get('ETag'),
+                    last_modified and parse_http_date_safe(last_modified),
+                ),
+            }, settings.POST_CACHE['TIMEOUT'])
+
+        return response
@@ -0,0 +1,127 @@
+"""
+Change feed of the posts for incremental sync.
+
+Every post write appends a PostChange row in the transaction making the
+write: the post signals record saves and deletes, wherever they come from,
+and the bulk writes of batches and purges, which send no signals, record
+theirs explicitly.  The row's autoincrement id is a sequence number in commit order,
+since SQLite serializes writers, and deletes leave a row with `deleted`
+set: a tombstone.  A client keeps the token of its last sync and asks for
+the changes after it, which is one index range scan of the changes since,
+whatever the size of the post table.
+
+Several changes to one post within a page come back as one entry, the
+post as it is now or its tombstone.  Posts that are gone (deleted later in
+the feed, or archived) come back as tombstones too.  Changes are pruned
+after POST_CHANGES['RETENTION_DAYS']; older tokens, and tokens from before
+the oldest change still kept, get a 410 and the client has to sync from
+scratch.
+"""
+import base64
+import binascii
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from core.models import Post, PostChange
+
+
+class TokenExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'The sync token is too old, sync from scratch.'
+    default_code = 'token_expired'
+
+
+def record(posts, deleted=False):
+    """Log a write to each of `posts`, which must still have their ids"""
+    now = timezone.now()
+    PostChange.objects.bulk_create([
+        PostChange(post_id=post.pk, user_id=post.user_id, deleted=deleted, changed_at=now)
+        for post in posts
+    ])
+
+
+def record_tombstones(user_id, post_ids):
+    """Log the deletion of posts known only by their ids"""
+    now = timezone.now()
+    PostChange.objects.bulk_create([
+        PostChange(post_id=pk, user_id=user_id, deleted=True, changed_at=now)
+        for pk in post_ids
+    ])
+
+
+def latest():
+    """Sequence number of the last change, 0 when there is none"""
+    return PostChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def encode_token(sequence):
+    token = json.dumps({'s': sequence, 't': int(time.time())}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+
+def decode_token(token):
+    """Sequence number of a token, raising 400 or 410 for unusable ones"""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+        sequence, issued = int(data['s']), int(data['t'])
+    except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error):
+        raise ValidationError({'since': ['Invalid token.']})
+
+    if issued < time.time() - settings.POST_CHANGES['RETENTION_DAYS'] * 86400:
+        raise TokenExpired()
+    return sequence
+
+
+def read(since, user_id=None, limit=None):
+    """Changes after `since` as `(entries, last sequence, has_more)`
+
+    Entries are `(post_id, post)` in the order of their last change, with
+    post None for tombstones.  Raises TokenExpired when changes after
+    `since` have been pruned.
+    """
+    limit = limit or settings.POST_CHANGES['PAGE_SIZE']
+    oldest = PostChange.objects.order_by('id').values_list('id', flat=True).first()
+    if oldest is not None and since < oldest - 1:
+        # The changes right after `since` were pruned
+        raise TokenExpired()
+
+    queryset = PostChange.objects.filter(id__gt=since).order_by('id')
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+
+    changes = list(queryset.values_list('id', 'post_id', 'deleted')[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if not changes:
+        return [], since, False
+
+    last = {}
+    for sequence, post_id, deleted in changes:
+        last.pop(post_id, None)
+        last[post_id] = deleted
+    upserted = [post_id for post_id, deleted in last.items() if not deleted]
+    posts = Post.objects.select_related('user').in_bulk(upserted) if upserted else {}
+
+    return [(post_id, posts.get(post_id)) for post_id in last], changes[-1][0], has_more
+
+
+def prune(batch_size=None):
+    """Delete the changes older than the retention, return how many went"""
+    batch_size = batch_size or settings.POST_CHANGES['PRUNE_BATCH_SIZE']
+    cutoff = timezone.now() - timedelta(days=settings.POST_CHANGES['RETENTION_DAYS'])
+    pruned = 0
+    while True:
+        with transaction.atomic():
+            ids = list(PostChange.objects.filter(changed_at__lt=cutoff).order_by('id')
+                       .values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return pruned
+            PostChange.objects.filter(id__in=ids).delete()
+        pruned += len(ids)
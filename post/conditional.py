@@ -0,0 +1,159 @@
+"""
+HTTP validators for the post endpoints.
+
+A post's ETag is derived from its id, `updated_at` and its author's
+username, which is all a rendered post depends on.  A page's ETag combines
+the validators of its rows and its links; pages have no Last-Modified.
+Requests carrying a matching If-None-Match, or If-Modified-Since for a
+post, get a 304 before anything is serialized,
+and updates honour If-Match / If-Unmodified-Since with a compare-and-swap
+on `updated_at` instead of a lock.
+"""
+import hashlib
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from core import metrics
+from core.db import retry_on_locked
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The post was changed by someone else.'
+    default_code = 'precondition_failed'
+
+
+def post_validator(post):
+    if isinstance(post, dict):
+        return '%s:%s:%s' % (post['id'], post['updated_at'].isoformat(), post['user__username'])
+    return '%s:%s:%s' % (post.pk, post.updated_at.isoformat(), post.user.username)
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5('|'.join(parts).encode('utf-8')).hexdigest())
+
+
+def timestamp(value):
+    return int(value.timestamp()) if value is not None else None
+
+
+def validator_headers(etag, last_modified):
+    headers = {'ETag': etag}
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+
+def evaluate(request, etag, last_modified):
+    """304/412 response for the request's preconditions, or None"""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        return None
+    if response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+        raise PreconditionFailed()
+
+    for header, value in validator_headers(etag, last_modified).items():
+        response[header] = value
+    return response
+
+
+def has_preconditions(request):
+    return 'HTTP_IF_MATCH' in request.META or 'HTTP_IF_UNMODIFIED_SINCE' in request.META
+
+
+class ConditionalListMixin:
+    """Emit validators for a page of posts and answer 304 when unchanged"""
+
+    def get_list_queryset(self):
+        return self.prepare_list_queryset(self.filter_queryset(self.get_queryset()))
+
+    def prepare_list_queryset(self, queryset):
+        """Last changes to a filtered queryset before it is paginated"""
+        return queryset
+
+    def get_list_data(self, page):
+        return self.get_serializer(page, many=True).data
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_list_queryset()
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            page = list(queryset)
+
+        links = []
+        if self.paginator is not None:
+            links = [self.paginator.get_next_link() or '', self.paginator.get_previous_link() or '']
+        etag = make_etag(*[post_validator(post) for post in page] + links)
+        # No Last-Modified: deleting a post changes a page without making
+        # any of its remaining rows newer.
+        not_modified = evaluate(request, etag, None)
+        if not_modified is not None:
+            return not_modified
+
+        with metrics.timed('serialize'):
+            data = self.get_list_data(page)
+        if self.paginator is not None:
+            response = self.get_paginated_response(data)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        return response
+
+
+class ConditionalDetailMixin:
+    """Emit validators for a post, answer 304 and honour If-Match on updates"""
+
+    def get_validators(self, instance):
+        return make_etag(post_validator(instance)), timestamp(instance.updated_at)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_validators(instance)
+
+        not_modified = evaluate(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        with metrics.timed('serialize'):
+            data = self.get_serializer(instance).data
+        response = Response(data)
+        for header, value in validator_headers(etag, last_modified).items():
+            response[header] = value
+        return response
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        evaluate(request, *self.get_validators(instance))
+
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.save_update(serializer, instance.updated_at)
+
+        with metrics.timed('serialize'):
+            data = serializer.data
+        response = Response(data)
+        for header, value in validator_headers(*self.get_validators(serializer.instance)).items():
+            response[header] = value
+        return response
+
+    @retry_on_locked
+    def save_update(self, serializer, updated_at):
+        instance = serializer.instance
+        with transaction.atomic():
+            if has_preconditions(self.request):
+                # Another editor may have saved since the check above; only
+                # the request still holding the old updated_at may write.
+                claimed = type(instance).objects.filter(
+                    pk=instance.pk,
+                    updated_at=updated_at,
+                ).update(updated_at=timezone.now())
+                if not claimed:
+                    raise PreconditionFailed()
+            self.perform_update(serializer)
@@ -0,0 +1,256 @@
+"""
+In-process publish/subscribe of post writes for the event stream.
+
+Post signals publish an event once the write commits; batches publish
+theirs explicitly because bulk writes send no signals.  An event is
+rendered to its ``text/event-stream`` form once and the same string is
+handed to every subscriber.
+
+Each subscriber has a bounded queue.  A subscriber whose queue is full is
+dropped rather than letting it hold events for everyone else: its stream
+ends after what is queued and the client reconnects with Last-Event-ID.
+The last HISTORY_SIZE events are kept in a ring buffer to replay on
+reconnects; a client further behind, or coming from another process or
+an older one, gets a ``reset`` event telling it to reload.
+
+Every process has its own hub and only sees the writes it handles itself.
+A stream holds a worker thread for as long as it is open, so a process
+serves at most MAX_SUBSCRIBERS of them and answers 503 beyond that.  A
+stream ends when its client disconnects, at the latest with the next
+heartbeat.
+
+Writes don't build their events while nothing is subscribed and no stream
+closed within the last REPLAY_SECONDS; a client reconnecting after that
+gets a ``reset``.
+"""
+import itertools
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .serializers import PostSerializer
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+
+class TooManySubscribers(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many open event streams, try again later.'
+    default_code = 'too_many_subscribers'
+
+
+class Event:
+    __slots__ = ('number', 'username', 'message')
+
+    def __init__(self, epoch, number, kind, username, data):
+        self.number = number
+        self.username = username
+        self.message = 'id: %s-%d\nevent: %s\ndata: %s\n\n' % (
+            epoch, number, kind, json.dumps(data, separators=(',', ':'), default=str))
+
+
+class Subscription:
+
+    def __init__(self, hub, username, size):
+        self.hub = hub
+        self.username = username
+        self.queue = queue.Queue(size)
+        self.overflowed = False
+
+    def matches(self, event):
+        return self.username is None or event.username == self.username
+
+    def offer(self, event):
+        """Queue `event`, return False when the queue is full"""
+        try:
+            self.queue.put_nowait(event.message)
+        except queue.Full:
+            self.overflowed = True
+            return False
+        return True
+
+    def messages(self, timeout):
+        """Queued messages as they come, None after `timeout` without one
+
+        Stops once an overflowed subscription has been drained.
+        """
+        while True:
+            try:
+                if self.overflowed:
+                    yield self.queue.get_nowait()
+                else:
+                    yield self.queue.get(timeout=timeout)
+            except queue.Empty:
+                if self.overflowed:
+                    return
+                yield None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+
+    def __init__(self, buffer_size, history_size, max_subscribers, replay_seconds):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.replay_seconds = replay_seconds
+        self.epoch = uuid.uuid4().hex[:8]
+        self.counter = itertools.count(1)
+        self.latest = 0
+        self.history = deque(maxlen=history_size)
+        self.subscribers = set()
+        self.left_at = float('-inf')
+        self.lock = threading.Lock()
+
+    def listening(self):
+        """Whether an event could be streamed now or replayed to a reconnect"""
+        return bool(self.subscribers) or time.monotonic() - self.left_at < self.replay_seconds
+
+    def skip(self):
+        """Account for events that weren't built, replays from before reset"""
+        with self.lock:
+            self.latest = next(self.counter)
+            self.history.clear()
+
+    def publish(self, kind, username, data):
+        with self.lock:
+            self.latest = next(self.counter)
+            event = Event(self.epoch, self.latest, kind, username, data)
+            self.history.append(event)
+            for subscription in list(self.subscribers):
+                if subscription.matches(event) and not subscription.offer(event):
+                    self.subscribers.discard(subscription)
+                    self.left_at = time.monotonic()
+        return event
+
+    def replay(self, last_event_id, subscription):
+        """Events after `last_event_id` for `subscription`, None if unknown"""
+        epoch, _, number = (last_event_id or '').partition('-')
+        if epoch != self.epoch or not number.isdigit():
+            return None
+        number = int(number)
+        first = self.history[0].number if self.history else self.latest + 1
+        if first > number + 1:
+            return None
+        return [event for event in self.history
+                if event.number > number and subscription.matches(event)]
+
+    def subscribe(self, username=None, last_event_id=None):
+        """A new subscription and the messages it should be sent first"""
+        subscription = Subscription(self, username, self.buffer_size)
+        with self.lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            backlog = []
+            if last_event_id:
+                replayed = self.replay(last_event_id, subscription)
+                if replayed is None:
+                    backlog = ['event: reset\ndata: {}\n\n']
+                else:
+                    backlog = [event.message for event in replayed]
+            self.subscribers.add(subscription)
+        return subscription, backlog
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscribers:
+                self.subscribers.discard(subscription)
+                self.left_at = time.monotonic()
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            config = settings.POST_EVENTS
+            _hub = Hub(config['BUFFER_SIZE'], config['HISTORY_SIZE'],
+                       config['MAX_SUBSCRIBERS'], config['REPLAY_SECONDS'])
+        return _hub
+
+
+def reset():
+    global _hub
+    with _hub_lock:
+        _hub = None
+
+
+def accepting():
+    """Whether events are wanted, noting the ones skipped otherwise"""
+    if not settings.POST_EVENTS['ENABLED']:
+        return False
+    hub = get_hub()
+    if hub.listening():
+        return True
+    hub.skip()
+    return False
+
+
+def publish_posts(kind, posts):
+    """Publish an event per post once the current transaction commits"""
+    if not accepting():
+        return
+    if kind == DELETED:
+        events = [(post.user.username, {'id': post.pk}) for post in posts]
+    else:
+        events = [(post.user.username, PostSerializer(post).data) for post in posts]
+    _publish_on_commit(kind, events)
+
+
+def publish_tombstones(username, post_ids):
+    """Publish the deletion of posts known only by their ids"""
+    if accepting():
+        _publish_on_commit(DELETED, [(username, {'id': pk}) for pk in post_ids])
+
+
+def _publish_on_commit(kind, events):
+    def send():
+        hub = get_hub()
+        for username, data in events:
+            hub.publish(kind, username, data)
+
+    transaction.on_commit(send)
+
+
+class Stream:
+    """The text/event-stream body for a subscription
+
+    Comments are sent as heartbeats so proxies keep the connection open, and
+    the stream ends after MAX_SECONDS to give the worker thread back; the
+    client reconnects on its own.  Closing the stream, which the response
+    does even when it was never read, ends the subscription.
+    """
+
+    def __init__(self, subscription, backlog):
+        self.subscription = subscription
+        self.backlog = backlog
+
+    def __iter__(self):
+        config = settings.POST_EVENTS
+        deadline = time.monotonic() + config['MAX_SECONDS']
+        try:
+            yield 'retry: %d\n\n' % config['RETRY_MS']
+            yield from self.backlog
+            for message in self.subscription.messages(config['HEARTBEAT_SECONDS']):
+                yield ':\n\n' if message is None else message
+                if time.monotonic() >= deadline:
+                    return
+        finally:
+            self.close()
+
+    def close(self):
+        self.subscription.close()
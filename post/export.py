@@ -0,0 +1,88 @@
+"""
+Streaming export of posts as NDJSON or CSV.
+
+Rows are read with `values_list().iterator(chunk_size=...)` and encoded one
+at a time, so memory use doesn't depend on the number of posts.  The
+output of each row matches PostSerializer.
+"""
+import csv
+import json
+from datetime import datetime, time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers
+
+from core.models import Post
+from . import search
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+FIELDS = ('id', 'user', 'title', 'content', 'created_at', 'updated_at')
+COLUMNS = ('id', 'user__username', 'title', 'content', 'created_at', 'updated_at')
+
+
+def parse_bound(value):
+    """Aware datetime from an ISO datetime or date, None when invalid"""
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = day and datetime.combine(day, time())
+    except ValueError:
+        return None
+
+    if parsed is not None and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def export_queryset(username=None, title=None, since=None, until=None):
+    queryset = Post.objects.all()
+    if username:
+        queryset = queryset.filter(user__username=username)
+    if title:
+        queryset = search.filter_title(queryset, title)
+    if since:
+        queryset = queryset.filter(created_at__gte=since)
+    if until:
+        queryset = queryset.filter(created_at__lt=until)
+    return queryset.order_by('id')
+
+
+def iter_rows(queryset, chunk_size=None):
+    """Yield one dict per post, formatted like PostSerializer"""
+    datetime_field = serializers.DateTimeField()
+    chunk_size = chunk_size or settings.POST_EXPORT_CHUNK_SIZE
+
+    for values in queryset.values_list(*COLUMNS).iterator(chunk_size=chunk_size):
+        row = dict(zip(FIELDS, values))
+        row['created_at'] = datetime_field.to_representation(row['created_at'])
+        row['updated_at'] = datetime_field.to_representation(row['updated_at'])
+        yield row
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + '\n'
+
+
+class Echo:
+    """File-like object handing back what csv.writer writes to it"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in FIELDS])
+
+
+def iter_export(fmt, rows):
+    return iter_ndjson(rows) if fmt == 'ndjson' else iter_csv(rows)
@@ -0,0 +1,93 @@
+"""
+Read-only fast path for serializing post listings.
+
+Instead of building Post instances and running them through the
+ModelSerializer field machinery, the page is fetched with `values()` and
+each row is turned into a dict directly.  The output is identical to
+PostSerializer, including the datetime format.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.renderers import BrowsableAPIRenderer
+
+from .pagination import KeysetPagination
+from .renderers import FastJSONRenderer
+from .serializers import PostSerializer
+
+# Serializer field -> values() key
+COLUMNS = OrderedDict([
+    ('id', 'id'),
+    ('user', 'user__username'),
+    ('title', 'title'),
+    ('content', 'content'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+])
+ALWAYS_LOADED = ('id', 'created_at', 'updated_at', 'user__username')
+DATETIME_FIELDS = ('created_at', 'updated_at')
+
+
+def values_queryset(queryset, fields=None, ordering=()):
+    """The queryset as values() rows holding what the fast path needs"""
+    keys = list(ALWAYS_LOADED)
+    for name in fields or COLUMNS:
+        if COLUMNS[name] not in keys:
+            keys.append(COLUMNS[name])
+    for field in ordering:
+        if field.lstrip('-') not in keys:
+            keys.append(field.lstrip('-'))
+
+    return queryset.values(*keys)
+
+
+class FastPostSerializer:
+    """Serializes values() rows exactly like PostSerializer would"""
+
+    def __init__(self, fields=None):
+        self.fields = [name for name in PostSerializer.Meta.fields
+                       if fields is None or name in fields]
+        self.datetime_field = serializers.DateTimeField()
+        # Resolve the timezone once rather than for every value
+        self.datetime_field.timezone = self.datetime_field.default_timezone()
+
+    def to_representation(self, row):
+        data = OrderedDict()
+        for name in self.fields:
+            value = row[COLUMNS[name]]
+            if name in DATETIME_FIELDS:
+                value = self.datetime_field.to_representation(value)
+            data[name] = value
+        return data
+
+    def serialize(self, rows):
+        return [self.to_representation(row) for row in rows]
+
+
+class FastListMixin:
+    """Serve a post listing through FastPostSerializer and FastJSONRenderer
+
+    Enabled by the POST_FAST_SERIALIZER setting.
+    """
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def use_fast_path(self):
+        return settings.POST_FAST_SERIALIZER
+
+    def prepare_list_queryset(self, queryset):
+        queryset = super().prepare_list_queryset(queryset)
+        if not self.use_fast_path():
+            return queryset
+
+        return values_queryset(
+            queryset,
+            fields=self.get_sparse_fields(),
+            ordering=getattr(self, 'keyset_ordering', KeysetPagination.ordering),
+        )
+
+    def get_list_data(self, page):
+        if not self.use_fast_path():
+            return super().get_list_data(page)
+
+        return FastPostSerializer(self.get_sparse_fields()).serialize(page)
@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from post import archive
+
+
+class Command(BaseCommand):
+    help = 'Move old posts to the archive table, a batch per transaction'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int,
+                            default=settings.POST_ARCHIVE['AGE_DAYS'],
+                            help='Archive posts created more than this many days ago')
+        parser.add_argument('--batch-size', type=int,
+                            default=settings.POST_ARCHIVE['BATCH_SIZE'])
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after archiving about this many posts')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['older_than_days'] < 0:
+            raise CommandError('--batch-size must be positive and --older-than-days not negative')
+
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        batch_size = options['batch_size']
+        if options['limit'] is not None:
+            batch_size = max(1, min(batch_size, options['limit']))
+
+        archived = 0
+        for count in archive.archive_posts(cutoff, batch_size):
+            archived += count
+            if options['verbosity'] > 1:
+                self.stdout.write('Archived %d posts' % archived)
+            if options['limit'] is not None and archived >= options['limit']:
+                break
+
+        self.stdout.write('Archived %d posts created before %s' % (archived, cutoff.isoformat()))
@@ -0,0 +1,62 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Post
+from post.fast import FastPostSerializer, values_queryset
+from post.renderers import FastJSONRenderer
+from post.serializers import PostSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Compare PostSerializer with the fast listing serializer'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['rows'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, rows, repeat):
+        user = get_user_model().objects.create_user(
+            email='benchmark@example.com',
+            password='benchmark',
+            username='benchmark-serializers',
+        )
+        Post.objects.bulk_create([
+            Post(user=user, title='Title %d \u2028' % i, content='Content \u00e9 %d' % i * 10)
+            for i in range(rows)
+        ])
+        queryset = Post.objects.select_related('user').filter(user=user).order_by('-id')
+
+        def standard():
+            return JSONRenderer().render(PostSerializer(queryset.all(), many=True).data)
+
+        def fast():
+            return FastJSONRenderer().render(
+                FastPostSerializer().serialize(values_queryset(queryset.all())))
+
+        if standard() != fast():
+            raise CommandError('The fast path output differs from PostSerializer')
+
+        for name, render in (('PostSerializer', standard), ('fast path', fast)):
+            best = min(self.measure(render) for _ in range(repeat))
+            self.stdout.write('%-15s %10.0f rows/s' % (name, rows / best))
+
+    def measure(self, render):
+        start = time.perf_counter()
+        render()
+        return time.perf_counter() - start
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from post import export
+
+
+class Command(BaseCommand):
+    help = 'Stream every post as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(export.FORMATS), default='ndjson')
+        parser.add_argument('--output', help='File to write to, stdout by default')
+        parser.add_argument('--username', help='Only posts of this user')
+        parser.add_argument('--title', help='Only posts whose title contains this')
+        parser.add_argument('--since', help='Only posts created at or after this ISO date(time)')
+        parser.add_argument('--until', help='Only posts created before this ISO date(time)')
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        bounds = {}
+        for name in ('since', 'until'):
+            if options[name]:
+                bounds[name] = export.parse_bound(options[name])
+                if bounds[name] is None:
+                    raise CommandError('Invalid --%s' % name)
+
+        queryset = export.export_queryset(
+            username=options['username'],
+            title=options['title'],
+            **bounds
+        )
+        chunks = export.iter_export(
+            options['format'], export.iter_rows(queryset, options['chunk_size']))
+
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for chunk in chunks:
+                output.write(chunk)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from post import changes
+
+
+class Command(BaseCommand):
+    help = 'Delete change feed entries older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Changes deleted per transaction')
+
+    def handle(self, *args, **options):
+        pruned = changes.prune(options['batch_size'])
+        self.stdout.write('Pruned %d changes' % pruned)
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from post import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-user post statistics from the posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='Users recomputed per transaction')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        users = get_user_model().objects.order_by('pk').values_list('pk', flat=True)
+        last_pk, checked, repaired = None, 0, 0
+        while True:
+            chunk = users.filter(pk__gt=last_pk) if last_pk is not None else users
+            pks = list(chunk[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                repaired += stats.rebuild(pks)
+            checked += len(pks)
+            last_pk = pks[-1]
+            if options['verbosity'] > 1:
+                self.stdout.write('Checked %d users, repaired %d' % (checked, repaired))
+
+        self.stdout.write('Checked %d users, repaired %d' % (checked, repaired))
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from datetime import datetime
+from functools import reduce
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on a unique ordering instead of using OFFSET.
+
+    Every page is a single indexed range scan of `page_size + 1` rows, so
+    page 10,000 costs the same as page 1 and no COUNT(*) is ever issued.
+    The cursor is an opaque token holding the ordering values of the row
+    the page starts after.  Views can change the ordering by setting
+    `keyset_ordering`; it must end with a unique field.  Given a list of
+    querysets, each is read the same way and the rows are merged.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate a queryset, or a list of querysets merged as one"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.page_size = self.get_page_size(request)
+
+        sources = queryset if isinstance(queryset, (list, tuple)) else [queryset]
+        position, reverse = self.decode_cursor(request, sources[0].model)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(invert(field) for field in ordering)
+
+        rows = []
+        for source in sources:
+            source = source.order_by(*ordering)
+            if position is not None:
+                source = source.filter(seek(ordering, position))
+            rows.extend(source[:self.page_size + 1])
+        if len(sources) > 1:
+            rows = merge(rows, ordering)
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        page_size = settings.POST_PAGE_SIZE
+        try:
+            requested = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            requested = 0
+        if requested > 0:
+            page_size = requested
+
+        return min(page_size, settings.POST_MAX_PAGE_SIZE)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        position = [encode_value(row_value(row, field.lstrip('-'))) for field in self.ordering]
+        token = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii')
+
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8'))
+            values = cursor['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                decode_value(model, field.lstrip('-'), value)
+                for field, value in zip(self.ordering, values)
+            ]
+            return position, bool(cursor.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+def invert(field):
+    return field[1:] if field.startswith('-') else '-' + field
+
+
+def seek(ordering, position):
+    """Q selecting the rows that come strictly after `position`"""
+    clauses = []
+    for index, field in enumerate(ordering):
+        name = field.lstrip('-')
+        lookup = '%s__%s' % (name, 'lt' if field.startswith('-') else 'gt')
+        equal = {
+            other.lstrip('-'): value
+            for other, value in zip(ordering[:index], position[:index])
+        }
+        clauses.append(Q(**equal) & Q(**{lookup: position[index]}))
+
+    return reduce(lambda left, right: left | right, clauses)
+
+
+def merge(rows, ordering):
+    """Sort rows of several querysets by `ordering`, dropping duplicates
+
+    A row moved between tables while they were read shows up twice.
+    """
+    for field in reversed(ordering):
+        name = field.lstrip('-')
+        rows.sort(key=lambda row: row_value(row, name), reverse=field.startswith('-'))
+
+    merged, seen = [], set()
+    for row in rows:
+        key = tuple(row_value(row, field.lstrip('-')) for field in ordering)
+        if key not in seen:
+            seen.add(key)
+            merged.append(row)
+    return merged
+
+
+def row_value(row, name):
+    """Value of a field on a model instance or a values() row"""
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def decode_value(model, name, value):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return value
+    return field.to_python(value)
@@ -0,0 +1,42 @@
+"""
+Batched removal of every post of a user.
+
+Deleting a user lets the ORM collect all of their posts, send a signal for
+each and delete them in one transaction.  `delete_posts` instead deletes
+them a batch at a time, oldest first, with one DELETE and one transaction
+per batch, so other writers only ever wait for one batch.  All the state
+is in the database: an interrupted purge picks up with the posts that are
+left.  Archived posts go the same way once the live ones are gone.
+"""
+from django.db import transaction
+
+from core.db import delete_unreferenced
+from core.models import ArchivedPost, Post
+from . import cache, changes, events, stats
+
+
+def delete_batch(user, batch_size, model=Post):
+    """Delete the next `batch_size` posts of `user`, return how many went"""
+    with transaction.atomic():
+        posts = list(model.objects.filter(user=user).order_by('id')
+                     .only('id', 'created_at', 'updated_at')[:batch_size])
+        if not posts:
+            return 0
+        ids = [post.pk for post in posts]
+        delete_unreferenced(model.objects.filter(id__in=ids))
+        if model is Post:
+            changes.record_tombstones(user.pk, ids)
+            events.publish_tombstones(user.username, ids)
+        stats.record_deleted(user.pk, posts)
+        cache.bump('list', 'user:%s' % user.username, *['post:%s' % pk for pk in ids])
+    return len(ids)
+
+
+def delete_posts(user, batch_size):
+    """Delete every post of `user`, yielding the size of each batch"""
+    for model in (Post, ArchivedPost):
+        while True:
+            deleted = delete_batch(user, batch_size, model)
+            if not deleted:
+                break
+            yield deleted
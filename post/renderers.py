@@ -0,0 +1,31 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer using orjson when it is installed.
+
+    The output is byte-identical to JSONRenderer for compact output; pretty
+    printed output, data orjson can't encode and a missing orjson all go
+    through JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer, keeps the output a JavaScript subset
+        return ret.replace('\u2028'.encode('utf-8'), b'\\u2028').replace(
+            '\u2029'.encode('utf-8'), b'\\u2029')
@@ -0,0 +1,127 @@
+"""
+Title search backed by an SQLite FTS5 index.
+
+`core_post_fts` is an external content FTS5 table over `core_post.title`
+using the trigram tokenizer, so a MATCH on a quoted term behaves like a
+case-insensitive substring search but is answered from the index.
+Triggers keep it in sync with every insert, update and delete, including
+bulk and raw SQL writes.  Backends without FTS5, and terms shorter than a
+trigram, fall back to `title__icontains`.
+"""
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.db.utils import DatabaseError
+
+FTS_TABLE = 'core_post_fts'
+MIN_TERM_LENGTH = 3
+
+INSTALL_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_post_fts USING fts5("
+    "title, content='core_post', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS core_post_fts_ai AFTER INSERT ON core_post BEGIN "
+    "INSERT INTO core_post_fts(rowid, title) VALUES (new.id, new.title); END",
+    "CREATE TRIGGER IF NOT EXISTS core_post_fts_ad AFTER DELETE ON core_post BEGIN "
+    "INSERT INTO core_post_fts(core_post_fts, rowid, title) "
+    "VALUES ('delete', old.id, old.title); END",
+    "CREATE TRIGGER IF NOT EXISTS core_post_fts_au AFTER UPDATE OF title ON core_post BEGIN "
+    "INSERT INTO core_post_fts(core_post_fts, rowid, title) "
+    "VALUES ('delete', old.id, old.title); "
+    "INSERT INTO core_post_fts(rowid, title) VALUES (new.id, new.title); END",
+    "INSERT INTO core_post_fts(core_post_fts) VALUES ('rebuild')",
+)
+
+UNINSTALL_SQL = (
+    "DROP TRIGGER IF EXISTS core_post_fts_ai",
+    "DROP TRIGGER IF EXISTS core_post_fts_ad",
+    "DROP TRIGGER IF EXISTS core_post_fts_au",
+    "DROP TABLE IF EXISTS core_post_fts",
+)
+
+_available = {}
+
+
+def install(schema_editor):
+    """Create the index and its triggers; safe to run again
+
+    SQLite drops triggers when Django rebuilds `core_post` during a schema
+    change, so migrations that alter Post must call this afterwards.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    try:
+        for sql in INSTALL_SQL:
+            schema_editor.execute(sql)
+    except DatabaseError:
+        # SQLite built without FTS5 or the trigram tokenizer
+        pass
+    _available.pop(schema_editor.connection.alias, None)
+
+
+def uninstall(schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+
+    for sql in UNINSTALL_SQL:
+        schema_editor.execute(sql)
+    _available.pop(schema_editor.connection.alias, None)
+
+
+def fts_available(using):
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+
+    return _available[using]
+
+
+def can_search(queryset, term):
+    # Only core_post is indexed, archived posts always use the fallback
+    return (queryset.model._meta.db_table == 'core_post'
+            and len(term) >= MIN_TERM_LENGTH and fts_available(queryset.db))
+
+
+def match_expression(term):
+    """FTS5 query matching `term` literally"""
+    return '"%s"' % term.replace('"', '""')
+
+
+def where_matching(queryset, term, negate=False):
+    # `id__in=RawSQL(...)` would render as `IN ((SELECT ...))`, which SQLite
+    # reads as a scalar subquery and only compares against its first row.
+    return queryset.extra(
+        where=['core_post.id %s (SELECT rowid FROM core_post_fts '
+               'WHERE core_post_fts MATCH %%s)' % ('NOT IN' if negate else 'IN')],
+        params=[match_expression(term)],
+    )
+
+
+def filter_title(queryset, term):
+    """Posts whose title contains term"""
+    if not can_search(queryset, term):
+        return queryset.filter(title__icontains=term)
+
+    return where_matching(queryset, term)
+
+
+def exclude_title(queryset, term):
+    """Posts whose title doesn't contain term"""
+    if not can_search(queryset, term):
+        return queryset.exclude(title__icontains=term)
+
+    return where_matching(queryset, term, negate=True)
+
+
+def rank(queryset, term):
+    """Annotate `search_rank`, lower is more relevant, or None without FTS"""
+    if not can_search(queryset, term):
+        return None
+
+    return queryset.annotate(search_rank=RawSQL(
+        'SELECT bm25(core_post_fts) FROM core_post_fts '
+        'WHERE core_post_fts MATCH %s AND core_post_fts.rowid = core_post.id',
+        (match_expression(term),)
+    ))
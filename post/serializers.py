@@ -9,3 +9,12 @@ class PostSerializer(serializers.ModelSerializer):
     class Meta:
         fields = ('id', 'user', 'title', 'content', 'created_at', 'updated_at',)
         model = models.Post
+
+    def __init__(self, *args, **kwargs):
+        """Takes an optional `fields` argument restricting the output"""
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
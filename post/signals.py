@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.models import Post, UserPostStats
+from . import cache, changes, events
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    """Bump the response cache versions a post write affects"""
+    cache.invalidate_posts([instance])
+
+
+@receiver(post_save, sender=Post)
+def publish_saved_post(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        events.publish_posts(events.CREATED if created else events.UPDATED, [instance])
+
+
+@receiver(post_delete, sender=Post)
+def publish_deleted_post(sender, instance, **kwargs):
+    events.publish_posts(events.DELETED, [instance])
+
+
+@receiver(post_save, sender=Post)
+def record_saved_post(sender, instance, raw=False, **kwargs):
+    """Log every post save to the change feed, the admin's included"""
+    if not raw:
+        changes.record([instance])
+
+
+@receiver(post_delete, sender=Post)
+def record_deleted_post(sender, instance, **kwargs):
+    changes.record([instance], deleted=True)
+
+
+@receiver(post_save, sender=get_user_model())
+def create_post_stats(sender, instance, created, raw=False, **kwargs):
+    """Start every user with a stats row so post writes only UPDATE it"""
+    if created and not raw:
+        UserPostStats.objects.get_or_create(user_id=instance.pk)
+
+
+@receiver(pre_save, sender=get_user_model())
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    instance._cached_username = instance.username
+    if instance.pk and (update_fields is None or 'username' in update_fields):
+        instance._cached_username = sender.objects.filter(
+            pk=instance.pk).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user(sender, instance, created, **kwargs):
+    """Posts embed their author's username, so a rename invalidates them"""
+    old_username = getattr(instance, '_cached_username', None)
+    if not created and old_username != instance.username:
+        cache.bump('global', 'user:%s' % old_username, 'user:%s' % instance.username)
+
+
+@receiver(post_delete, sender=get_user_model())
+def invalidate_deleted_user(sender, instance, **kwargs):
+    cache.bump('global', 'user:%s' % instance.username)
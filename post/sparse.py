@@ -0,0 +1,68 @@
+"""
+Sparse fieldsets for post reads: `?fields=id,title` or `?exclude=content`.
+
+Omitted fields are dropped from the serializer and their columns are left
+out of the SELECT.  The columns needed for pagination, validators and the
+author's name are always loaded.
+"""
+from rest_framework.exceptions import ValidationError
+
+from .serializers import PostSerializer
+
+COLUMNS = {
+    'id': ('id',),
+    'user': ('user', 'user__username'),
+    'title': ('title',),
+    'content': ('content',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+}
+ALWAYS_LOADED = ('id', 'created_at', 'updated_at', 'user', 'user__username')
+
+
+def parse_fields(query_params):
+    """Names of the requested fields, or None to return all of them"""
+    available = PostSerializer.Meta.fields
+
+    def parse(param):
+        names = [name.strip() for name in query_params.get(param, '').split(',') if name.strip()]
+        unknown = sorted(set(names) - set(available))
+        if unknown:
+            raise ValidationError({param: ['Unknown field(s): %s.' % ', '.join(unknown)]})
+        return names
+
+    fields = parse('fields')
+    exclude = parse('exclude')
+    if not fields and not exclude:
+        return None
+
+    fields = fields or available
+    return tuple(name for name in available if name in fields and name not in exclude)
+
+
+class SparseFieldsMixin:
+    """Honour ?fields= and ?exclude= on safe requests of a post view"""
+
+    def get_sparse_fields(self):
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            if self.request.method in ('GET', 'HEAD', 'OPTIONS'):
+                self._sparse_fields = parse_fields(self.request.query_params)
+        return self._sparse_fields
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            columns = set(ALWAYS_LOADED)
+            for name in fields:
+                columns.update(COLUMNS[name])
+            queryset = queryset.only(*sorted(columns))
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,133 @@
+"""
+Per-user post statistics kept next to the posts.
+
+UserPostStats holds the number of posts of a user and the latest
+created_at and updated_at among them, so the user endpoints don't have to
+aggregate the post table.  The write paths update it in the transaction
+that writes the posts: creates and updates adjust the row with a single
+UPDATE, deletes decrement the count and only recompute a timestamp from
+the user's remaining posts when a deleted post held it.  `rebuild`
+recomputes the rows of any users from scratch, see the repair_post_stats
+command.
+Archived posts still count, archival leaves the statistics alone.
+"""
+from django.db import transaction
+from django.db.models import Count, DateTimeField, F, Max, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import ArchivedPost, Post, UserPostStats
+
+
+def later(field, value):
+    """The latest of the column `field` and `value`, NULL being earliest"""
+    # Typed, so the backend stores it like any other datetime
+    value = Value(value, output_field=DateTimeField())
+    return Greatest(Coalesce(field, value), value)
+
+
+def _adjust(user_id, count, created_at, updated_at):
+    changes = {}
+    if count:
+        changes['post_count'] = F('post_count') + count
+    if created_at is not None:
+        changes['last_created_at'] = later('last_created_at', created_at)
+    if updated_at is not None:
+        changes['last_updated_at'] = later('last_updated_at', updated_at)
+    if not changes:
+        return
+
+    if UserPostStats.objects.filter(user_id=user_id).update(**changes):
+        return
+    with transaction.atomic():
+        _, created = UserPostStats.objects.get_or_create(user_id=user_id, defaults={
+            'post_count': count,
+            'last_created_at': created_at,
+            'last_updated_at': updated_at,
+        })
+    if not created:
+        UserPostStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def record_created(user_id, posts):
+    """Count freshly created `posts` of a user"""
+    if posts:
+        _adjust(user_id, len(posts),
+                max(post.created_at for post in posts),
+                max(post.updated_at for post in posts))
+
+
+def record_updated(user_id, updated_at):
+    _adjust(user_id, 0, None, updated_at)
+
+
+def rebuild(user_ids):
+    """Recompute the statistics of the given users, return how many changed"""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return 0
+
+    totals = {}
+    for model in (Post, ArchivedPost):
+        rows = model.objects.filter(user_id__in=user_ids).order_by().values('user_id').annotate(
+            post_count=Count('id'),
+            last_created_at=Max('created_at'),
+            last_updated_at=Max('updated_at'),
+        )
+        for row in rows:
+            count, created_at, updated_at = totals.get(row['user_id'], (0, None, None))
+            totals[row['user_id']] = (
+                count + row['post_count'],
+                max(filter(None, (created_at, row['last_created_at']))),
+                max(filter(None, (updated_at, row['last_updated_at']))),
+            )
+    existing = UserPostStats.objects.in_bulk(user_ids)
+
+    changed, missing = [], []
+    for user_id in user_ids:
+        values = totals.get(user_id, (0, None, None))
+        stats = existing.get(user_id)
+        if stats is None:
+            missing.append(UserPostStats(user_id=user_id, post_count=values[0],
+                                         last_created_at=values[1], last_updated_at=values[2]))
+        elif (stats.post_count, stats.last_created_at, stats.last_updated_at) != values:
+            stats.post_count, stats.last_created_at, stats.last_updated_at = values
+            changed.append(stats)
+
+    if changed:
+        UserPostStats.objects.bulk_update(
+            changed, ['post_count', 'last_created_at', 'last_updated_at'])
+    if missing:
+        UserPostStats.objects.bulk_create(missing)
+    return len(changed) + len(missing)
+
+
+def latest(user_id, field):
+    """The latest `field` among the posts a user has left, live or archived"""
+    values = [
+        model.objects.filter(user_id=user_id).aggregate(value=Max(field))['value']
+        for model in (Post, ArchivedPost)
+    ]
+    return max(filter(None, values), default=None)
+
+
+def record_deleted(user_id, posts):
+    """Uncount just deleted `posts` of a user
+
+    Only needs their created_at and updated_at.
+    """
+    if not posts:
+        return
+    current = UserPostStats.objects.filter(user_id=user_id).values_list(
+        'last_created_at', 'last_updated_at').first()
+    if current is None:
+        rebuild([user_id])
+        return
+
+    # Posts written around the write paths, like in the shell, were never
+    # counted; repair_post_stats fixes such rows
+    changes = {'post_count': Greatest(F('post_count') - len(posts), 0)}
+    for field, held in zip(('created_at', 'updated_at'), current):
+        if held is not None and max(getattr(post, field) for post in posts) >= held:
+            changes['last_' + field] = latest(user_id, field)
+    UserPostStats.objects.filter(user_id=user_id).update(**changes)
+
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+from post import stats
+from user import tasks
+
+POST_URL = reverse('post:show-posts')
+
+
+def detail_url(pk):
+    return reverse('post:post-detail', kwargs={'pk': pk})
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+@override_settings(POST_PAGE_SIZE=2)
+class ArchiveTests(TestCase):
+    """Test moving old posts to the archive and reading them back"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        now = timezone.now()
+        self.posts = []
+        # Title0 is the newest, Title3 and Title4 are old enough to archive
+        for index, age in enumerate((1, 10, 100, 400, 500)):
+            post = models.Post.objects.create(
+                user=self.user, title='Title%d' % index, content='Content %d ' % index * 20)
+            models.Post.objects.filter(pk=post.pk).update(created_at=now - timedelta(days=age))
+            self.posts.append(post)
+        stats.rebuild([self.user.pk])
+
+    def archive(self, *args):
+        out = StringIO()
+        call_command('archive_posts', *args, stdout=out)
+        return out.getvalue()
+
+    def titles(self, res):
+        return [item['title'] for item in res.data['results']]
+
+    def walk(self, url, params):
+        res = self.client.get(url, params)
+        pages = [self.titles(res)]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append(self.titles(res))
+        return pages
+
+    def test_archive_moves_old_posts(self):
+        """Test that only old posts move, with their id and compressed content"""
+        self.assertIn('Archived 2 posts', self.archive('--batch-size=1'))
+
+        self.assertEqual(sorted(models.Post.objects.values_list('title', flat=True)),
+                         ['Title0', 'Title1', 'Title2'])
+        archived = models.ArchivedPost.objects.get(id=self.posts[3].id)
+        self.assertEqual(archived.title, 'Title3')
+        self.assertEqual(archived.content, 'Content 3 ' * 20)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT length(content) FROM core_archivedpost WHERE id = %s',
+                           [archived.id])
+            self.assertLess(cursor.fetchone()[0], len(archived.content))
+
+        self.assertIn('Archived 0 posts', self.archive())
+
+    def test_archive_limit(self):
+        """Test that --limit archives incrementally, oldest first"""
+        self.assertIn('Archived 1 posts', self.archive('--limit=1', '--older-than-days=0'))
+        self.assertEqual(list(models.ArchivedPost.objects.values_list('title', flat=True)),
+                         ['Title4'])
+
+    def test_listings_hide_archive_by_default(self):
+        self.archive()
+
+        self.assertEqual(self.walk(POST_URL, {}), [['Title0', 'Title1'], ['Title2']])
+
+    def test_listings_merge_archive_when_asked(self):
+        """Test that ?include_archived=1 pages through both tables in order"""
+        self.archive()
+        expected = [['Title0', 'Title1'], ['Title2', 'Title3'], ['Title4']]
+
+        self.assertEqual(self.walk(POST_URL, {'include_archived': '1'}), expected)
+        with override_settings(POST_FAST_SERIALIZER=False):
+            self.assertEqual(self.walk(POST_URL, {'include_archived': '1'}), expected)
+        user_url = reverse('post:post-username', kwargs={'username': 'name'})
+        self.assertEqual(self.walk(user_url, {'include_archived': '1'}), expected)
+
+        like_url = reverse('post:post-like', kwargs={'title': 'title3'})
+        self.assertEqual(self.walk(like_url, {'include_archived': '1'}), [['Title3']])
+
+        res = self.client.get(POST_URL, {'include_archived': '1', 'page_size': 5,
+                                         'fields': 'id,content'})
+        self.assertEqual(res.data['results'][3],
+                         {'id': self.posts[3].id, 'content': 'Content 3 ' * 20})
+
+    def test_detail_falls_back_to_archive_when_asked(self):
+        self.archive()
+        url = detail_url(self.posts[3].id)
+
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        res = self.client.get(url, {'include_archived': '1'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Title3')
+        self.assertEqual(res.data['user'], 'name')
+        self.assertTrue(res.has_header('ETag'))
+
+        res = self.client.patch(url + '?include_archived=1', {'title': 'Changed'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_archived_posts_of_others_stay_hidden(self):
+        self.archive()
+        other = create_user(email='other@gmail.com', password='test123', username='other')
+        self.client.force_authenticate(user=other)
+
+        res = self.client.get(detail_url(self.posts[3].id), {'include_archived': '1'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_archival_keeps_stats_and_purge_removes_archive(self):
+        """Test that archived posts still count and go when the user is purged"""
+        self.archive()
+        self.assertEqual(stats.rebuild([self.user.pk]), 0)
+        self.assertEqual(models.UserPostStats.objects.get(user=self.user).post_count, 5)
+
+        models.Job.objects.all().delete()
+        tasks.purge_later(self.user)
+        tasks.work()
+
+        self.assertFalse(models.ArchivedPost.objects.exists())
@@ -0,0 +1,158 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+
+BATCH_URL = reverse('post:batch')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class BatchPostApiTests(TestCase):
+    """Test creating, updating and deleting posts in batches"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = models.Post.objects.create(
+            user=self.user,
+            title='Some title',
+            content='Content',
+        )
+        self.other_post = models.Post.objects.create(
+            user=create_user(
+                email='AnotherUser@gmail.com',
+                password='testpassword123',
+                username='NewName'),
+            title='Title1',
+            content='Content',
+        )
+
+    def test_mixed_batch(self):
+        """Test that creates, updates and deletes are applied together"""
+        keep = models.Post.objects.create(user=self.user, title='Keep', content='Content')
+        payload = [
+            {'op': 'create', 'title': 'First', 'content': 'One'},
+            {'op': 'create', 'title': 'Second', 'content': 'Two'},
+            {'op': 'update', 'id': keep.id, 'title': 'Kept'},
+            {'op': 'delete', 'id': self.post.id},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['status'] for item in res.data], [201, 201, 200, 204])
+        first = models.Post.objects.get(id=res.data[0]['data']['id'])
+        self.assertEqual(first.title, 'First')
+        self.assertEqual(res.data[1]['data']['title'], 'Second')
+        self.assertEqual(res.data[1]['data']['user'], 'name')
+        keep.refresh_from_db()
+        self.assertEqual(keep.title, 'Kept')
+        self.assertFalse(models.Post.objects.filter(id=self.post.id).exists())
+
+    def test_creates_are_bulk(self):
+        """Test that the number of queries doesn't grow with the batch"""
+        counts = []
+        for size in (2, 20):
+            payload = [{'op': 'create', 'title': 'Title', 'content': 'Content'}] * size
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(BATCH_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(models.Post.objects.filter(title='Title').count(), 22)
+
+    def test_deletes_are_bulk(self):
+        """Test that deleting more posts doesn't take more queries"""
+        counts = []
+        for size in (2, 20):
+            models.Post.objects.bulk_create([
+                models.Post(user=self.user, title='Title', content='Content')
+                for _ in range(size)
+            ])
+            ids = models.Post.objects.filter(title='Title').values_list('id', flat=True)
+            payload = [{'op': 'delete', 'id': pk} for pk in ids]
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(BATCH_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            counts.append(len(queries))
+
+        self.assertEqual(counts[0], counts[1])
+        self.assertFalse(models.Post.objects.filter(title='Title').exists())
+
+    def test_boolean_id_is_not_a_post(self):
+        """Test that an id of true doesn't address the post with id 1"""
+        models.Post.objects.filter(id=1).delete()
+        first = models.Post.objects.create(id=1, user=self.user, title='First', content='One')
+
+        res = self.client.post(BATCH_URL, [{'op': 'delete', 'id': True}], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0]['status'], status.HTTP_404_NOT_FOUND)
+        self.assertTrue(models.Post.objects.filter(id=first.id).exists())
+
+    def test_invalid_item_rolls_back_everything(self):
+        """Test that one invalid operation prevents every write"""
+        payload = [
+            {'op': 'create', 'title': 'First', 'content': 'One'},
+            {'op': 'create', 'title': 'x' * 100, 'content': 'Two'},
+            {'op': 'delete', 'id': self.post.id},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([item['status'] for item in res.data], [424, 400, 424])
+        self.assertIn('title', res.data[1]['errors'])
+        self.assertTrue(models.Post.objects.filter(id=self.post.id).exists())
+        self.assertFalse(models.Post.objects.filter(title='First').exists())
+
+    def test_other_users_posts_not_found(self):
+        """Test that the PostDetail ownership rules apply"""
+        payload = [
+            {'op': 'update', 'id': self.other_post.id, 'title': 'Mine now'},
+            {'op': 'delete', 'id': self.other_post.id},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([item['status'] for item in res.data], [404, 404])
+
+    def test_superuser_can_update_but_not_create(self):
+        """Test that superusers follow the PostDetail and IsUser rules"""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@gmail.com',
+            password='admin123',
+            username='AdminName'
+        )
+        self.client.force_authenticate(user=admin)
+
+        res = self.client.post(BATCH_URL, [
+            {'op': 'update', 'id': self.other_post.id, 'title': 'Moderated'},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.post(BATCH_URL, [
+            {'op': 'create', 'title': 'Admin post', 'content': 'Content'},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_batch_must_be_a_list(self):
+        """Test that the payload must be a list of operations"""
+        res = self.client.post(BATCH_URL, {'op': 'create'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
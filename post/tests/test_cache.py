@@ -0,0 +1,106 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from core import models
+from post import cache
+
+POST_URL = reverse('post:show-posts')
+POST_CACHE = {'ENABLED': True, 'ALIAS': 'default', 'TIMEOUT': 300}
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+@override_settings(POST_CACHE=POST_CACHE)
+class ResponseCacheTests(TestCase):
+    """Test the versioned response cache of the post read endpoints"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = models.Post.objects.create(
+            user=self.user,
+            title='Some title',
+            content='Content',
+        )
+
+    def assertCached(self, url):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        return res
+
+    def test_list_is_cached(self):
+        """Test that a repeated listing doesn't hit the database"""
+        res = self.assertCached(POST_URL)
+
+        self.assertEqual(res.data['results'][0]['title'], 'Some title')
+        self.assertGreaterEqual(cache.stats()['PostList']['hits'], 1)
+
+    def test_create_invalidates_list(self):
+        """Test that a new post shows up right away"""
+        self.assertCached(POST_URL)
+        models.Post.objects.create(user=self.user, title='New', content='Content')
+
+        res = self.client.get(POST_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+    def test_update_invalidates_detail_and_user_posts(self):
+        """Test that an update is visible on every endpoint showing the post"""
+        detail_url = reverse('post:post-detail', kwargs={'pk': self.post.id})
+        user_url = reverse('post:post-username', kwargs={'username': 'name'})
+        self.assertCached(detail_url)
+        self.assertCached(user_url)
+
+        self.client.patch(detail_url, {'title': 'Changed'})
+
+        self.assertEqual(self.client.get(detail_url).data['title'], 'Changed')
+        self.assertEqual(self.client.get(user_url).data['results'][0]['title'], 'Changed')
+
+    def test_delete_invalidates_detail(self):
+        """Test that a deleted post isn't served from the cache"""
+        detail_url = reverse('post:post-detail', kwargs={'pk': self.post.id})
+        self.assertCached(detail_url)
+
+        self.post.delete()
+
+        self.assertEqual(self.client.get(detail_url).status_code, 404)
+
+    def test_rename_invalidates_author(self):
+        """Test that renaming the author refreshes cached posts"""
+        self.assertCached(POST_URL)
+
+        self.user.username = 'renamed'
+        self.user.save()
+
+        res = self.client.get(POST_URL)
+        self.assertEqual(res.data['results'][0]['user'], 'renamed')
+
+    def test_detail_scoped_per_user(self):
+        """Test that a cached detail isn't served to a user who can't see it"""
+        detail_url = reverse('post:post-detail', kwargs={'pk': self.post.id})
+        self.assertCached(detail_url)
+
+        other = create_user(email='other@gmail.com', password='test123', username='other')
+        self.client.force_authenticate(user=other)
+
+        self.assertEqual(self.client.get(detail_url).status_code, 404)
+
+    def test_version_keys_are_hashed(self):
+        """Test that usernames never end up verbatim in cache keys"""
+        key = cache.version_key('user:name with spaces' + 'x' * 300)
+        self.assertLess(len(key), 64)
+        self.assertNotIn(' ', key)
@@ -0,0 +1,178 @@
+import base64
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+
+CHANGES_URL = reverse('post:changes')
+CREATE_POST_URL = reverse('post:create-post')
+BATCH_URL = reverse('post:batch')
+
+
+def detail_url(pk):
+    return reverse('post:post-detail', kwargs={'pk': pk})
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class PostChangesTests(TestCase):
+    """Test the change feed of the posts"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create(self, title):
+        return self.client.post(CREATE_POST_URL, {'title': title, 'content': 'Content'}).data
+
+    def sync(self, token, **params):
+        res = self.client.get(CHANGES_URL, dict(params, since=token))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def start(self):
+        return self.client.get(CHANGES_URL).data['next']
+
+    def test_start_token(self):
+        """Test that a request without a token only returns where to start"""
+        self.create('Before')
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.data['changes'], [])
+        self.assertEqual(self.sync(res.data['next'])['changes'], [])
+
+    def test_creates_updates_and_deletes(self):
+        """Test that every write shows up once, as the post is now"""
+        token = self.start()
+        first = self.create('First')
+        second = self.create('Second')
+        self.client.patch(detail_url(first['id']), {'title': 'Changed'})
+        self.client.delete(detail_url(second['id']))
+
+        data = self.sync(token)
+
+        self.assertEqual(data['changes'], [
+            {'id': first['id'], 'deleted': False, 'post': data['changes'][0]['post']},
+            {'id': second['id'], 'deleted': True},
+        ])
+        self.assertEqual(data['changes'][0]['post']['title'], 'Changed')
+        self.assertFalse(data['has_more'])
+        self.assertEqual(self.sync(data['next'])['changes'], [])
+
+    def test_batches_are_recorded(self):
+        post = models.Post.objects.create(user=self.user, title='Old', content='Content')
+        token = self.start()
+
+        res = self.client.post(BATCH_URL, [
+            {'op': 'create', 'title': 'New', 'content': 'Content'},
+            {'op': 'delete', 'id': post.id},
+        ], format='json')
+
+        changes = self.sync(token)['changes']
+        self.assertEqual(changes, [
+            {'id': res.data[0]['data']['id'], 'deleted': False,
+             'post': changes[0]['post']},
+            {'id': post.id, 'deleted': True},
+        ])
+
+    @override_settings(POST_CHANGES=dict(PAGE_SIZE=2, RETENTION_DAYS=30, PRUNE_BATCH_SIZE=2))
+    def test_pages(self):
+        """Test that a long feed is returned a page at a time"""
+        token = self.start()
+        titles = ['Title%d' % index for index in range(5)]
+        for title in titles:
+            self.create(title)
+
+        seen = []
+        while True:
+            data = self.sync(token)
+            seen.extend(change['post']['title'] for change in data['changes'])
+            token = data['next']
+            if not data['has_more']:
+                break
+
+        self.assertEqual(seen, titles)
+
+    def test_username_filter(self):
+        token = self.start()
+        other = create_user(email='other@gmail.com', password='test123', username='other')
+        models.Post.objects.create(user=other, title='Other', content='Content')
+        self.create('Mine')
+
+        changes = self.sync(token, username='name')['changes']
+
+        self.assertEqual([change['post']['title'] for change in changes], ['Mine'])
+        res = self.client.get(CHANGES_URL, {'since': token, 'username': 'nobody'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_and_expired_tokens(self):
+        res = self.client.get(CHANGES_URL, {'since': 'garbage'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        old = json.dumps({'s': 0, 't': int(time.time()) - 31 * 86400}).encode()
+        res = self.client.get(CHANGES_URL, {'since': base64.urlsafe_b64encode(old).decode()})
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_prune(self):
+        """Test that only changes older than the retention are pruned"""
+        self.create('Old')
+        self.create('New')
+        models.PostChange.objects.filter(post_id__in=models.Post.objects.filter(
+            title='Old').values('id')).update(changed_at=timezone.now() - timedelta(days=31))
+
+        out = StringIO()
+        call_command('prune_post_changes', stdout=out)
+
+        self.assertIn('Pruned 1 changes', out.getvalue())
+        self.assertEqual(models.PostChange.objects.count(), 1)
+
+    def test_token_before_pruned_changes(self):
+        """Test that a fresh token pointing at pruned changes gets a 410"""
+        token = self.start()
+        self.create('Old')
+        self.create('New')
+        models.PostChange.objects.filter(post_id__in=models.Post.objects.filter(
+            title='Old').values('id')).update(changed_at=timezone.now() - timedelta(days=31))
+        call_command('prune_post_changes', stdout=StringIO())
+
+        res = self.client.get(CHANGES_URL, {'since': token})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+    def test_admin_writes_are_recorded(self):
+        """Test that saves and deletes outside the API reach the feed"""
+        token = self.start()
+        post = models.Post.objects.create(user=self.user, title='Admin', content='Content')
+        kept = models.Post.objects.create(user=self.user, title='Kept', content='Content')
+        deleted_id = post.id
+        post.delete()
+
+        data = self.sync(token)
+
+        self.assertEqual([(change['id'], change['deleted']) for change in data['changes']],
+                         [(kept.id, False), (deleted_id, True)])
+
+    def test_requires_authentication(self):
+        res = APIClient().get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,108 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+
+POST_URL = reverse('post:show-posts')
+
+
+class ConditionalRequestTests(TestCase):
+    """Test ETag / Last-Modified validators on the post endpoints"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = models.Post.objects.create(
+            user=self.user,
+            title='Some title',
+            content='Content',
+        )
+        self.detail_url = reverse('post:post-detail', kwargs={'pk': self.post.id})
+
+    def test_detail_not_modified(self):
+        """Test that a matching If-None-Match gets a 304 without a body"""
+        res = self.client.get(self.detail_url)
+        etag = res['ETag']
+        self.assertIn('Last-Modified', res)
+
+        res = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_detail_if_modified_since(self):
+        """Test that If-Modified-Since gets a 304 for an unchanged post"""
+        res = self.client.get(self.detail_url)
+
+        res = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_etag_changes_on_update(self):
+        """Test that an update changes the validator"""
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, {'title': 'Changed'})
+
+        res = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Changed')
+
+    def test_list_not_modified(self):
+        """Test that an unchanged page gets a 304"""
+        etag = self.client.get(POST_URL)['ETag']
+
+        res = self.client.get(POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        models.Post.objects.create(user=self.user, title='New', content='Content')
+        res = self.client.get(POST_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_has_no_last_modified(self):
+        """Test that deleting a post can't leave a page looking unmodified"""
+        newer = models.Post.objects.create(user=self.user, title='New', content='Content')
+        res = self.client.get(POST_URL)
+        self.assertNotIn('Last-Modified', res)
+        date = self.client.get(self.detail_url)['Last-Modified']
+
+        newer.delete()
+        res = self.client.get(POST_URL, HTTP_IF_MODIFIED_SINCE=date)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_update_if_match(self):
+        """Test that an update with the current ETag succeeds"""
+        etag = self.client.get(self.detail_url)['ETag']
+
+        res = self.client.patch(self.detail_url, {'title': 'Changed'}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_update_stale_if_match(self):
+        """Test that an update based on an old version is rejected"""
+        etag = self.client.get(self.detail_url)['ETag']
+        self.client.patch(self.detail_url, {'title': 'First editor'})
+
+        res = self.client.put(
+            self.detail_url,
+            {'title': 'Second editor', 'content': 'Content'},
+            HTTP_IF_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'First editor')
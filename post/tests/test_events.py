@@ -0,0 +1,273 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_jwt.settings import api_settings
+from core.asgi import ASGIHandler
+from post import events, purge
+
+STREAM_URL = reverse('post:stream')
+CREATE_POST_URL = reverse('post:create-post')
+BATCH_URL = reverse('post:batch')
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+TEST_EVENTS = {
+    'ENABLED': True,
+    'MAX_SUBSCRIBERS': 5,
+    'BUFFER_SIZE': 10,
+    'HISTORY_SIZE': 10,
+    'REPLAY_SECONDS': 60,
+    'HEARTBEAT_SECONDS': 0.05,
+    'MAX_SECONDS': 0.5,
+    'RETRY_MS': 1000,
+}
+
+
+def event_ids(messages):
+    return [line[4:] for message in messages for line in message.splitlines()
+            if line.startswith('id: ')]
+
+
+class HubTests(TestCase):
+    """Test the in-process event hub"""
+
+    def setUp(self):
+        self.hub = events.Hub(buffer_size=2, history_size=3, max_subscribers=3,
+                              replay_seconds=60)
+
+    def test_fan_out_and_filter(self):
+        """Test that subscribers get the events of the users they follow"""
+        everything, _ = self.hub.subscribe()
+        mine, _ = self.hub.subscribe(username='name')
+
+        self.hub.publish(events.CREATED, 'name', {'id': 1})
+        self.hub.publish(events.CREATED, 'other', {'id': 2})
+
+        self.assertEqual(everything.queue.qsize(), 2)
+        self.assertEqual(mine.queue.qsize(), 1)
+        self.assertIn('"id":1', mine.queue.get_nowait())
+
+    def test_slow_subscriber_is_dropped(self):
+        """Test that a full buffer ends the subscription after what is queued"""
+        slow, _ = self.hub.subscribe()
+        for index in range(3):
+            self.hub.publish(events.CREATED, 'name', {'id': index})
+
+        self.assertNotIn(slow, self.hub.subscribers)
+        self.assertEqual(len(list(slow.messages(timeout=1))), 2)
+
+    def test_subscribers_are_capped(self):
+        """Test that subscribing beyond the cap fails until a stream closes"""
+        subscriptions = [self.hub.subscribe()[0] for _ in range(3)]
+
+        with self.assertRaises(events.TooManySubscribers):
+            self.hub.subscribe()
+        subscriptions[0].close()
+        self.hub.subscribe()
+
+    def test_replay_from_last_event_id(self):
+        first = self.hub.publish(events.CREATED, 'name', {'id': 1})
+        self.hub.publish(events.UPDATED, 'other', {'id': 2})
+        self.hub.publish(events.DELETED, 'name', {'id': 1})
+        last_event_id = event_ids([first.message])[0]
+
+        _, backlog = self.hub.subscribe(last_event_id=last_event_id)
+        self.assertEqual(len(backlog), 2)
+        _, backlog = self.hub.subscribe(username='name', last_event_id=last_event_id)
+        self.assertEqual(len(backlog), 1)
+        self.assertIn('event: deleted', backlog[0])
+
+    def test_reset_when_too_far_behind(self):
+        """Test that unknown or evicted ids ask the client to reload"""
+        first = self.hub.publish(events.CREATED, 'name', {'id': 1})
+        for index in range(4):
+            self.hub.publish(events.CREATED, 'name', {'id': index})
+
+        for last_event_id in (event_ids([first.message])[0], 'other-1', 'garbage'):
+            _, backlog = self.hub.subscribe(last_event_id=last_event_id)
+            self.assertEqual(backlog, ['event: reset\ndata: {}\n\n'])
+
+    def test_listening_until_replay_window_passes(self):
+        """Test that the hub listens while a stream is open and shortly after"""
+        self.assertFalse(self.hub.listening())
+        subscription, _ = self.hub.subscribe()
+        self.assertTrue(self.hub.listening())
+        subscription.close()
+        self.assertTrue(self.hub.listening())
+
+        self.hub.left_at -= 60
+        self.assertFalse(self.hub.listening())
+
+    def test_reset_after_skipped_events(self):
+        """Test that a reconnect after skipped events asks the client to reload"""
+        first = self.hub.publish(events.CREATED, 'name', {'id': 1})
+        self.hub.skip()
+
+        _, backlog = self.hub.subscribe(last_event_id=event_ids([first.message])[0])
+        self.assertEqual(backlog, ['event: reset\ndata: {}\n\n'])
+        second = self.hub.publish(events.CREATED, 'name', {'id': 2})
+        _, backlog = self.hub.subscribe(last_event_id=event_ids([second.message])[0])
+        self.assertEqual(backlog, [])
+
+
+
+@override_settings(POST_EVENTS=TEST_EVENTS)
+class PostStreamTests(TransactionTestCase):
+    """Test the event stream end to end, signals need real commits"""
+
+    def setUp(self):
+        django_cache.clear()
+        events.reset()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        events.reset()
+
+    def read(self, response):
+        return list(response.streaming_content)
+
+    def test_stream_receives_writes(self):
+        """Test that creates, updates and deletes are pushed in order"""
+        res = self.client.get(STREAM_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+
+        post = self.client.post(CREATE_POST_URL, {'title': 'Live', 'content': 'Content'}).data
+        detail = reverse('post:post-detail', kwargs={'pk': post['id']})
+        self.client.patch(detail, {'title': 'Changed'})
+        self.client.delete(detail)
+        self.client.post(BATCH_URL, [{'op': 'create', 'title': 'Batch', 'content': 'One'}],
+                         format='json')
+
+        body = ''.join(message.decode() for message in self.read(res))
+        kinds = [line[7:] for line in body.splitlines() if line.startswith('event: ')]
+        self.assertEqual(kinds, ['created', 'updated', 'deleted', 'created'])
+        self.assertIn('"title":"Changed"', body)
+        self.assertTrue(body.startswith('retry: 1000'))
+
+    def test_reconnect_replays_missed_events(self):
+        self.client.get(STREAM_URL).close()
+        first = self.client.post(CREATE_POST_URL, {'title': 'First', 'content': 'One'})
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.client.post(CREATE_POST_URL, {'title': 'Second', 'content': 'Two'})
+        first_event = events.get_hub().history[0]
+
+        res = self.client.get(STREAM_URL, HTTP_LAST_EVENT_ID=event_ids([first_event.message])[0])
+
+        body = ''.join(message.decode() for message in self.read(res))
+        self.assertIn('"title":"Second"', body)
+        self.assertNotIn('"title":"First"', body)
+
+    def test_no_events_built_without_listeners(self):
+        """Test that writes skip serializing events while nobody listens"""
+        with patch('post.events.PostSerializer') as serializer:
+            post = self.client.post(CREATE_POST_URL, {'title': 'Quiet', 'content': 'One'}).data
+            self.client.post(BATCH_URL, [{'op': 'delete', 'id': post['id']}], format='json')
+
+        serializer.assert_not_called()
+        self.assertFalse(events.get_hub().history)
+
+    def test_username_filter(self):
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='test123', username='other')
+        res = self.client.get(STREAM_URL, {'username': 'other'})
+
+        self.client.post(CREATE_POST_URL, {'title': 'Mine', 'content': 'Content'})
+        self.client.force_authenticate(user=other)
+        self.client.post(CREATE_POST_URL, {'title': 'Theirs', 'content': 'Content'})
+
+        body = ''.join(message.decode() for message in self.read(res))
+        self.assertIn('Theirs', body)
+        self.assertNotIn('Mine', body)
+
+    def test_concurrent_subscribers(self):
+        """Test that every open stream gets each event"""
+        responses = [self.client.get(STREAM_URL) for _ in range(5)]
+        bodies = [None] * len(responses)
+
+        def consume(index):
+            bodies[index] = ''.join(m.decode() for m in self.read(responses[index]))
+
+        threads = [threading.Thread(target=consume, args=(index,))
+                   for index in range(len(responses))]
+        for thread in threads:
+            thread.start()
+        self.client.post(CREATE_POST_URL, {'title': 'Shared', 'content': 'Content'})
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all('Shared' in body for body in bodies))
+
+    def test_too_many_streams(self):
+        """Test that streams beyond the cap get a 503"""
+        responses = [self.client.get(STREAM_URL) for _ in range(5)]
+
+        res = self.client.get(STREAM_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        for response in responses:
+            response.close()
+        self.assertEqual(self.client.get(STREAM_URL).status_code, status.HTTP_200_OK)
+
+    def test_purge_publishes_tombstones(self):
+        """Test that posts deleted by a purge are pushed as deleted"""
+        post = self.client.post(CREATE_POST_URL, {'title': 'Gone', 'content': 'Content'}).data
+        res = self.client.get(STREAM_URL)
+
+        list(purge.delete_posts(self.user, batch_size=10))
+
+        body = ''.join(message.decode() for message in self.read(res))
+        self.assertIn('event: deleted\ndata: {"id":%d}' % post['id'], body)
+
+    def test_disconnect_ends_stream(self):
+        """Test that a client going away frees its subscription and thread"""
+        token = jwt_encode_handler(jwt_payload_handler(self.user))
+        application = ASGIHandler(max_workers=1)
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': STREAM_URL, 'query_string': b'',
+            'headers': [(b'host', b'testserver'),
+                        (b'authorization', ('Bearer ' + token).encode())],
+        }
+        messages = [{'type': 'http.request', 'body': b''}]
+        statuses = []
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.sleep(0.2)
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        with override_settings(POST_EVENTS=dict(TEST_EVENTS, MAX_SECONDS=30)):
+            started = time.monotonic()
+            asyncio.run(application(scope, receive, send))
+            elapsed = time.monotonic() - started
+        application.executor.shutdown()
+
+        self.assertEqual(statuses, [200])
+        self.assertLess(elapsed, 5)
+        self.assertFalse(events.get_hub().subscribers)
+
+    def test_requires_authentication(self):
+        res = APIClient().get(STREAM_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
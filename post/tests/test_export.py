@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+from post.serializers import PostSerializer
+
+
+def export_url(fmt):
+    return reverse('post:export', kwargs={'fmt': fmt})
+
+
+class ExportTests(TestCase):
+    """Test the streaming post export"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com',
+            password='test123',
+            username='other'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.posts = [
+            models.Post.objects.create(user=self.user, title='Vegan', content='Line 1\nLine "2"'),
+            models.Post.objects.create(user=other, title='Steak', content='Content'),
+        ]
+        models.Post.objects.filter(pk=self.posts[1].pk).update(
+            created_at=timezone.now() - timedelta(days=10))
+
+    def read(self, res):
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return b''.join(res.streaming_content).decode('utf-8')
+
+    def test_ndjson_matches_serializer(self):
+        """Test that each line is the PostSerializer output of a post"""
+        body = self.read(self.client.get(export_url('ndjson')))
+
+        rows = [json.loads(line) for line in body.splitlines()]
+        for post in self.posts:
+            post.refresh_from_db()
+        self.assertEqual(rows, [PostSerializer(post).data for post in self.posts])
+
+    def test_csv(self):
+        """Test the CSV export including quoting"""
+        res = self.client.get(export_url('csv'), HTTP_ACCEPT='text/csv')
+        rows = list(csv.reader(io.StringIO(self.read(res))))
+
+        self.assertEqual(rows[0], ['id', 'user', 'title', 'content', 'created_at', 'updated_at'])
+        self.assertEqual(rows[1][3], 'Line 1\nLine "2"')
+        self.assertEqual(len(rows), 3)
+
+    def test_filters(self):
+        """Test filtering by user, title and date range"""
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        for params, expected in (
+                ({'username': 'other'}, ['Steak']),
+                ({'title': 'vega'}, ['Vegan']),
+                ({'since': since}, ['Vegan']),
+                ({'until': since}, ['Steak'])):
+            body = self.read(self.client.get(export_url('ndjson'), params))
+            titles = [json.loads(line)['title'] for line in body.splitlines()]
+            self.assertEqual(titles, expected, params)
+
+    def test_invalid_requests(self):
+        """Test unknown formats and bad dates"""
+        self.assertEqual(
+            self.client.get(export_url('xml')).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            self.client.get(export_url('csv'), {'since': 'yesterday'}).status_code,
+            status.HTTP_400_BAD_REQUEST)
+
+    def test_export_command(self):
+        """Test the export_posts management command"""
+        out = io.StringIO()
+        call_command('export_posts', '--format', 'ndjson', '--chunk-size', '1', stdout=out)
+
+        titles = [json.loads(line)['title'] for line in out.getvalue().splitlines()]
+        self.assertEqual(titles, ['Vegan', 'Steak'])
@@ -0,0 +1,76 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.urls import reverse
+from io import StringIO
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from core import models
+from post.fast import FastPostSerializer, values_queryset
+from post.renderers import FastJSONRenderer
+from post.serializers import PostSerializer
+
+POST_URL = reverse('post:show-posts')
+
+
+class FastPathTests(TestCase):
+    """Test the values() serializer and the orjson renderer"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        models.Post.objects.create(user=self.user, title='Plain', content='Content')
+        models.Post.objects.create(
+            user=self.user,
+            title='Unicode \u00e9\u4e2d\U0001f600',
+            content='Line\u2028separator "quoted" \\ </script>',
+        )
+        self.queryset = models.Post.objects.select_related('user').order_by('-id')
+
+    def test_output_is_byte_identical(self):
+        """Test that the fast path renders exactly what PostSerializer does"""
+        expected = JSONRenderer().render(PostSerializer(self.queryset, many=True).data)
+        fast = FastJSONRenderer().render(
+            FastPostSerializer().serialize(values_queryset(self.queryset)))
+
+        self.assertEqual(fast, expected)
+
+    def test_sparse_fields(self):
+        """Test that the fast path honours a field subset"""
+        fields = ['title', 'user']
+        expected = PostSerializer(self.queryset, many=True, fields=fields).data
+        fast = FastPostSerializer(fields).serialize(values_queryset(self.queryset, fields))
+
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(expected))
+
+    def test_endpoint_matches_standard_path(self):
+        """Test that listings are the same with the fast path on and off"""
+        params = {'page_size': 1}
+        with override_settings(POST_FAST_SERIALIZER=True):
+            fast = self.client.get(POST_URL, params)
+        django_cache.clear()
+        with override_settings(POST_FAST_SERIALIZER=False):
+            standard = self.client.get(POST_URL, params)
+
+        self.assertEqual(fast.content, standard.content)
+        self.assertEqual(fast['ETag'], standard['ETag'])
+
+        with override_settings(POST_FAST_SERIALIZER=True):
+            following = self.client.get(fast.data['next'])
+        self.assertEqual(following.data['results'][0]['title'], 'Plain')
+
+    def test_benchmark_command(self):
+        """Test that the benchmark checks equality and reports throughput"""
+        out = StringIO()
+        call_command('benchmark_serializers', rows=20, repeat=1, stdout=out)
+
+        self.assertIn('rows/s', out.getvalue())
+        self.assertFalse(models.Post.objects.filter(user__username='benchmark-serializers').exists())
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+
+POST_URL = reverse('post:show-posts')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+@override_settings(POST_PAGE_SIZE=2, POST_MAX_PAGE_SIZE=3)
+class KeysetPaginationTests(TestCase):
+    """Test cursor pagination of the post listings"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+        created_at = timezone.now()
+        self.posts = []
+        for index in range(5):
+            post = models.Post.objects.create(
+                user=self.user,
+                title='Title%d' % index,
+                content='Content',
+            )
+            # Two posts share a timestamp to check the id tie-breaker
+            if index != 3:
+                created_at -= timedelta(minutes=1)
+            models.Post.objects.filter(pk=post.pk).update(created_at=created_at)
+            self.posts.append(post)
+
+    def titles(self, res):
+        return [item['title'] for item in res.data['results']]
+
+    def test_walk_forward_and_back(self):
+        """Test that next and previous links cover every post exactly once"""
+        res = self.client.get(POST_URL)
+        pages = [self.titles(res)]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append(self.titles(res))
+
+        self.assertEqual(pages, [['Title0', 'Title1'], ['Title3', 'Title2'], ['Title4']])
+
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(self.titles(res), ['Title3', 'Title2'])
+        res = self.client.get(res.data['previous'])
+        self.assertEqual(self.titles(res), ['Title0', 'Title1'])
+        self.assertIsNone(res.data['previous'])
+
+    def test_page_size_is_capped(self):
+        """Test that ?page_size can't exceed POST_MAX_PAGE_SIZE"""
+        res = self.client.get(POST_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+
+    def test_no_offset_or_count(self):
+        """Test that deep pages seek instead of counting or skipping rows"""
+        res = self.client.get(POST_URL)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(res.data['next'])
+
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+            self.assertNotIn('OFFSET', query['sql'].upper())
+
+    def test_invalid_cursor(self):
+        """Test that a tampered cursor is rejected"""
+        res = self.client.get(POST_URL, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_user_posts_paginated(self):
+        """Test that the username listing is paginated too"""
+        url = reverse('post:post-username', kwargs={'username': self.user.username})
+        res = self.client.get(url)
+
+        self.assertEqual(self.titles(res), ['Title0', 'Title1'])
+        self.assertIsNotNone(res.data['next'])
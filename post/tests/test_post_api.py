@@ -83,8 +83,8 @@ class PrivatePostApiTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data[0]['title'], self.post.title)
-        self.assertEqual(res.data[0]['content'], self.post.content)
+        self.assertEqual(res.data['results'][0]['title'], self.post.title)
+        self.assertEqual(res.data['results'][0]['content'], self.post.content)
 
     def test_available_post_unlike(self):
         """Test that url POST_UNLIKE_URL available for authorized users"""
@@ -92,7 +92,7 @@ class PrivatePostApiTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 0)
+        self.assertEqual(len(res.data['results']), 0)
 
     def test_methods_delete_put_patch_post(self):
         """Test that user don't delete/put/patch post on url POST_URL """
@@ -213,7 +213,7 @@ class PrivatePostApiTests(TestCase):
         url = reverse('post:post-username', kwargs={'username': self.user.username})
         res = self.client.get(url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
 
 class PrivateAdminPostApiTests(TestCase):
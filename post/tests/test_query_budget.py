@@ -0,0 +1,63 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from core import models
+from core.tests.query_budget import QueryBudgetMixin
+
+# Maximum number of queries each endpoint may issue, whatever the data size
+BUDGETS = {
+    'post:show-posts': 1,
+    'post:post-like': 1,
+    'post:post-unlike': 1,
+    'post:post-username': 1,
+    'post:post-detail': 1,
+}
+
+
+@override_settings(POST_CACHE={'ENABLED': False, 'ALIAS': 'default', 'TIMEOUT': 0})
+class PostQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Test that post endpoints don't issue a query per post"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_posts(self, count):
+        for _ in range(count):
+            number = get_user_model().objects.count()
+            author = get_user_model().objects.create_user(
+                email='author%d@gmail.com' % number,
+                password='test123',
+                username='author%d' % number
+            )
+            models.Post.objects.create(user=author, title='Some title', content='Content')
+            models.Post.objects.create(user=self.user, title='Other', content='Content')
+
+    def test_list_budgets(self):
+        """Test the budgets of every listing"""
+        urls = {
+            'post:show-posts': reverse('post:show-posts'),
+            'post:post-like': reverse('post:post-like', kwargs={'title': 'title'}),
+            'post:post-unlike': reverse('post:post-unlike', kwargs={'title': 'title'}),
+            'post:post-username': reverse(
+                'post:post-username', kwargs={'username': self.user.username}),
+        }
+        for name, url in urls.items():
+            with self.subTest(name):
+                self.assertQueryBudget(
+                    BUDGETS[name], lambda: self.client.get(url), self.create_posts)
+
+    def test_detail_budget(self):
+        """Test the budget of the post detail"""
+        post = models.Post.objects.create(user=self.user, title='Title', content='Content')
+        url = reverse('post:post-detail', kwargs={'pk': post.id})
+
+        self.assertQueryBudget(
+            BUDGETS['post:post-detail'], lambda: self.client.get(url), self.create_posts)
@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from core import models
+
+
+def like_url(title):
+    return reverse('post:post-like', kwargs={'title': title})
+
+
+def unlike_url(title):
+    return reverse('post:post-unlike', kwargs={'title': title})
+
+
+class TitleSearchTests(TestCase):
+    """Test the full-text index behind post-like and post-unlike"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for title in ('Vegan recipes', 'Best VEGAN burger', 'Steak', 'Vegan vegan vegan'):
+            models.Post.objects.create(user=self.user, title=title, content='Content')
+
+    def titles(self, url, params=None):
+        res = self.client.get(url, params)
+        return sorted(item['title'] for item in res.data['results'])
+
+    def test_like_uses_index(self):
+        """Test that a search is a case-insensitive substring match on the index"""
+        with CaptureQueriesContext(connection) as queries:
+            titles = self.titles(like_url('vEgA'))
+
+        self.assertEqual(titles, ['Best VEGAN burger', 'Vegan recipes', 'Vegan vegan vegan'])
+        self.assertIn('core_post_fts', queries.captured_queries[0]['sql'])
+
+    def test_unlike_uses_index(self):
+        """Test that post-unlike returns the complement of post-like"""
+        self.assertEqual(self.titles(unlike_url('vegan')), ['Steak'])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the index is kept in sync with writes"""
+        models.Post.objects.filter(title='Steak').update(title='Vegan steak')
+        models.Post.objects.filter(title='Vegan recipes').delete()
+
+        self.assertEqual(
+            self.titles(like_url('vegan')),
+            ['Best VEGAN burger', 'Vegan steak', 'Vegan vegan vegan']
+        )
+
+    def test_relevance_ordering(self):
+        """Test that ?ordering=relevance puts the best match first"""
+        res = self.client.get(like_url('vegan'), {'ordering': 'relevance', 'page_size': 2})
+        first_page = [item['title'] for item in res.data['results']]
+        res = self.client.get(res.data['next'])
+        second_page = [item['title'] for item in res.data['results']]
+
+        self.assertEqual(first_page[0], 'Vegan vegan vegan')
+        self.assertEqual(len(first_page + second_page), 3)
+        self.assertEqual(len(set(first_page + second_page)), 3)
+
+    def test_short_term_falls_back(self):
+        """Test that terms shorter than a trigram still match"""
+        self.assertEqual(self.titles(like_url('st')), ['Best VEGAN burger', 'Steak'])
+
+    def test_fallback_without_fts(self):
+        """Test that backends without FTS5 use icontains"""
+        with patch('post.search.fts_available', return_value=False):
+            with CaptureQueriesContext(connection) as queries:
+                titles = self.titles(like_url('vegan'), {'ordering': 'relevance'})
+
+        self.assertEqual(titles, ['Best VEGAN burger', 'Vegan recipes', 'Vegan vegan vegan'])
+        self.assertNotIn('core_post_fts', queries.captured_queries[0]['sql'])
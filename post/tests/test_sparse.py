@@ -0,0 +1,75 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+
+POST_URL = reverse('post:show-posts')
+
+
+class SparseFieldsTests(TestCase):
+    """Test ?fields= and ?exclude= on the post reads"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.post = models.Post.objects.create(
+            user=self.user,
+            title='Some title',
+            content='A long content',
+        )
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, params)
+        return res, queries.captured_queries[0]['sql']
+
+    def test_fields_restricts_json_and_sql(self):
+        """Test that only the requested fields are selected and returned"""
+        res, sql = self.get(POST_URL, {'fields': 'id,title'})
+
+        self.assertEqual(set(res.data['results'][0]), {'id', 'title'})
+        self.assertNotIn('"core_post"."content"', sql)
+        self.assertNotIn('"core_user"."email"', sql)
+
+    def test_exclude_defers_content(self):
+        """Test that excluded fields are dropped from the JSON and the SQL"""
+        res, sql = self.get(POST_URL, {'exclude': 'content'})
+
+        self.assertEqual(
+            set(res.data['results'][0]),
+            {'id', 'user', 'title', 'created_at', 'updated_at'}
+        )
+        self.assertEqual(res.data['results'][0]['user'], 'name')
+        self.assertNotIn('"core_post"."content"', sql)
+
+    def test_detail_fields(self):
+        """Test that the detail view supports fields too"""
+        url = reverse('post:post-detail', kwargs={'pk': self.post.id})
+        res, sql = self.get(url, {'fields': 'title'})
+
+        self.assertEqual(res.data, {'title': 'Some title'})
+
+    def test_unknown_field(self):
+        """Test that unknown field names are rejected"""
+        res = self.client.get(POST_URL, {'fields': 'title,password'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_pages_use_no_extra_queries(self):
+        """Test that deferred columns aren't loaded lazily afterwards"""
+        models.Post.objects.create(user=self.user, title='Other', content='Content')
+
+        with self.assertNumQueries(1):
+            self.client.get(POST_URL, {'fields': 'title'})
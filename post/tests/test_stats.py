@@ -0,0 +1,168 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from io import StringIO
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import models
+from post import stats
+
+CREATE_POST_URL = reverse('post:create-post')
+BATCH_URL = reverse('post:batch')
+ME_URL = reverse('user:me')
+USERS_URL = reverse('user:users')
+
+
+def detail_url(pk):
+    return reverse('post:post-detail', kwargs={'pk': pk})
+
+
+class PostStatsTests(TestCase):
+    """Test the per-user post statistics"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get_stats(self, user=None):
+        return models.UserPostStats.objects.get(user=user or self.user)
+
+    def assertMatchesPosts(self, user=None):
+        user = user or self.user
+        posts = models.Post.objects.filter(user=user)
+        current = self.get_stats(user)
+        self.assertEqual(current.post_count, posts.count())
+        self.assertEqual(current.last_created_at,
+                         posts.order_by('-created_at').values_list('created_at', flat=True).first())
+        self.assertEqual(current.last_updated_at,
+                         posts.order_by('-updated_at').values_list('updated_at', flat=True).first())
+
+    def test_create_update_delete(self):
+        """Test that every single post write keeps the statistics current"""
+        first = self.client.post(CREATE_POST_URL, {'title': 'First', 'content': 'One'})
+        second = self.client.post(CREATE_POST_URL, {'title': 'Second', 'content': 'Two'})
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertMatchesPosts()
+        self.assertEqual(self.get_stats().post_count, 2)
+
+        res = self.client.patch(detail_url(first.data['id']), {'title': 'Changed'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertMatchesPosts()
+
+        self.client.delete(detail_url(second.data['id']))
+        self.assertMatchesPosts()
+        self.assertEqual(self.get_stats().post_count, 1)
+
+        self.client.delete(detail_url(first.data['id']))
+        current = self.get_stats()
+        self.assertEqual(current.post_count, 0)
+        self.assertIsNone(current.last_created_at)
+        self.assertIsNone(current.last_updated_at)
+
+    def test_batch(self):
+        """Test that batches update the statistics of every user touched"""
+        post = models.Post.objects.create(user=self.user, title='Old', content='Content')
+        stats.rebuild([self.user.pk])
+
+        res = self.client.post(BATCH_URL, [
+            {'op': 'create', 'title': 'First', 'content': 'One'},
+            {'op': 'create', 'title': 'Second', 'content': 'Two'},
+            {'op': 'delete', 'id': post.id},
+        ], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertMatchesPosts()
+        self.assertEqual(self.get_stats().post_count, 2)
+
+    def test_delete_keeps_timestamps_of_newer_posts(self):
+        """Test that deleting an older post doesn't aggregate the posts again"""
+        old = models.Post.objects.create(user=self.user, title='Old', content='Content')
+        models.Post.objects.create(user=self.user, title='New', content='Content')
+        stats.rebuild([self.user.pk])
+
+        old.delete()
+        with CaptureQueriesContext(connection) as queries:
+            stats.record_deleted(self.user.pk, [old])
+
+        self.assertEqual(len(queries), 2)
+        self.assertMatchesPosts()
+
+    def test_timestamps_stored_like_post_timestamps(self):
+        """Test that adjusted timestamps are stored in the database's datetime format"""
+        self.client.post(CREATE_POST_URL, {'title': 'First', 'content': 'One'})
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT last_created_at FROM core_userpoststats WHERE user_id = %s',
+                           [self.user.pk])
+            stored = cursor.fetchone()[0]
+            cursor.execute('SELECT created_at FROM core_post WHERE user_id = %s', [self.user.pk])
+            expected = cursor.fetchone()[0]
+
+        self.assertEqual(stored, expected)
+
+    def test_failed_batch_changes_nothing(self):
+        """Test that a rolled back batch leaves the statistics alone"""
+        self.client.post(BATCH_URL, [
+            {'op': 'create', 'title': 'First', 'content': 'One'},
+            {'op': 'delete', 'id': 0},
+        ], format='json')
+
+        self.assertEqual(self.get_stats().post_count, 0)
+
+    def test_missing_row_is_created(self):
+        """Test that users without a stats row get one on their next post"""
+        models.UserPostStats.objects.all().delete()
+
+        self.client.post(CREATE_POST_URL, {'title': 'First', 'content': 'One'})
+
+        self.assertMatchesPosts()
+
+    def test_user_endpoints(self):
+        """Test that the user endpoints show the statistics"""
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['posts'],
+                         {'count': 0, 'last_created_at': None, 'last_updated_at': None})
+
+        self.client.post(CREATE_POST_URL, {'title': 'First', 'content': 'One'})
+        self.client.force_authenticate(user=get_user_model().objects.get(pk=self.user.pk))
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.data['posts']['count'], 1)
+        self.assertIsNotNone(res.data['posts']['last_created_at'])
+
+        admin = get_user_model().objects.create_superuser(
+            email='admin@gmail.com', password='test123', username='admin')
+        self.client.force_authenticate(user=admin)
+        with self.assertNumQueries(1):
+            res = self.client.get(USERS_URL)
+        counts = {user['username']: user['posts']['count'] for user in res.data}
+        self.assertEqual(counts, {'name': 1, 'admin': 0})
+
+    def test_repair_command(self):
+        """Test that repair_post_stats fixes drifted and missing rows"""
+        other = get_user_model().objects.create_user(
+            email='other@gmail.com', password='test123', username='other')
+        for user in (self.user, self.user, other):
+            models.Post.objects.create(user=user, title='Title', content='Content')
+        models.UserPostStats.objects.filter(user=self.user).update(post_count=7)
+        models.UserPostStats.objects.filter(user=other).delete()
+
+        out = StringIO()
+        call_command('repair_post_stats', chunk_size=1, stdout=out)
+
+        self.assertIn('Checked 2 users, repaired 2', out.getvalue())
+        self.assertMatchesPosts()
+        self.assertMatchesPosts(other)
+        out = StringIO()
+        call_command('repair_post_stats', stdout=out)
+        self.assertIn('repaired 0', out.getvalue())
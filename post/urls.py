@@ -10,5 +10,9 @@ urlpatterns = [
     path('like/<str:title>/', views.PostListLike.as_view(), name='post-like'),
     path('unlike/<str:title>/', views.PostListUnLike.as_view(), name='post-unlike'),
     path('create/', views.CreatePost.as_view(), name='create-post'),
+    path('batch/', views.BatchPosts.as_view(), name='batch'),
+    path('changes/', views.PostChanges.as_view(), name='changes'),
+    path('stream/', views.PostStream.as_view(), name='stream'),
+    path('export/<str:fmt>/', views.ExportPosts.as_view(), name='export'),
     path('username/<str:username>/', views.UserPosts.as_view(), name='post-username'),
 ]
@@ -1,8 +1,27 @@
-from rest_framework import generics
-from core.models import Post
+from rest_framework import generics, status
+from rest_framework.exceptions import ParseError, PermissionDenied, ValidationError
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from core.db import retry_on_locked
+from core.idempotency import IdempotencyMixin
+from core.models import ArchivedPost, Post
+from core.replicas import ReplicaReadMixin
+from core.throttling import PostWriteThrottle
+from . import changes, events, export, search, stats
+from .archive import ArchiveReadMixin
+from .batch import Batch
+from .cache import CachedResponseMixin
+from .conditional import ConditionalDetailMixin, ConditionalListMixin
+from .fast import FastListMixin
+from .pagination import KeysetPagination
 from .serializers import PostSerializer
+from .sparse import SparseFieldsMixin
 from rest_framework.permissions import IsAuthenticated, BasePermission
-from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from user.authentication import CachedJSONWebTokenAuthentication
 
 
 class IsUser(BasePermission):
@@ -14,59 +33,246 @@ class IsUser(BasePermission):
         return bool(request.user and not request.user.is_staff)
 
 
-class CreatePost(generics.CreateAPIView):
+class CreatePost(ReplicaReadMixin, IdempotencyMixin, generics.CreateAPIView):
     serializer_class = PostSerializer
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
     permission_classes = (IsAuthenticated, IsUser,)
+    throttle_classes = (PostWriteThrottle,)
 
+    @retry_on_locked
     def perform_create(self, serializer):
         """Create a new Post"""
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            post = serializer.save(user=self.request.user)
+            stats.record_created(post.user_id, [post])
 
 
-class UserPosts(generics.ListAPIView):
+class BatchPosts(ReplicaReadMixin, generics.GenericAPIView):
+    """Create, update and delete many posts in one request and transaction"""
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    throttle_classes = (PostWriteThrottle,)
+
+    def post(self, request, *args, **kwargs):
+        operations = request.data
+        if not isinstance(operations, list):
+            raise ParseError('Expected a list of operations.')
+        if len(operations) > settings.POST_BATCH_MAX_OPERATIONS:
+            raise ParseError('At most %d operations per batch.' % settings.POST_BATCH_MAX_OPERATIONS)
+
+        batch = Batch(request, operations)
+        if batch.has_creates and not IsUser().has_permission(request, self):
+            raise PermissionDenied()
+
+        if not batch.validate():
+            return Response(batch.results, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(batch.execute())
+
+
+class UserPosts(ReplicaReadMixin, SparseFieldsMixin, CachedResponseMixin, ArchiveReadMixin,
+                FastListMixin, ConditionalListMixin, generics.ListAPIView):
     serializer_class = PostSerializer
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
+
+    def get_cache_versions(self):
+        return ['user:%s' % self.kwargs['username']]
 
     def get_queryset(self):
-        queryset = Post.objects.filter(user__username=self.kwargs['username'])
+        queryset = Post.objects.select_related('user').filter(
+            user__username=self.kwargs['username'])
         return queryset
 
+    def get_archive_queryset(self):
+        return ArchivedPost.objects.select_related('user').filter(
+            user__username=self.kwargs['username'])
+
 
-class PostDetail(generics.RetrieveUpdateDestroyAPIView):
+class PostDetail(ReplicaReadMixin, SparseFieldsMixin, CachedResponseMixin, ArchiveReadMixin,
+                 ConditionalDetailMixin, generics.RetrieveUpdateDestroyAPIView):
     serializer_class = PostSerializer
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (PostWriteThrottle,)
+    cache_per_user = True
+
+    def get_cache_versions(self):
+        return ['post:%s' % self.kwargs['pk']]
 
     def get_queryset(self):
-        queryset = Post.objects.filter(user=self.request.user, id=self.kwargs["pk"])
+        return self.restrict(Post.objects.select_related('user'))
+
+    def get_archive_queryset(self):
+        return self.restrict(ArchivedPost.objects.select_related('user'))
 
-        if self.request.user.is_superuser:
-            queryset = Post.objects.filter(id=self.kwargs["pk"])
+    def restrict(self, queryset):
+        """The requested post, if the user may see it"""
+        queryset = queryset.filter(id=self.kwargs["pk"])
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(user=self.request.user)
 
         return queryset
 
+    def perform_update(self, serializer):
+        # Runs inside save_update's transaction
+        post = serializer.save()
+        stats.record_updated(post.user_id, post.updated_at)
+
+    @retry_on_locked
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            stats.record_deleted(instance.user_id, [instance])
 
-class PostList(generics.ListAPIView):
+
+class PostList(ReplicaReadMixin, SparseFieldsMixin, CachedResponseMixin, ArchiveReadMixin,
+               FastListMixin, ConditionalListMixin, generics.ListAPIView):
     """Class that show all posts for authenticated users"""
     serializer_class = PostSerializer
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Post.objects.all()
+        return Post.objects.select_related('user')
+
+    def get_archive_queryset(self):
+        return ArchivedPost.objects.select_related('user')
 
 
 class PostListLike(PostList):
-    """Class that show all "posts like" for authenticated users"""
+    """Class that show all "posts like" for authenticated users
+
+    Pass ?ordering=relevance to get the best matches first.
+    """
 
     def get_queryset(self):
-        return Post.objects.filter(title__icontains=self.kwargs["title"])
+        queryset = search.filter_title(
+            Post.objects.select_related('user'), self.kwargs["title"])
+
+        if self.request.query_params.get('ordering') == 'relevance':
+            ranked = search.rank(queryset, self.kwargs["title"])
+            if ranked is not None:
+                self.keyset_ordering = ('search_rank', 'id')
+                queryset = ranked
+
+        return queryset
+
+    def get_archive_queryset(self):
+        return search.filter_title(
+            ArchivedPost.objects.select_related('user'), self.kwargs["title"])
 
 
 class PostListUnLike(PostList):
     """Class that show all "posts unlike" for authenticated users"""
 
     def get_queryset(self):
-        return Post.objects.exclude(title__icontains=self.kwargs["title"])
+        return search.exclude_title(
+            Post.objects.select_related('user'), self.kwargs["title"])
+
+    def get_archive_queryset(self):
+        return search.exclude_title(
+            ArchivedPost.objects.select_related('user'), self.kwargs["title"])
+
+
+class PostChanges(ReplicaReadMixin, generics.GenericAPIView):
+    """Posts created, updated or deleted since a sync token
+
+    Without ?since= only the token to start from is returned.  Takes an
+    optional ?username= to follow the posts of one user.
+    """
+    serializer_class = PostSerializer
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        token = request.query_params.get('since')
+        if not token:
+            return Response({'changes': [], 'next': changes.encode_token(changes.latest()),
+                             'has_more': False})
+
+        since = changes.decode_token(token)
+        user_id = None
+        username = request.query_params.get('username')
+        if username:
+            user_id = get_user_model().objects.filter(
+                username=username).values_list('pk', flat=True).first()
+            if user_id is None:
+                raise Http404
+
+        entries, last, has_more = changes.read(since, user_id=user_id)
+        data = []
+        for post_id, post in entries:
+            if post is None:
+                data.append({'id': post_id, 'deleted': True})
+            else:
+                data.append({'id': post_id, 'deleted': False,
+                             'post': self.get_serializer(post).data})
+
+        return Response({'changes': data, 'next': changes.encode_token(last),
+                         'has_more': has_more})
+
+
+class PostStream(APIView):
+    """Server-sent events for every post created, updated or deleted
+
+    Takes ?username= to follow the posts of one user, and replays what was
+    missed since the Last-Event-ID header of a reconnecting client.
+    """
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # Accept: text/event-stream isn't a renderer's media type
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request):
+        subscription, backlog = events.get_hub().subscribe(
+            username=request.query_params.get('username') or None,
+            last_event_id=request.META.get('HTTP_LAST_EVENT_ID'),
+        )
+        response = StreamingHttpResponse(
+            events.Stream(subscription, backlog),
+            content_type='text/event-stream',
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class ExportPosts(APIView):
+    """Stream posts as NDJSON or CSV, filterable like the listings
+
+    Takes ?username=, ?title= and a created_at range with ?since= / ?until=.
+    """
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def perform_content_negotiation(self, request, force=False):
+        # The body isn't rendered, so don't refuse Accept: text/csv
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, fmt):
+        if fmt not in export.FORMATS:
+            raise Http404
+
+        bounds = {}
+        for name in ('since', 'until'):
+            if request.query_params.get(name):
+                bounds[name] = export.parse_bound(request.query_params[name])
+                if bounds[name] is None:
+                    raise ValidationError({name: ['Expected an ISO date or datetime.']})
+
+        queryset = export.export_queryset(
+            username=request.query_params.get('username'),
+            title=request.query_params.get('title'),
+            **bounds
+        )
+        response = StreamingHttpResponse(
+            export.iter_export(fmt, export.iter_rows(queryset)),
+            content_type=export.FORMATS[fmt],
+        )
+        response['Content-Disposition'] = 'attachment; filename="posts.%s"' % fmt
+        return response
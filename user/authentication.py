@@ -0,0 +1,87 @@
+import time
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.translation import ugettext as _
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework_jwt.settings import api_settings
+
+from core import metrics
+from core.lru import LRUCache
+
+jwt_decode_handler = api_settings.JWT_DECODE_HANDLER
+jwt_get_username_from_payload = api_settings.JWT_PAYLOAD_GET_USERNAME_HANDLER
+
+tokens = LRUCache(settings.JWT_AUTH_CACHE['MAX_TOKENS'])
+users = LRUCache(settings.JWT_AUTH_CACHE['MAX_USERS'])
+
+
+def snapshot(user):
+    """Plain values of a user, turned back into a fresh instance per request"""
+    names = [field.attname for field in user._meta.concrete_fields]
+    return user._state.db, names, [getattr(user, name) for name in names]
+
+
+def restore(data):
+    db, names, values = data
+    return get_user_model().from_db(db, names, values)
+
+
+def invalidate_user(pk):
+    users.delete(pk)
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JSONWebTokenAuthentication that remembers verified tokens and users.
+
+    A token's claims are cached until the token expires, so its signature
+    is verified once rather than on every request, and the user row is
+    cached for JWT_AUTH_CACHE['USER_TTL'] seconds or until it is saved.
+    """
+
+    def authenticate(self, request):
+        with metrics.timed('auth'):
+            return self._authenticate(request)
+
+    def _authenticate(self, request):
+        jwt_value = self.get_jwt_value(request)
+        if jwt_value is None:
+            return None
+
+        payload = tokens.get(jwt_value)
+        if payload is None:
+            payload = self.decode(jwt_value)
+            ttl = payload['exp'] - time.time() if 'exp' in payload else None
+            tokens.set(jwt_value, payload, ttl)
+
+        user = self.authenticate_credentials(payload)
+
+        return (user, jwt_value)
+
+    def decode(self, jwt_value):
+        try:
+            return jwt_decode_handler(jwt_value)
+        except jwt.ExpiredSignature:
+            msg = _('Signature has expired.')
+            raise exceptions.AuthenticationFailed(msg)
+        except jwt.DecodeError:
+            msg = _('Error decoding signature.')
+            raise exceptions.AuthenticationFailed(msg)
+        except jwt.InvalidTokenError:
+            raise exceptions.AuthenticationFailed()
+
+    def authenticate_credentials(self, payload):
+        username = jwt_get_username_from_payload(payload)
+        cached = users.get(payload.get('user_id'))
+        if cached is not None:
+            user = restore(cached)
+            if username and user.get_username() == username and user.is_active:
+                return user
+
+        user = super().authenticate_credentials(payload)
+        users.set(user.pk, snapshot(user), settings.JWT_AUTH_CACHE['USER_TTL'])
+
+        return user
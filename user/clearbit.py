@@ -5,20 +5,54 @@ clearbit.key = '212c6193c089b2ce94e194efe19d36e9'
 CLEARBIT = True
 
 
+class EnrichmentError(Exception):
+    """Raised when the enrichment provider can't give an answer right now"""
+
+
+def clearbitFetch(email):
+    """Ask Clearbit for person data, raise EnrichmentError on provider errors"""
+    if not CLEARBIT:
+        return False
+
+    try:
+        res = clearbit.Enrichment.find(email=email, stream=True)
+    except Exception as exc:
+        raise EnrichmentError(str(exc)) from exc
+
+    if res is not None and res.get('pending'):
+        raise EnrichmentError('Lookup for %s is still pending' % email)
+
+    try:
+        user_data = {'fullName': res['person']['name']['fullName'],
+                     'givenName': res['person']['name']['givenName'],
+                     'location': res['person']['location'],
+                     'timeZone': res['person']['timeZone']}
+
+        return user_data
+
+    except (KeyError, TypeError):
+        return False
+
+
+def clearbitLookup(email):
+    """Cached clearbitFetch, see user.enrichment_cache"""
+    from .enrichment_cache import get_enrichment_cache
+
+    return get_enrichment_cache().lookup(email, clearbitFetch)
+
+
 def clearbitCheck(email):
-    if CLEARBIT:
-        try:
-            res = clearbit.Enrichment.find(email=email, stream=True)
-            try:
-                user_data = {'fullName': res['person']['name']['fullName'],
-                             'givenName': res['person']['name']['givenName'],
-                             'location': res['person']['location'],
-                             'timeZone': res['person']['timeZone']}
-
-                return user_data
-
-            except:
-                return False
-        except:
-            return False
-    return False
+    try:
+        return clearbitLookup(email)
+    except EnrichmentError:
+        return False
+
+
+def fakeClearbitCheck(email):
+    """Offline stand-in for the Clearbit lookup, used in tests"""
+    name = email.split('@')[0].replace('.', ' ').title()
+
+    return {'fullName': name,
+            'givenName': name.split(' ')[0],
+            'location': 'Nowhere',
+            'timeZone': 'UTC'}
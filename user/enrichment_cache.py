@@ -0,0 +1,123 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from core.lru import LRUCache, MISSING
+from .clearbit import EnrichmentError
+
+HIT = 'hit'
+MISS = 'miss'
+ERROR = 'error'
+
+
+class EnrichmentCache:
+    """Caches enrichment lookups in process and optionally in a Django cache
+
+    Hits, misses and provider errors are cached with their own TTLs, so
+    known misses and a failing provider don't cost a round trip per signup.
+    Once a domain has `domain_miss_threshold` misses and no hits, every
+    address on it is treated as a miss without asking the provider.
+    """
+
+    def __init__(self, max_entries=10000, hit_ttl=7 * 24 * 3600,
+                 miss_ttl=24 * 3600, error_ttl=20, cache_alias=None,
+                 domain_miss_threshold=0):
+        self.local = LRUCache(max_entries)
+        self.shared = caches[cache_alias] if cache_alias else None
+        self.ttls = {HIT: hit_ttl, MISS: miss_ttl, ERROR: error_ttl}
+        self.domain_miss_threshold = domain_miss_threshold
+        self.counters = {'hits': 0, 'misses': 0, 'provider_calls': 0}
+        self._lock = threading.Lock()
+
+    def lookup(self, email, fetch):
+        """Return cached data for email or call fetch(email) and cache it"""
+        email = email.strip().lower()
+        key = 'enrichment:%s' % email
+        domain_key = 'enrichment-domain:%s' % email.rpartition('@')[2]
+
+        entry = self._get(key)
+        if entry is MISSING and self._domain_is_miss(domain_key):
+            entry = (MISS, None)
+
+        if entry is not MISSING:
+            self._count('hits')
+        else:
+            self._count('misses')
+            self._count('provider_calls')
+            try:
+                data = fetch(email)
+            except EnrichmentError as exc:
+                entry = (ERROR, str(exc))
+            else:
+                entry = (HIT, data) if data else (MISS, None)
+            self._set(key, entry, self.ttls[entry[0]])
+            self._record_domain(domain_key, entry[0])
+
+        kind, value = entry
+        if kind == ERROR:
+            raise EnrichmentError(value)
+
+        return value if kind == HIT else False
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def clear(self):
+        self.local.clear()
+        with self._lock:
+            for name in self.counters:
+                self.counters[name] = 0
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _get(self, key):
+        entry = self.local.get(key, MISSING)
+        if entry is MISSING and self.shared is not None:
+            entry = self.shared.get(key, MISSING)
+            if entry is not MISSING:
+                entry = tuple(entry)
+                self.local.set(key, entry, self.ttls[entry[0]])
+
+        return entry
+
+    def _set(self, key, entry, ttl):
+        self.local.set(key, entry, ttl)
+        if self.shared is not None:
+            self.shared.set(key, entry, ttl)
+
+    def _domain_is_miss(self, domain_key):
+        if not self.domain_miss_threshold:
+            return False
+
+        misses = self._get(domain_key)
+        return misses is not MISSING and misses[1] >= self.domain_miss_threshold
+
+    def _record_domain(self, domain_key, kind):
+        if not self.domain_miss_threshold or kind == ERROR:
+            return
+
+        entry = self._get(domain_key)
+        misses = 0 if entry is MISSING else entry[1]
+        if kind == HIT:
+            # A single hit proves the provider knows people on this domain
+            misses = -1
+        elif misses >= 0:
+            misses += 1
+        self._set(domain_key, (MISS, misses), self.ttls[MISS])
+
+
+_cache = None
+
+
+def get_enrichment_cache():
+    """Return the process wide cache configured by ENRICHMENT_CACHE"""
+    global _cache
+    if _cache is None:
+        options = {key.lower(): value for key, value in settings.ENRICHMENT_CACHE.items()}
+        _cache = EnrichmentCache(**options)
+
+    return _cache
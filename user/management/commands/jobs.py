@@ -0,0 +1,72 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count
+
+from core.models import Job
+from user import tasks
+
+
+def worker(poll_interval):
+    """Entry point of a worker process"""
+    connections.close_all()
+    tasks.work(wait=True, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run, drain or inspect the background job queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=('run', 'drain', 'inspect'))
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Number of worker processes for "run"',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to sleep when the queue is empty',
+        )
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of jobs to process for "drain"',
+        )
+
+    def handle(self, *args, **options):
+        getattr(self, options['action'])(**options)
+
+    def run(self, workers, poll_interval, **options):
+        if workers <= 1:
+            tasks.work(wait=True, poll_interval=poll_interval)
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=worker, args=(poll_interval,))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+
+    def drain(self, limit, **options):
+        processed = tasks.work(limit=limit)
+        self.stdout.write('Processed %d job(s)' % processed)
+
+    def inspect(self, **options):
+        rows = Job.objects.values('kind', 'status').annotate(
+            total=Count('id')).order_by('kind', 'status')
+        for row in rows:
+            self.stdout.write('%(kind)s\t%(status)s\t%(total)d' % row)
+
+        for job in Job.objects.filter(status=Job.STATUS_RUNNING, progress__gt=0):
+            self.stdout.write('running #%s %s: %d done' % (job.pk, job.kind, job.progress))
+
+        for job in Job.objects.filter(status=Job.STATUS_FAILED).order_by('-updated_at')[:20]:
+            self.stdout.write('failed #%s %s (%d attempts): %s' % (
+                job.pk, job.kind, job.attempts, job.last_error))
@@ -1,6 +1,14 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
+from core.models import UserPostStats
+
+
+class PostStatsSerializer(serializers.Serializer):
+    count = serializers.IntegerField(source='post_count')
+    last_created_at = serializers.DateTimeField()
+    last_updated_at = serializers.DateTimeField()
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object"""
@@ -24,3 +32,18 @@ class UserSerializer(serializers.ModelSerializer):
             user.save()
 
         return user
+
+
+class UserWithStatsSerializer(UserSerializer):
+    """A user along with the statistics of their posts"""
+    posts = serializers.SerializerMethodField()
+
+    class Meta(UserSerializer.Meta):
+        fields = UserSerializer.Meta.fields + ('posts',)
+
+    def get_posts(self, user):
+        try:
+            stats = user.post_stats
+        except UserPostStats.DoesNotExist:
+            stats = UserPostStats(user_id=user.pk)
+        return PostStatsSerializer(stats).data
@@ -0,0 +1,197 @@
+import logging
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Job, Post
+from post import purge
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handler(kind):
+    """Register a function as the handler for jobs of the given kind"""
+    def decorator(func):
+        HANDLERS[kind] = func
+        return func
+
+    return decorator
+
+
+def backoff(attempts):
+    """Seconds to wait before retrying a job that failed `attempts` times"""
+    delay = settings.JOB_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0)
+    delay = min(delay, settings.JOB_MAX_BACKOFF_SECONDS)
+
+    return delay + random.uniform(0, delay / 10)
+
+
+def runnable(now=None):
+    """Jobs that are due, including running jobs whose lease has expired"""
+    now = now or timezone.now()
+
+    return Job.objects.filter(
+        Q(status=Job.STATUS_PENDING) | Q(status=Job.STATUS_RUNNING),
+        run_after__lte=now,
+    ).order_by('run_after', 'id')
+
+
+def claim():
+    """Atomically take the next runnable job, or return None"""
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+    for job in runnable(now)[:10]:
+        if job.status == Job.STATUS_RUNNING and job.attempts >= job.max_attempts:
+            # Its last worker died without recording the outcome, e.g. killed
+            # for running out of memory; running it again may do the same
+            failed = Job.objects.filter(
+                pk=job.pk,
+                status=job.status,
+                attempts=job.attempts,
+            ).update(
+                status=Job.STATUS_FAILED,
+                last_error='Lease expired on the last attempt',
+                updated_at=now,
+            )
+            if failed:
+                logger.error('Job %s failed permanently: lease expired', job.pk)
+            continue
+
+        claimed = Job.objects.filter(
+            pk=job.pk,
+            status=job.status,
+            attempts=job.attempts,
+        ).update(
+            status=Job.STATUS_RUNNING,
+            attempts=F('attempts') + 1,
+            run_after=lease,
+            updated_at=now,
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+    return None
+
+
+def run(job):
+    """Run a claimed job and record the outcome"""
+    try:
+        HANDLERS[job.kind](job)
+    except Exception as exc:
+        job.last_error = '%s: %s' % (type(exc).__name__, exc)
+        if job.attempts >= job.max_attempts:
+            job.status = Job.STATUS_FAILED
+            logger.error('Job %s failed permanently: %s', job.pk, job.last_error)
+        else:
+            job.status = Job.STATUS_PENDING
+            job.run_after = timezone.now() + timedelta(seconds=backoff(job.attempts))
+        job.save(update_fields=['status', 'run_after', 'last_error', 'updated_at'])
+        return False
+
+    job.status = Job.STATUS_DONE
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+    return True
+
+
+def extend_lease(job, progress=0):
+    """Keep a long running job claimed, adding `progress` to its count"""
+    now = timezone.now()
+    job.run_after = now + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    job.progress += progress
+    Job.objects.filter(pk=job.pk).update(
+        run_after=job.run_after,
+        progress=F('progress') + progress,
+        updated_at=now,
+    )
+
+
+def work(limit=None, wait=False, poll_interval=1.0):
+    """Process jobs until none are due (or forever when `wait` is set)"""
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim()
+        if job is None:
+            if not wait:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        run(job)
+        processed += 1
+
+    return processed
+
+
+@handler(Job.KIND_ENRICH)
+def enrich_user(job):
+    """Fill in the profile fields of a new user from the enrichment backend"""
+    user = job.user
+    if user is None:
+        return
+
+    lookup = import_string(settings.ENRICHMENT_BACKEND)
+    user_data = lookup(user.email)
+    if not user_data:
+        return
+
+    user.fullName = user_data['fullName'] or ''
+    user.givenName = user_data['givenName'] or ''
+    user.location = user_data['location'] or ''
+    user.timeZone = user_data['timeZone'] or ''
+    user.save(update_fields=['fullName', 'givenName', 'location', 'timeZone'])
+
+
+def missing_purge_permissions(actor, users):
+    """Names of the models `actor` may not delete when purging `users`"""
+    missing = set()
+    if not actor.has_perm('core.delete_user'):
+        missing.add(get_user_model()._meta.verbose_name)
+    if not actor.has_perm('core.delete_post') and Post.objects.filter(user__in=users).exists():
+        missing.add(Post._meta.verbose_name)
+    return missing
+
+
+def purge_later(user):
+    """Deactivate `user` now and delete them and their posts in the background"""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        job = Job.objects.filter(
+            kind=Job.KIND_PURGE_USER,
+            user=user,
+            status__in=(Job.STATUS_PENDING, Job.STATUS_RUNNING),
+        ).first()
+        if job is None:
+            job = Job.objects.create(kind=Job.KIND_PURGE_USER, user=user)
+    return job
+
+
+@handler(Job.KIND_PURGE_USER)
+def purge_user(job):
+    """Delete a deactivated user's posts in batches, then the user"""
+    user = job.user
+    if user is None:
+        return
+    if user.is_active:
+        logger.warning('Not purging user %s, it was reactivated', user.pk)
+        return
+
+    for deleted in purge.delete_posts(user, settings.USER_PURGE_BATCH_SIZE):
+        extend_lease(job, deleted)
+        logger.info('Purging user %s: %d posts deleted', user.pk, job.progress)
+
+    user.delete()
+    # The job row's user_id was set to NULL by the delete
+    job.user = None
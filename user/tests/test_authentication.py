@@ -0,0 +1,86 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework_jwt.settings import api_settings
+
+from user import authentication
+
+ME_URL = reverse('user:me')
+
+jwt_payload_handler = api_settings.JWT_PAYLOAD_HANDLER
+jwt_encode_handler = api_settings.JWT_ENCODE_HANDLER
+
+
+class CachedAuthenticationTests(TestCase):
+    """Test caching of verified tokens and users"""
+
+    def setUp(self):
+        authentication.tokens.clear()
+        authentication.users.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@gmail.com',
+            password='test123',
+            username='name'
+        )
+        self.client = APIClient()
+        self.token = jwt_encode_handler(jwt_payload_handler(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+
+    def test_repeated_requests_skip_decode_and_lookup(self):
+        """Test that a known token is neither decoded nor looked up again"""
+        self.assertEqual(self.client.get(ME_URL).status_code, status.HTTP_200_OK)
+
+        with patch('user.authentication.jwt_decode_handler') as decode:
+            # The only query left is the view's, for the post statistics
+            with self.assertNumQueries(1):
+                res = self.client.get(ME_URL)
+
+        decode.assert_not_called()
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deactivated_user_rejected(self):
+        """Test that deactivating a user invalidates the cached snapshot"""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_change_visible(self):
+        """Test that user changes are seen by the next request"""
+        self.client.get(ME_URL)
+
+        self.user.username = 'renamed'
+        self.user.save()
+
+        self.assertEqual(self.client.get(ME_URL).data['username'], 'renamed')
+
+    def test_expired_token_rejected(self):
+        """Test that expired tokens are still refused"""
+        payload = jwt_payload_handler(self.user)
+        payload['exp'] = timezone.now() - timedelta(seconds=1)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + jwt_encode_handler(payload))
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_each_request_gets_its_own_user(self):
+        """Test that a request can't modify the user seen by the next one"""
+        self.client.get(ME_URL)
+        payload = jwt_payload_handler(self.user)
+        auth = authentication.CachedJSONWebTokenAuthentication()
+
+        first = auth.authenticate_credentials(payload)
+        first.username = 'mutated'
+        second = auth.authenticate_credentials(payload)
+
+        self.assertEqual(second.username, 'name')
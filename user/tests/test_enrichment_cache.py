@@ -0,0 +1,103 @@
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.test import TestCase
+
+from user.clearbit import EnrichmentError
+from user.enrichment_cache import EnrichmentCache
+
+PERSON = {'fullName': 'Jane Doe', 'givenName': 'Jane',
+          'location': 'Oslo', 'timeZone': 'Europe/Oslo'}
+
+
+class FakeProvider:
+    """Records calls and answers from a fixed table"""
+
+    def __init__(self, answers):
+        self.answers = answers
+        self.calls = []
+
+    def __call__(self, email):
+        self.calls.append(email)
+        answer = self.answers.get(email, False)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class EnrichmentCacheTests(TestCase):
+    """Test the cache in front of the enrichment provider"""
+
+    def setUp(self):
+        django_cache.clear()
+
+    def test_hit_is_cached(self):
+        """Test that a known address is looked up only once"""
+        cache = EnrichmentCache()
+        provider = FakeProvider({'jane@acme.com': PERSON})
+
+        self.assertEqual(cache.lookup('jane@acme.com', provider), PERSON)
+        self.assertEqual(cache.lookup('Jane@ACME.com', provider), PERSON)
+        self.assertEqual(len(provider.calls), 1)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'provider_calls': 1})
+
+    def test_miss_is_cached(self):
+        """Test that unknown addresses are negatively cached"""
+        cache = EnrichmentCache()
+        provider = FakeProvider({})
+
+        self.assertFalse(cache.lookup('nobody@acme.com', provider))
+        self.assertFalse(cache.lookup('nobody@acme.com', provider))
+        self.assertEqual(len(provider.calls), 1)
+
+    def test_error_is_cached_and_reraised(self):
+        """Test that provider errors are cached for error_ttl"""
+        cache = EnrichmentCache()
+        provider = FakeProvider({'jane@acme.com': EnrichmentError('down')})
+
+        for _ in range(2):
+            with self.assertRaises(EnrichmentError):
+                cache.lookup('jane@acme.com', provider)
+        self.assertEqual(len(provider.calls), 1)
+
+    def test_expired_entry_is_fetched_again(self):
+        """Test that entries are dropped after their TTL"""
+        cache = EnrichmentCache(error_ttl=0)
+        provider = FakeProvider({'jane@acme.com': EnrichmentError('down')})
+
+        for _ in range(2):
+            with self.assertRaises(EnrichmentError):
+                cache.lookup('jane@acme.com', provider)
+        self.assertEqual(len(provider.calls), 2)
+
+    def test_shared_cache_backend(self):
+        """Test that results are reused through a shared Django cache"""
+        provider = FakeProvider({'jane@acme.com': PERSON})
+        EnrichmentCache(cache_alias='default').lookup('jane@acme.com', provider)
+
+        other_process = EnrichmentCache(cache_alias='default')
+        self.assertEqual(other_process.lookup('jane@acme.com', provider), PERSON)
+        self.assertEqual(len(provider.calls), 1)
+
+    def test_domain_misses_are_reused(self):
+        """Test that a domain with only misses stops reaching the provider"""
+        cache = EnrichmentCache(domain_miss_threshold=2)
+        provider = FakeProvider({})
+
+        for name in ('a', 'b', 'c', 'd'):
+            self.assertFalse(cache.lookup('%s@nowhere.com' % name, provider))
+        self.assertEqual(len(provider.calls), 2)
+
+    def test_domain_hit_disables_domain_misses(self):
+        """Test that a hit on a domain keeps every address on it looked up"""
+        cache = EnrichmentCache(domain_miss_threshold=1)
+        provider = FakeProvider({'jane@acme.com': PERSON})
+
+        cache.lookup('jane@acme.com', provider)
+        cache.lookup('a@acme.com', provider)
+        cache.lookup('b@acme.com', provider)
+        self.assertEqual(len(provider.calls), 3)
+
+    def test_errors_expire_before_the_first_job_retry(self):
+        """Test that a retried enrichment job asks the provider again"""
+        self.assertLess(settings.ENRICHMENT_CACHE['ERROR_TTL'], settings.JOB_BACKOFF_SECONDS)
+        self.assertLess(EnrichmentCache().ttls['error'], settings.JOB_BACKOFF_SECONDS)
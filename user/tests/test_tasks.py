@@ -0,0 +1,247 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.cache import cache as django_cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+from core.models import Job, Post
+from post import purge
+from user import tasks
+from user.clearbit import EnrichmentError
+
+FAKE_BACKEND = 'user.clearbit.fakeClearbitCheck'
+
+
+def failing_backend(email):
+    raise EnrichmentError('Provider is down')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+@override_settings(ENRICHMENT_BACKEND=FAKE_BACKEND)
+class EnrichmentJobTests(TestCase):
+    """Test the background enrichment of new users"""
+
+    def test_create_user_enqueues_enrichment(self):
+        """Test that creating a user saves it right away and enqueues a job"""
+        user = create_user(email='jane.doe@gmail.com', password='test123')
+
+        self.assertEqual(user.fullName, '')
+        job = Job.objects.get(user=user)
+        self.assertEqual(job.kind, Job.KIND_ENRICH)
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+
+    def test_drain_enriches_user(self):
+        """Test that draining the queue fills in the profile fields"""
+        user = create_user(email='jane.doe@gmail.com', password='test123')
+
+        self.assertEqual(tasks.work(), 1)
+
+        user.refresh_from_db()
+        self.assertEqual(user.fullName, 'Jane Doe')
+        self.assertEqual(user.givenName, 'Jane')
+        self.assertEqual(Job.objects.get(user=user).status, Job.STATUS_DONE)
+
+    @override_settings(ENRICHMENT_BACKEND='user.tests.test_tasks.failing_backend')
+    def test_failed_job_is_retried_with_backoff(self):
+        """Test that a failing job goes back to the queue for later"""
+        user = create_user(email='jane.doe@gmail.com', password='test123')
+
+        tasks.work()
+
+        job = Job.objects.get(user=user)
+        self.assertEqual(job.status, Job.STATUS_PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Provider is down', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(tasks.work(), 0)
+
+    @override_settings(ENRICHMENT_BACKEND='user.tests.test_tasks.failing_backend')
+    def test_job_fails_after_max_attempts(self):
+        """Test that a job is given up after max_attempts"""
+        user = create_user(email='jane.doe@gmail.com', password='test123')
+        Job.objects.filter(user=user).update(max_attempts=2)
+
+        for _ in range(2):
+            tasks.work()
+            Job.objects.filter(user=user).update(run_after=timezone.now())
+
+        job = Job.objects.get(user=user)
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test that a job left running by a dead worker is picked up again"""
+        user = create_user(email='jane.doe@gmail.com', password='test123')
+        Job.objects.filter(user=user).update(
+            status=Job.STATUS_RUNNING,
+            run_after=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.assertEqual(tasks.work(), 1)
+        self.assertEqual(Job.objects.get(user=user).status, Job.STATUS_DONE)
+
+    def test_expired_lease_on_last_attempt_fails(self):
+        """Test that a job killing its worker every time isn't run forever"""
+        user = create_user(email='jane.doe@gmail.com', password='test123')
+        Job.objects.filter(user=user).update(
+            status=Job.STATUS_RUNNING,
+            attempts=3,
+            max_attempts=3,
+            run_after=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.assertEqual(tasks.work(), 0)
+
+        job = Job.objects.get(user=user)
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIn('Lease expired', job.last_error)
+
+    def test_jobs_command_drain(self):
+        """Test that the jobs command drains the queue"""
+        create_user(email='jane.doe@gmail.com', password='test123')
+
+        call_command('jobs', 'drain', stdout=StringIO())
+
+        self.assertFalse(Job.objects.exclude(status=Job.STATUS_DONE).exists())
+
+
+@override_settings(USER_PURGE_BATCH_SIZE=2)
+class PurgeUserTests(TestCase):
+    """Test deleting users and their posts in the background"""
+
+    def setUp(self):
+        django_cache.clear()
+        self.user = create_user(email='jane.doe@gmail.com', password='test123', username='jane')
+        self.admin = get_user_model().objects.create_superuser(
+            email='admin@gmail.com', password='test123', username='admin')
+        Job.objects.all().delete()
+        Post.objects.bulk_create([
+            Post(user=self.user, title='Title %d' % index, content='Content')
+            for index in range(5)
+        ])
+        self.kept = Post.objects.create(user=self.admin, title='Kept', content='Content')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def test_delete_endpoint_deactivates_and_enqueues(self):
+        """Test that deleting a user only deactivates them until the job runs"""
+        res = self.client.delete(reverse('user:user-detail', kwargs={'pk': self.user.pk}))
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(Post.objects.filter(user=self.user).count(), 5)
+        job = Job.objects.get(user=self.user)
+        self.assertEqual(job.kind, Job.KIND_PURGE_USER)
+
+        self.client.delete(reverse('user:user-detail', kwargs={'pk': self.user.pk}))
+        self.assertEqual(Job.objects.filter(kind=Job.KIND_PURGE_USER).count(), 1)
+
+    def test_delete_endpoint_is_admin_only(self):
+        self.client.force_authenticate(user=self.user)
+        res = self.client.delete(reverse('user:user-detail', kwargs={'pk': self.admin.pk}))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Job.objects.exists())
+
+    def delete_as_staff(self, target, *codenames):
+        staff = create_user(email='staff@gmail.com', password='test123', username='staff',
+                            is_staff=True)
+        staff.user_permissions.add(*Permission.objects.filter(codename__in=codenames))
+        self.client.force_authenticate(user=get_user_model().objects.get(pk=staff.pk))
+        return self.client.delete(reverse('user:user-detail', kwargs={'pk': target.pk}))
+
+    def test_delete_endpoint_needs_delete_permissions(self):
+        """Test that staff need to be allowed to delete the user and their posts"""
+        res = self.delete_as_staff(self.user, 'delete_user')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Job.objects.filter(kind=Job.KIND_PURGE_USER).exists())
+
+        self.client.force_authenticate(user=self.admin)
+        res = self.client.delete(reverse('user:user-detail', kwargs={'pk': self.user.pk}))
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+
+    def test_staff_cannot_delete_superusers(self):
+        res = self.delete_as_staff(self.admin, 'delete_user', 'delete_post')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.admin.refresh_from_db()
+        self.assertTrue(self.admin.is_active)
+
+    def test_nobody_deletes_themselves(self):
+        res = self.client.delete(reverse('user:user-detail', kwargs={'pk': self.admin.pk}))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.admin.refresh_from_db()
+        self.assertTrue(self.admin.is_active)
+        self.assertFalse(Job.objects.exists())
+
+    def test_purge_deletes_posts_in_batches(self):
+        """Test that the purge removes the posts a batch at a time, then the user"""
+        job = tasks.purge_later(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(tasks.work(), 1)
+
+        deletes = [query['sql'] for query in queries
+                   if query['sql'].startswith('DELETE FROM "core_post"')]
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.kept])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.progress, 5)
+
+    def test_interrupted_purge_resumes(self):
+        """Test that a purge that died half way finishes on its next attempt"""
+        job = tasks.purge_later(self.user)
+        batches = purge.delete_posts(self.user, 2)
+        next(batches)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.STATUS_RUNNING,
+            attempts=1,
+            progress=2,
+            run_after=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.assertEqual(tasks.work(), 1)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_DONE)
+        self.assertEqual(job.progress, 5)
+        self.assertFalse(Post.objects.filter(title__startswith='Title').exists())
+
+    def test_reactivated_user_is_kept(self):
+        tasks.purge_later(self.user)
+        self.user.is_active = True
+        self.user.save()
+
+        tasks.work()
+
+        self.assertEqual(Post.objects.filter(user=self.user).count(), 5)
+
+    def test_admin_delete_uses_purge(self):
+        """Test that deleting from the admin goes through the purge too"""
+        self.client.force_login(self.admin)
+        url = reverse('admin:core_user_delete', args=(self.user.pk,))
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(Job.objects.filter(kind=Job.KIND_PURGE_USER, user=self.user).exists())
@@ -1,14 +1,14 @@
 from django.urls import path
-from rest_framework_jwt.views import obtain_jwt_token, refresh_jwt_token
-from .views import CreateUserView, ManageUserView
-from user.views import UserList
+from .views import CreateUserView, ManageUserView, ObtainTokenView, RefreshTokenView
+from user.views import UserDetail, UserList
 
 app_name = 'user'
 
 urlpatterns = [
     path('create/', CreateUserView.as_view(), name='create'),
     path('me/', ManageUserView.as_view(), name='me'),
-    path('token/', obtain_jwt_token, name='token'),
-    path('token-refresh/', refresh_jwt_token, name='token-refresh'),
+    path('token/', ObtainTokenView.as_view(), name='token'),
+    path('token-refresh/', RefreshTokenView.as_view(), name='token-refresh'),
     path('users/', UserList.as_view(), name='users'),
+    path('users/<int:pk>/', UserDetail.as_view(), name='user-detail'),
 ]
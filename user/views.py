@@ -1,19 +1,36 @@
-from rest_framework import generics, permissions
-from .serializers import UserSerializer
-from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework_jwt.views import ObtainJSONWebToken, RefreshJSONWebToken
+from .serializers import UserSerializer, UserWithStatsSerializer
+from .authentication import CachedJSONWebTokenAuthentication
+from . import tasks
 
 from django.contrib.auth import get_user_model
+from core.idempotency import IdempotencyMixin
+from core.replicas import ReplicaReadMixin
+from core.throttling import SignupThrottle, TokenCredentialThrottle, TokenIPThrottle
 
 
-class CreateUserView(generics.CreateAPIView):
+class CreateUserView(ReplicaReadMixin, IdempotencyMixin, generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_classes = (SignupThrottle,)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ObtainTokenView(ObtainJSONWebToken):
+    """Exchange credentials for a token, throttled per IP and per account"""
+    throttle_classes = (TokenIPThrottle, TokenCredentialThrottle)
+
+
+class RefreshTokenView(RefreshJSONWebToken):
+    throttle_classes = (TokenIPThrottle,)
+
+
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
-    serializer_class = UserSerializer
-    authentication_classes = (JSONWebTokenAuthentication,)
+    serializer_class = UserWithStatsSerializer
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
@@ -21,10 +38,36 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
-class UserList(generics.ListCreateAPIView):
+class UserList(ReplicaReadMixin, generics.ListCreateAPIView):
     """Show user for admin"""
-    authentication_classes = (JSONWebTokenAuthentication,)
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser,)
 
-    queryset = get_user_model().objects.all()
-    serializer_class = UserSerializer
+    queryset = get_user_model().objects.select_related('post_stats')
+    serializer_class = UserWithStatsSerializer
+
+
+class UserDetail(ReplicaReadMixin, generics.RetrieveDestroyAPIView):
+    """Show or delete a user for admin
+
+    Deleting deactivates the user right away and answers 202; the user and
+    their posts are deleted in the background by a purge_user job.  It takes
+    the same permissions as deleting them in the admin, and nobody may delete
+    themselves or, unless a superuser, a superuser.
+    """
+    authentication_classes = (CachedJSONWebTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated, permissions.IsAdminUser,)
+
+    queryset = get_user_model().objects.select_related('post_stats')
+    serializer_class = UserWithStatsSerializer
+
+    def destroy(self, request, *args, **kwargs):
+        user = self.get_object()
+        if user.pk == request.user.pk:
+            raise PermissionDenied('You can\'t delete your own account.')
+        if user.is_superuser and not request.user.is_superuser:
+            raise PermissionDenied('Only superusers can delete superusers.')
+        if tasks.missing_purge_permissions(request.user, [user]):
+            raise PermissionDenied()
+        tasks.purge_later(user)
+        return Response(status=status.HTTP_202_ACCEPTED)